@@ -0,0 +1 @@
+"""Benchmarks for temporal batch processing."""
\ No newline at end of file
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""Benchmark create_single_batch latency across the whole words file.
+
+Compares the original readline scan against the indexed seek so that the
+latency of late batches can be checked to stay flat.
+"""
+
+import argparse
+import asyncio
+import random
+import string
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, List
+
+from temporal_batch import activities
+from temporal_batch.line_index import get_line_index, sidecar_path
+
+BATCH_SIZE = 50
+
+
+def scan_batch(path: Path, batch_size: int, offset: int) -> List[str]:
+    """Read a batch by skipping lines one at a time (the pre-index behaviour)."""
+    words: List[str] = []
+    with open(path, "r") as f:
+        for _ in range(offset):
+            if not f.readline():
+                return []
+        for _ in range(batch_size):
+            line = f.readline()
+            if not line:
+                break
+            words.append(line.strip())
+    return words
+
+
+def write_words(path: Path, num_lines: int) -> None:
+    """Write a file of random lowercase words."""
+    rng = random.Random(0)
+    with open(path, "w") as f:
+        for _ in range(num_lines):
+            f.write("".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 12))) + "\n")
+
+
+def time_ms(repeat: int, fn: Callable[[], object]) -> float:
+    """Return the mean wall time of fn() in milliseconds."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) * 1000 / repeat
+
+
+def main() -> None:
+    """Run the benchmark and print a latency table."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--lines", type=int, default=370_000, help="synthetic file size")
+    parser.add_argument("--file", type=Path, help="existing words file to use instead")
+    parser.add_argument("--points", type=int, default=6, help="offsets sampled")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    loop = asyncio.new_event_loop()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.file or Path(tmp) / "words.txt"
+        if args.file is None:
+            write_words(path, args.lines)
+        activities.WORDS_FILE = path
+
+        start = time.perf_counter()
+        num_lines = len(get_line_index(path))
+        print(f"{num_lines} lines, index built in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+        print(f"{'offset':>10} {'scan ms':>10} {'indexed ms':>11}")
+        for point in range(args.points):
+            offset = max(num_lines - BATCH_SIZE, 0) * point // max(args.points - 1, 1)
+            scan = time_ms(args.repeat, lambda: scan_batch(path, BATCH_SIZE, offset))
+            indexed = time_ms(
+                args.repeat,
+                lambda: loop.run_until_complete(
+                    activities.create_single_batch(BATCH_SIZE, num_lines, offset)
+                ),
+            )
+            print(f"{offset:>10} {scan:>10.3f} {indexed:>11.3f}")
+
+        if args.file is not None:
+            print(f"index kept at {sidecar_path(path)}")
+    loop.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""Measure the compression ratio and CPU cost of the payload codec.
+
+Serializes batches of words the way activity results and child workflow
+inputs are serialized, then encodes and decodes each payload with zlib and
+lzma at several levels. Every payload is compressed regardless of the
+codec's threshold so that the cost for small batches is visible too; the
+last column shows whether the default threshold would compress it.
+
+Run from the repository root with ``python -m benchmarks.bench_codec``; it
+shares the words file writer with bench_batch_read.
+"""
+
+import argparse
+import asyncio
+import tempfile
+import time
+from pathlib import Path
+from typing import List, Optional
+
+from temporalio.api.common.v1 import Payload
+from temporalio.converter import DataConverter
+
+from benchmarks.bench_batch_read import write_words
+from temporal_batch.codec import (
+    COMPRESSION_LZMA,
+    COMPRESSION_THRESHOLD,
+    COMPRESSION_ZLIB,
+    CompressionCodec,
+)
+
+# (algorithm, level) pairs to compare; None is the algorithm's default level
+CODECS = [
+    (COMPRESSION_ZLIB, 1),
+    (COMPRESSION_ZLIB, None),
+    (COMPRESSION_ZLIB, 9),
+    (COMPRESSION_LZMA, 0),
+    (COMPRESSION_LZMA, None),
+]
+
+
+def batch_payloads(words: List[str], batch_size: int) -> List[Payload]:
+    """Serialize the words as one List[str] payload per batch."""
+    converter = DataConverter.default.payload_converter
+    return [
+        converter.to_payloads([words[i : i + batch_size]])[0]
+        for i in range(0, len(words) - batch_size + 1, batch_size)
+    ]
+
+
+async def measure(
+    payloads: List[Payload], algorithm: str, level: Optional[int], repeat: int
+) -> str:
+    """Return a table row with the ratio and per-payload encode/decode time."""
+    codec = CompressionCodec(algorithm, threshold=0, level=level)
+    encoded = await codec.encode(payloads)
+    start = time.process_time()
+    for _ in range(repeat):
+        await codec.encode(payloads)
+    encode_us = (time.process_time() - start) / (repeat * len(payloads)) * 1e6
+    start = time.process_time()
+    for _ in range(repeat):
+        await codec.decode(encoded)
+    decode_us = (time.process_time() - start) / (repeat * len(payloads)) * 1e6
+    size = sum(p.ByteSize() for p in payloads) / len(payloads)
+    name = f"{algorithm}-{'default' if level is None else level}"
+    return (
+        f"{name:>14} {size:>10.0f} {codec.stats.ratio:>7.2f}"
+        f" {encode_us:>10.1f} {decode_us:>10.1f} {'yes' if size >= COMPRESSION_THRESHOLD else 'no':>9}"
+    )
+
+
+async def main() -> None:
+    """Print the ratio and CPU cost for each batch size and codec."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--file", type=Path, help="words file to use instead of a synthetic one")
+    parser.add_argument("--words", type=int, default=20_000, help="words read from the file")
+    parser.add_argument("--batch-sizes", default="10,50,200,1000")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.file or Path(tmp) / "words.txt"
+        if args.file is None:
+            write_words(path, args.words)
+        with open(path) as f:
+            words = [line.strip() for _, line in zip(range(args.words), f)]
+
+    print(
+        f"{'batch':>6} {'codec':>14} {'bytes':>10} {'ratio':>7}"
+        f" {'encode us':>10} {'decode us':>10} {'threshold':>9}"
+    )
+    for batch_size in (int(size) for size in args.batch_sizes.split(",")):
+        payloads = batch_payloads(words, batch_size)
+        for algorithm, level in CODECS:
+            print(f"{batch_size:>6} {await measure(payloads, algorithm, level, args.repeat)}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
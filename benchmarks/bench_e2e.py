@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""End-to-end throughput and latency sweep for BatchParentWorkflow.
+
+For every combination of batch size, window size, continue-as-new history
+threshold and worker count, starts that many worker processes on a fresh
+task queue and runs BatchParentWorkflow over a words file with the real
+activities. Each run reports records/sec, p50/p95/p99 batch latency (child
+workflow start to close), history events per record (every parent run plus
+the children) and the workers' CPU time and peak RSS.
+
+Results are written as JSON to --output; pass an earlier file as
+--baseline to compare records/sec and p99 latency between commits.
+Without --address a local dev server is started.
+
+Run from the repository root with ``python -m benchmarks.bench_e2e``; it
+shares the words file writer with bench_batch_read.
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import math
+import multiprocessing
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from contextlib import AsyncExitStack
+from datetime import datetime, timezone
+from multiprocessing.synchronize import Event
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from temporalio.client import Client
+from temporalio.testing import WorkflowEnvironment
+from temporalio.worker import Worker
+
+from benchmarks.bench_batch_read import write_words
+from temporal_batch import activities
+from temporal_batch.shared import BatchParentWorkflowParams
+from temporal_batch.workflows import (
+    BATCH_SIZE,
+    MAX_HISTORY_LENGTH,
+    WINDOW_SIZE,
+    BatchChildWorkflow,
+    BatchParentWorkflow,
+)
+
+# Sweep dimensions, in the order they appear in results and the table
+DIMENSIONS = ("batch_size", "window_size", "max_history_length", "workers")
+
+
+def int_list(value: str) -> List[int]:
+    """Parse a comma-separated list of integers."""
+    return [int(item) for item in value.split(",")]
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Return the nearest-rank q-th percentile of values."""
+    ordered = sorted(values)
+    return ordered[max(math.ceil(q / 100 * len(ordered)) - 1, 0)] if ordered else 0.0
+
+
+def run_worker(
+    address: str,
+    task_queue: str,
+    words_file: Path,
+    stop: Event,
+    usage: "multiprocessing.Queue[Tuple[float, int]]",
+) -> None:
+    """Run a worker process until stop is set, then report its CPU time and peak RSS."""
+    activities.WORDS_FILE = words_file
+
+    async def serve() -> None:
+        client = await Client.connect(address)
+        async with Worker(
+            client,
+            task_queue=task_queue,
+            workflows=[BatchParentWorkflow, BatchChildWorkflow],
+            activities=[
+                activities.create_single_batch,
+                activities.read_batches,
+                activities.process_record,
+                activities.process_batch,
+            ],
+        ):
+            await asyncio.get_running_loop().run_in_executor(None, stop.wait)
+
+    asyncio.run(serve())
+    rusage = resource.getrusage(resource.RUSAGE_SELF)
+    # ru_maxrss is in bytes on macOS and KiB elsewhere
+    peak_rss = rusage.ru_maxrss if sys.platform == "darwin" else rusage.ru_maxrss * 1024
+    usage.put((rusage.ru_utime + rusage.ru_stime, peak_rss))
+
+
+async def count_parent_events(
+    client: Client, workflow_id: str, run_id: Optional[str]
+) -> Tuple[int, int]:
+    """Return the history events and number of runs of a continued-as-new chain."""
+    events = runs = 0
+    while run_id:
+        history = await client.get_workflow_handle(workflow_id, run_id=run_id).fetch_history()
+        events += len(history.events)
+        runs += 1
+        last = history.events[-1]
+        run_id = None
+        if last.HasField("workflow_execution_continued_as_new_event_attributes"):
+            run_id = last.workflow_execution_continued_as_new_event_attributes.new_execution_run_id
+    return events, runs
+
+
+async def describe_children(
+    client: Client, parent_id: str, records: int, batch_size: int
+) -> Tuple[List[float], int]:
+    """Return the latency in ms and total history events of the first attempt of every batch."""
+    limit = asyncio.Semaphore(50)
+
+    async def describe(offset: int) -> Tuple[float, int]:
+        async with limit:
+            info = await client.get_workflow_handle(f"{parent_id}-batch-{offset}").describe()
+        assert info.close_time is not None
+        return (info.close_time - info.start_time).total_seconds() * 1000, info.history_length
+
+    results = await asyncio.gather(*(describe(offset) for offset in range(0, records, batch_size)))
+    return [latency for latency, _ in results], sum(events for _, events in results)
+
+
+async def run_case(
+    client: Client, address: str, words_file: Path, case: Dict[str, int], args: argparse.Namespace
+) -> Dict[str, Any]:
+    """Run one sweep point with its own workers and return its results."""
+    task_queue = f"bench-e2e-{uuid.uuid4()}"
+    context = multiprocessing.get_context("spawn")
+    stop = context.Event()
+    usage: "multiprocessing.Queue[Tuple[float, int]]" = context.Queue()
+    workers = [
+        context.Process(target=run_worker, args=(address, task_queue, words_file, stop, usage))
+        for _ in range(case["workers"])
+    ]
+    for worker in workers:
+        worker.start()
+    try:
+        # Give the workers time to import, connect and start polling
+        await asyncio.sleep(args.warmup)
+        start = time.perf_counter()
+        handle = await client.start_workflow(
+            BatchParentWorkflow.run,
+            BatchParentWorkflowParams(
+                args.records,
+                batch_size=case["batch_size"],
+                min_window_size=case["window_size"],
+                max_window_size=case["window_size"],
+                max_history_length=case["max_history_length"],
+            ),
+            id=f"bench-e2e-{uuid.uuid4()}",
+            task_queue=task_queue,
+        )
+        await handle.result()
+        elapsed = time.perf_counter() - start
+    finally:
+        stop.set()
+        usages = [usage.get() for _ in workers]
+        for worker in workers:
+            worker.join()
+
+    parent_events, parent_runs = await count_parent_events(
+        client, handle.id, handle.first_execution_run_id
+    )
+    latencies, child_events = await describe_children(
+        client, handle.id, args.records, case["batch_size"]
+    )
+    events = parent_events + child_events
+    return {
+        **case,
+        "records": args.records,
+        "seconds": round(elapsed, 3),
+        "records_per_sec": round(args.records / elapsed, 1),
+        "batch_latency_ms": {f"p{q}": round(percentile(latencies, q), 1) for q in (50, 95, 99)},
+        "history_events": events,
+        "events_per_record": round(events / args.records, 2),
+        "parent_runs": parent_runs,
+        "worker_cpu_seconds": round(sum(cpu for cpu, _ in usages), 2),
+        "worker_peak_rss_mb": round(max(rss for _, rss in usages) / 2**20, 1),
+    }
+
+
+def print_row(result: Dict[str, Any], baseline: Optional[Dict[str, Any]]) -> None:
+    """Print one result row, with the change against a baseline run if there is one."""
+    latency = result["batch_latency_ms"]
+    row = (
+        " ".join(f"{result[name]:>8}" for name in DIMENSIONS)
+        + f" {result['records_per_sec']:>10.1f} {latency['p50']:>8.1f} {latency['p95']:>8.1f}"
+        f" {latency['p99']:>8.1f} {result['events_per_record']:>8.2f}"
+        f" {result['worker_cpu_seconds']:>8.2f} {result['worker_peak_rss_mb']:>8.1f}"
+    )
+    if baseline is not None:
+        rate = result["records_per_sec"] / baseline["records_per_sec"] - 1
+        p99 = latency["p99"] / max(baseline["batch_latency_ms"]["p99"], 1e-9) - 1
+        row += f"  records/s {rate:+.1%} p99 {p99:+.1%}"
+    print(row, flush=True)
+
+
+def git_commit() -> Optional[str]:
+    """Return the current git commit, if the benchmark runs from a checkout."""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def main() -> None:
+    """Run every sweep point and write the results file."""
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--address", help="existing Temporal server, e.g. localhost:7233")
+    parser.add_argument("--records", type=int, default=2000, help="words processed per run")
+    parser.add_argument("--file", type=Path, help="words file to use instead of a synthetic one")
+    parser.add_argument("--batch-sizes", type=int_list, default=[BATCH_SIZE])
+    parser.add_argument("--window-sizes", type=int_list, default=[WINDOW_SIZE])
+    parser.add_argument("--history-lengths", type=int_list, default=[MAX_HISTORY_LENGTH])
+    parser.add_argument("--workers", type=int_list, default=[1])
+    parser.add_argument("--warmup", type=float, default=2.0, help="seconds to let workers start")
+    parser.add_argument("--output", type=Path, default=Path("bench_e2e.json"))
+    parser.add_argument("--baseline", type=Path, help="earlier results file to compare against")
+    args = parser.parse_args()
+
+    baseline: Dict[Tuple[int, ...], Dict[str, Any]] = {}
+    if args.baseline:
+        for run in json.loads(args.baseline.read_text())["runs"]:
+            baseline[tuple(run[name] for name in DIMENSIONS)] = run
+
+    results: List[Dict[str, Any]] = []
+    with tempfile.TemporaryDirectory() as tmp:
+        words_file = args.file or Path(tmp) / "words.txt"
+        if args.file is None:
+            write_words(words_file, args.records)
+
+        async with AsyncExitStack() as stack:
+            if args.address:
+                address = args.address
+                client = await Client.connect(address)
+            else:
+                env = await stack.enter_async_context(await WorkflowEnvironment.start_local())
+                client = env.client
+                address = client.service_client.config.target_host
+
+            print(
+                " ".join(f"{name.split('_')[0]:>8}" for name in DIMENSIONS)
+                + f" {'records/s':>10} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}"
+                f" {'ev/rec':>8} {'cpu s':>8} {'rss MB':>8}"
+            )
+            for values in itertools.product(
+                args.batch_sizes, args.window_sizes, args.history_lengths, args.workers
+            ):
+                case = dict(zip(DIMENSIONS, values))
+                result = await run_case(client, address, words_file, case, args)
+                results.append(result)
+                print_row(result, baseline.get(values))
+
+    args.output.write_text(
+        json.dumps(
+            {
+                "commit": git_commit(),
+                "created": datetime.now(timezone.utc).isoformat(),
+                "python": platform.python_version(),
+                "runs": results,
+            },
+            indent=2,
+        )
+    )
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""Load test process_record latency while large batch reads are running.
+
+Runs a steady stream of process_record calls next to back-to-back large
+read_batches reads on one event loop, as a worker would, and reports
+process_record latency percentiles. The "inline" row reads on the event
+loop the way the activities used to; the "thread pool" row goes through the
+activities' I/O executor. Every record takes the 10ms path so that any
+latency above it is time spent waiting for the event loop.
+
+Run from the repository root with ``python -m benchmarks.bench_io_blocking``;
+it shares the words file writer with bench_batch_read.
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Awaitable, Callable, List
+from unittest import mock
+
+from benchmarks.bench_batch_read import BATCH_SIZE, write_words
+from temporal_batch import activities
+from temporal_batch.line_index import get_line_index
+from temporal_batch.readers import read_lines
+from temporal_batch.shared import READER_BACKEND
+
+Reader = Callable[[int, int], Awaitable[List[List[str]]]]
+
+
+async def inline_read(offset: int, num_batches: int) -> List[List[str]]:
+    """Read batches on the event loop like the activities did before."""
+    lines = read_lines(activities.WORDS_FILE, offset, BATCH_SIZE * num_batches, READER_BACKEND)
+    return [lines[i : i + BATCH_SIZE] for i in range(0, len(lines), BATCH_SIZE)]
+
+
+async def pooled_read(offset: int, num_batches: int) -> List[List[str]]:
+    """Read batches through the read_batches activity."""
+    read_until_line = offset + BATCH_SIZE * num_batches
+    result = await activities.read_batches(BATCH_SIZE, read_until_line, offset, num_batches, None)
+    return result.batches
+
+
+async def run_load(read: Reader, args: argparse.Namespace, num_lines: int) -> List[float]:
+    """Run records and reads side by side and return record latencies in ms."""
+    latencies: List[float] = []
+    deadline = time.perf_counter() + args.seconds
+    rng = random.Random(0)
+
+    async def records() -> None:
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            await activities.process_record("word")
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    async def reads() -> None:
+        while time.perf_counter() < deadline:
+            offset = rng.randrange(max(num_lines - BATCH_SIZE * args.read_batches, 1))
+            await read(offset, args.read_batches)
+            # The worker returns to the event loop between activity tasks
+            await asyncio.sleep(0)
+
+    await asyncio.gather(
+        *(records() for _ in range(args.records)), *(reads() for _ in range(args.readers))
+    )
+    return latencies
+
+
+def main() -> None:
+    """Run the load test for both read paths and print one row each."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--lines", type=int, default=2_000_000, help="synthetic file size")
+    parser.add_argument("--seconds", type=float, default=5.0, help="duration of each run")
+    parser.add_argument("--records", type=int, default=200, help="concurrent process_record calls")
+    parser.add_argument("--readers", type=int, default=2, help="concurrent batch readers")
+    parser.add_argument("--read-batches", type=int, default=2000, help="batches per read")
+    parser.add_argument("--io-threads", type=int, default=4)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "words.txt"
+        write_words(path, args.lines)
+        num_lines = len(get_line_index(path))
+        activities.WORDS_FILE = path
+
+        executor = ThreadPoolExecutor(args.io_threads, thread_name_prefix="batch-io")
+        activities.set_io_executor(executor)
+        print(f"{'reads':>12} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8} {'records/s':>10}")
+        # Keep every record on the 10ms path
+        with mock.patch.object(activities.random, "random", return_value=1.0):
+            for name, read in (("inline", inline_read), ("thread pool", pooled_read)):
+                latencies = asyncio.run(run_load(read, args, num_lines))
+                cuts = statistics.quantiles(latencies, n=100)
+                print(
+                    f"{name:>12} {cuts[49]:>8.1f} {cuts[98]:>8.1f} {max(latencies):>8.1f}"
+                    f" {len(latencies) / args.seconds:>10.0f}"
+                )
+        executor.shutdown()
+
+
+if __name__ == "__main__":
+    main()
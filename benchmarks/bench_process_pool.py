@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""Measure records/sec of the CPU-bound transform as processes are added.
+
+Runs transform_records over chunks of records on a ProcessPoolExecutor of
+increasing size, the way a worker started with --process-pool does, and
+compares it with running the same transform on the event loop, which is
+limited to one core.
+"""
+
+import argparse
+import asyncio
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import List
+
+from temporal_batch.activities import _cpu_transform, transform_records
+from temporal_batch.workflows import CHUNK_SIZE
+
+
+async def run_inline(records: List[str]) -> float:
+    """Transform every record on the event loop and return records/sec."""
+    start = time.perf_counter()
+    for record in records:
+        _cpu_transform(record)
+    return len(records) / (time.perf_counter() - start)
+
+
+async def run_pool(records: List[str], processes: int, chunk_size: int) -> float:
+    """Transform the records in chunks on a process pool and return records/sec."""
+    loop = asyncio.get_running_loop()
+    chunks = [records[i : i + chunk_size] for i in range(0, len(records), chunk_size)]
+    with ProcessPoolExecutor(processes) as pool:
+        # Start the processes before timing
+        await asyncio.gather(
+            *(loop.run_in_executor(pool, transform_records, []) for _ in range(processes))
+        )
+        start = time.perf_counter()
+        await asyncio.gather(
+            *(loop.run_in_executor(pool, transform_records, chunk) for chunk in chunks)
+        )
+        return len(records) / (time.perf_counter() - start)
+
+
+async def main() -> None:
+    """Print records/sec for the event loop and for each pool size."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--records", type=int, default=5000)
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--max-processes", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+    records = [f"word{i}" for i in range(args.records)]
+
+    baseline = await run_inline(records)
+    print(f"{'executor':>12} {'records/s':>12} {'speedup':>8}")
+    print(f"{'event loop':>12} {baseline:>12.0f} {1.0:>8.2f}")
+    processes = 1
+    while processes <= args.max_processes:
+        rate = await run_pool(records, processes, args.chunk_size)
+        print(f"{f'{processes} procs':>12} {rate:>12.0f} {rate / baseline:>8.2f}")
+        processes *= 2
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""Compare the processing modes of BatchChildWorkflow.
+
+Runs the same batches through every processing mode against a Temporal
+server and reports records/sec and history events per batch and per record.
+Without --address a local dev server is started.
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import AsyncExitStack
+
+from temporalio.client import Client
+from temporalio.testing import WorkflowEnvironment
+from temporalio.worker import SharedStateManager, Worker
+
+from temporal_batch.activities import process_batch, process_record, transform_records
+from temporal_batch.shared import PROCESSING_MODES, BatchChildWorkflowParams
+from temporal_batch.workflows import BATCH_SIZE, BatchChildWorkflow
+
+TASK_QUEUE = "bench-processing-modes"
+
+
+async def run_mode(client: Client, mode: str, batches: int, batch_size: int) -> None:
+    """Run the batches in one processing mode and print a result row."""
+    batch = [f"word{i}" for i in range(batch_size)]
+    start = time.perf_counter()
+    handles = await asyncio.gather(
+        *(
+            client.start_workflow(
+                BatchChildWorkflow.run,
+                args=[batch, BatchChildWorkflowParams(mode)],
+                id=f"bench-{mode}-{uuid.uuid4()}",
+                task_queue=TASK_QUEUE,
+            )
+            for _ in range(batches)
+        )
+    )
+    await asyncio.gather(*(handle.result() for handle in handles))
+    elapsed = time.perf_counter() - start
+
+    events = 0
+    for handle in handles:
+        events += len((await handle.fetch_history()).events)
+    records = batches * batch_size
+    print(
+        f"{mode:>8} {records / elapsed:>12.1f} {events / batches:>14.1f} {events / records:>15.2f}"
+    )
+
+
+async def main() -> None:
+    """Run the benchmark for every processing mode."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--address", help="existing Temporal server, e.g. localhost:7233")
+    parser.add_argument("--batches", type=int, default=20)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    args = parser.parse_args()
+
+    async with AsyncExitStack() as stack:
+        if args.address:
+            client = await Client.connect(args.address)
+        else:
+            env = await stack.enter_async_context(await WorkflowEnvironment.start_local())
+            client = env.client
+        await stack.enter_async_context(
+            Worker(
+                client,
+                task_queue=TASK_QUEUE,
+                workflows=[BatchChildWorkflow],
+                activities=[process_record, process_batch, transform_records],
+                # cpu mode's transform_records runs on a process pool
+                activity_executor=stack.enter_context(ProcessPoolExecutor(os.cpu_count())),
+                shared_state_manager=SharedStateManager.create_from_multiprocessing(
+                    stack.enter_context(multiprocessing.Manager())
+                ),
+            )
+        )
+
+        print(f"{'mode':>8} {'records/s':>12} {'events/batch':>14} {'events/record':>15}")
+        for mode in PROCESSING_MODES:
+            await run_mode(client, mode, args.batches, args.batch_size)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""Microbenchmark the readline and mmap reader backends.
+
+Reads batches at random offsets through each backend and reports the mean
+latency per batch and the resulting words per second.
+
+Run from the repository root with ``python -m benchmarks.bench_readers``;
+it shares the words file writer with bench_batch_read.
+"""
+
+import argparse
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.bench_batch_read import BATCH_SIZE, write_words
+from temporal_batch.line_index import get_line_index
+from temporal_batch.readers import BACKENDS, read_lines
+
+
+def main() -> None:
+    """Run the benchmark and print one row per backend."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--lines", type=int, default=370_000, help="synthetic file size")
+    parser.add_argument("--file", type=Path, help="existing words file to use instead")
+    parser.add_argument("--batches", type=int, default=20_000, help="batch reads per backend")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.file or Path(tmp) / "words.txt"
+        if args.file is None:
+            write_words(path, args.lines)
+        num_lines = len(get_line_index(path))
+        offsets = random.Random(0).choices(
+            range(max(num_lines - args.batch_size, 1)), k=args.batches
+        )
+
+        print(f"{'backend':>10} {'us/batch':>10} {'words/s':>12}")
+        for backend in BACKENDS:
+            # Warm up so the mapping and index are loaded before timing
+            read_lines(path, 0, args.batch_size, backend)
+            words = 0
+            start = time.perf_counter()
+            for offset in offsets:
+                words += len(read_lines(path, offset, args.batch_size, backend))
+            elapsed = time.perf_counter() - start
+            print(
+                f"{backend:>10} {elapsed * 1e6 / args.batches:>10.1f} {words / elapsed:>12,.0f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+"""Scale test: run the whole parent/child pipeline over a multi-million-record file.
+
+Generates a dataset with generate_dataset.py (10M records by default), or
+uses --file, then starts worker processes and runs BatchParentWorkflow over
+it until every record is processed, through as many continue-as-new
+generations as that takes. The records are read by the real read_batches
+activity, and with --sink the results are written by the real write_results
+activity. The transform is an instant stand-in unless --real-transform is
+given, so the run measures the pipeline rather than the simulated latency.
+
+While it runs, the workers' resident memory is sampled every
+--sample-interval seconds from /proc, so sampling needs Linux; elsewhere only
+the peak RSS each worker reports at exit is known. Afterwards every parent
+run's history is fetched. The output has a row per generation with its
+records, duration, records/sec, history events and bytes, and the highest
+worker RSS sampled while it ran, followed by the end-to-end totals.
+
+Results are written as JSON to --output. Without --address a local dev
+server is started, and its clock is the one generation times come from.
+
+Run from the repository root with ``python -m benchmarks.bench_scale``; it
+imports the dataset generator and bench_e2e's commit lookup.
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+import uuid
+from contextlib import AsyncExitStack
+from datetime import datetime, timezone
+from multiprocessing.synchronize import Event
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from temporalio import activity
+from temporalio.client import Client
+from temporalio.converter import DataConverter
+from temporalio.testing import WorkflowEnvironment
+from temporalio.worker import Worker
+
+from benchmarks.bench_e2e import git_commit
+from benchmarks.generate_dataset import (
+    DEFAULT_SIZES,
+    DUPLICATE_WINDOW,
+    generate,
+    parse_sizes,
+)
+from temporal_batch import activities
+from temporal_batch.shared import (
+    PROCESSING_MODE_BATCH,
+    PROCESSING_MODE_RECORD,
+    BatchParentWorkflowParams,
+)
+from temporal_batch.workflows import BatchChildWorkflow, BatchParentWorkflow
+
+
+@activity.defn(name="process_record")
+async def instant_process_record(record: str) -> str:
+    """Uppercase the record without the simulated delay."""
+    return record.upper()
+
+
+@activity.defn(name="process_batch")
+async def instant_process_batch(records: List[str]) -> List[str]:
+    """Uppercase the batch without the simulated delay."""
+    return [record.upper() for record in records]
+
+
+def run_worker(
+    address: str,
+    task_queue: str,
+    source: str,
+    real_transform: bool,
+    stop: Event,
+    usage: "multiprocessing.Queue[Tuple[float, int]]",
+) -> None:
+    """Run a worker process until stop is set, then report its CPU time and peak RSS."""
+    activities.DATA_SOURCE = source
+    transforms: List[Callable[..., Any]] = (
+        [activities.process_record, activities.process_batch]
+        if real_transform
+        else [instant_process_record, instant_process_batch]
+    )
+
+    async def serve() -> None:
+        client = await Client.connect(address)
+        async with Worker(
+            client,
+            task_queue=task_queue,
+            workflows=[BatchParentWorkflow, BatchChildWorkflow],
+            activities=[
+                activities.create_single_batch,
+                activities.read_batches,
+                activities.write_results,
+                *transforms,
+            ],
+        ):
+            await asyncio.get_running_loop().run_in_executor(None, stop.wait)
+
+    asyncio.run(serve())
+    rusage = resource.getrusage(resource.RUSAGE_SELF)
+    # ru_maxrss is in bytes on macOS and KiB elsewhere
+    peak_rss = rusage.ru_maxrss if sys.platform == "darwin" else rusage.ru_maxrss * 1024
+    usage.put((rusage.ru_utime + rusage.ru_stime, peak_rss))
+
+
+def resident_bytes(pid: int) -> Optional[int]:
+    """Return the process's resident memory, or None where /proc can't tell."""
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+async def sample_rss(
+    pids: List[int], interval: float, samples: List[Tuple[float, int]]
+) -> None:
+    """Append (time, highest worker RSS) to samples every interval seconds until cancelled."""
+    while True:
+        values = [rss for rss in map(resident_bytes, pids) if rss is not None]
+        if values:
+            samples.append((time.time(), max(values)))
+        await asyncio.sleep(interval)
+
+
+async def generations(
+    client: Client, workflow_id: str, run_id: Optional[str], records: int
+) -> List[Dict[str, Any]]:
+    """Return the records, timing and history size of each run of a continued-as-new chain."""
+    converter = DataConverter.default.payload_converter
+    runs: List[Dict[str, Any]] = []
+    while run_id:
+        history = await client.get_workflow_handle(workflow_id, run_id=run_id).fetch_history()
+        first, last = history.events[0], history.events[-1]
+        (params,) = converter.from_payloads(
+            first.workflow_execution_started_event_attributes.input.payloads,
+            [BatchParentWorkflowParams],
+        )
+        if runs:
+            runs[-1]["records"] = params.completed_records - runs[-1]["records"]
+        runs.append(
+            {
+                "generation": len(runs),
+                # The records completed before this run, until the next run is seen
+                "records": params.completed_records,
+                "started": first.event_time.ToDatetime(timezone.utc).timestamp(),
+                "closed": last.event_time.ToDatetime(timezone.utc).timestamp(),
+                "history_events": len(history.events),
+                "history_bytes": sum(event.ByteSize() for event in history.events),
+            }
+        )
+        run_id = None
+        if last.HasField("workflow_execution_continued_as_new_event_attributes"):
+            run_id = last.workflow_execution_continued_as_new_event_attributes.new_execution_run_id
+    if runs:
+        runs[-1]["records"] = records - runs[-1]["records"]
+    return runs
+
+
+async def run(
+    client: Client, address: str, source: str, records: int, args: argparse.Namespace
+) -> Dict[str, Any]:
+    """Run the parent over records with its own workers and return the results."""
+    task_queue = f"bench-scale-{uuid.uuid4()}"
+    context = multiprocessing.get_context("spawn")
+    stop = context.Event()
+    usage: "multiprocessing.Queue[Tuple[float, int]]" = context.Queue()
+    workers = [
+        context.Process(
+            target=run_worker,
+            args=(address, task_queue, source, args.real_transform, stop, usage),
+        )
+        for _ in range(args.workers)
+    ]
+    for worker in workers:
+        worker.start()
+    samples: List[Tuple[float, int]] = []
+    sampler = asyncio.create_task(
+        sample_rss([worker.pid for worker in workers if worker.pid], args.sample_interval, samples)
+    )
+    try:
+        # Give the workers time to import, connect and start polling
+        await asyncio.sleep(args.warmup)
+        start = time.perf_counter()
+        handle = await client.start_workflow(
+            BatchParentWorkflow.run,
+            BatchParentWorkflowParams(
+                records,
+                processing_mode=args.mode,
+                batch_size=args.batch_size,
+                min_window_size=args.window,
+                max_window_size=args.window,
+                max_history_length=args.max_history_length,
+                sink=args.sink,
+            ),
+            id=f"bench-scale-{uuid.uuid4()}",
+            task_queue=task_queue,
+        )
+        await handle.result()
+        elapsed = time.perf_counter() - start
+    finally:
+        sampler.cancel()
+        stop.set()
+        usages = [usage.get() for _ in workers]
+        for worker in workers:
+            worker.join()
+
+    runs = await generations(client, handle.id, handle.first_execution_run_id, records)
+    for generation in runs:
+        during = [rss for at, rss in samples if generation["started"] <= at <= generation["closed"]]
+        seconds = generation["closed"] - generation["started"]
+        generation["seconds"] = round(seconds, 3)
+        generation["records_per_sec"] = round(generation["records"] / max(seconds, 1e-9), 1)
+        generation["worker_rss_mb"] = round(max(during) / 2**20, 1) if during else None
+        del generation["started"], generation["closed"]
+    return {
+        "records": records,
+        "seconds": round(elapsed, 3),
+        "records_per_sec": round(records / elapsed, 1),
+        "generations": runs,
+        "history_events": sum(generation["history_events"] for generation in runs),
+        "history_bytes": sum(generation["history_bytes"] for generation in runs),
+        "worker_cpu_seconds": round(sum(cpu for cpu, _ in usages), 2),
+        "worker_peak_rss_mb": round(max(rss for _, rss in usages) / 2**20, 1),
+        "worker_rss_samples_mb": [
+            [round(at - samples[0][0], 1), round(rss / 2**20, 1)] for at, rss in samples
+        ],
+    }
+
+
+def print_result(result: Dict[str, Any]) -> None:
+    """Print a row per generation and the totals."""
+    print(
+        f"{'gen':>4} {'records':>11} {'seconds':>9} {'records/s':>10}"
+        f" {'events':>8} {'history MB':>10} {'rss MB':>8}"
+    )
+    for generation in result["generations"]:
+        rss = generation["worker_rss_mb"]
+        print(
+            f"{generation['generation']:>4} {generation['records']:>11,} {generation['seconds']:>9.1f}"
+            f" {generation['records_per_sec']:>10.1f} {generation['history_events']:>8,}"
+            f" {generation['history_bytes'] / 1e6:>10.2f} {'-' if rss is None else rss:>8}"
+        )
+    print(
+        f"{'all':>4} {result['records']:>11,} {result['seconds']:>9.1f}"
+        f" {result['records_per_sec']:>10.1f} {result['history_events']:>8,}"
+        f" {result['history_bytes'] / 1e6:>10.2f} {result['worker_peak_rss_mb']:>8}"
+    )
+    print(f"Worker CPU: {result['worker_cpu_seconds']:.1f}s")
+
+
+def count_lines(path: Path) -> int:
+    """Return the number of lines in a plain text file."""
+    with open(path, "rb") as f:
+        return sum(chunk.count(b"\n") for chunk in iter(lambda: f.read(1 << 20), b""))
+
+
+async def main() -> None:
+    """Prepare the dataset, run the scale test and write the results file."""
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--address", help="existing Temporal server, e.g. localhost:7233")
+    parser.add_argument("--file", type=Path, help="dataset to use instead of generating one")
+    parser.add_argument(
+        "--records",
+        type=int,
+        help="records to process (default: 10,000,000, or every line of --file)",
+    )
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="record size distribution")
+    parser.add_argument("--duplicate-rate", type=float, default=0.0)
+    parser.add_argument("--duplicate-window", type=int, default=DUPLICATE_WINDOW)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--gzip", action="store_true", help="generate a gzip-compressed dataset")
+    parser.add_argument(
+        "--mode", choices=(PROCESSING_MODE_BATCH, PROCESSING_MODE_RECORD), default=PROCESSING_MODE_BATCH
+    )
+    parser.add_argument("--batch-size", type=int, help="records per child workflow")
+    parser.add_argument("--window", type=int, help="child workflows in flight")
+    parser.add_argument("--max-history-length", type=int, help="continue-as-new history cap")
+    parser.add_argument("--sink", help="sink spec the results are written to")
+    parser.add_argument(
+        "--real-transform",
+        action="store_true",
+        help="use the real process_record/process_batch with their simulated delays",
+    )
+    parser.add_argument("--workers", type=int, default=2, help="worker processes")
+    parser.add_argument("--warmup", type=float, default=2.0, help="seconds to let workers start")
+    parser.add_argument("--sample-interval", type=float, default=1.0, help="seconds between RSS samples")
+    parser.add_argument("--output", type=Path, default=Path("bench_scale.json"))
+    args = parser.parse_args()
+    try:
+        sizes = parse_sizes(args.sizes)
+    except ValueError as e:
+        parser.error(str(e))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        dataset: Dict[str, Any]
+        if args.file:
+            path = args.file
+            records = args.records or count_lines(path)
+            dataset = {"file": str(path)}
+        else:
+            path = Path(tmp) / ("records.txt.gz" if args.gzip else "records.txt")
+            records = args.records or 10_000_000
+            start = time.perf_counter()
+            stats = generate(
+                path, records, sizes, args.duplicate_rate, args.duplicate_window, args.seed
+            )
+            print(
+                f"Generated {records:,} records ({stats.distinct:,} distinct,"
+                f" {stats.bytes / 1e6:,.1f} MB) in {time.perf_counter() - start:.1f}s"
+            )
+            dataset = {
+                "sizes": args.sizes,
+                "duplicate_rate": args.duplicate_rate,
+                "duplicate_window": args.duplicate_window,
+                "seed": args.seed,
+                "gzip": args.gzip,
+                "distinct": stats.distinct,
+                "bytes": stats.bytes,
+            }
+
+        async with AsyncExitStack() as stack:
+            if args.address:
+                address = args.address
+                client = await Client.connect(address)
+            else:
+                env = await stack.enter_async_context(await WorkflowEnvironment.start_local())
+                client = env.client
+                address = client.service_client.config.target_host
+            result = await run(client, address, str(path), records, args)
+
+    print_result(result)
+    settings = {
+        name: getattr(args, name)
+        for name in ("mode", "batch_size", "window", "max_history_length", "sink", "workers")
+    }
+    args.output.write_text(
+        json.dumps(
+            {
+                "commit": git_commit(),
+                "created": datetime.now(timezone.utc).isoformat(),
+                "python": platform.python_version(),
+                "dataset": dataset,
+                "settings": {**settings, "real_transform": args.real_transform},
+                "result": result,
+            },
+            indent=2,
+        )
+    )
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""Compare the windowed parent workflow with the record-level work pool.
+
+Runs the same words through BatchParentWorkflow (a window of whole child
+batches) and RecordPoolWorkflow (a pool of record activities) using the
+real process_record activity and its skewed latency, and reports wall time,
+records/sec and the average number of record activities in flight relative
+to the configured concurrency. Without --address a local dev server is
+started.
+"""
+
+import argparse
+import asyncio
+import time
+import uuid
+from contextlib import AsyncExitStack
+
+from temporalio import activity
+from temporalio.client import Client
+from temporalio.testing import WorkflowEnvironment
+from temporalio.worker import Worker
+
+from temporal_batch import activities
+from temporal_batch.shared import BatchParentWorkflowParams, RecordPoolWorkflowParams
+from temporal_batch.workflows import (
+    BATCH_SIZE,
+    WINDOW_SIZE,
+    BatchChildWorkflow,
+    BatchParentWorkflow,
+    RecordPoolWorkflow,
+)
+
+TASK_QUEUE = "bench-scheduling"
+
+# Seconds spent inside process_record, summed across all calls
+busy = 0.0
+
+
+@activity.defn(name="process_record")
+async def timed_process_record(record: str) -> str:
+    """Run the real process_record and add its duration to busy."""
+    global busy
+    start = time.perf_counter()
+    try:
+        return await activities.process_record(record)
+    finally:
+        busy += time.perf_counter() - start
+
+
+async def run_case(client: Client, name: str, run, params, concurrency: int, words: int) -> None:
+    """Run one workflow to completion and print a result row."""
+    global busy
+    busy = 0.0
+    start = time.perf_counter()
+    await client.execute_workflow(run, params, id=f"bench-{name}-{uuid.uuid4()}", task_queue=TASK_QUEUE)
+    elapsed = time.perf_counter() - start
+    utilization = busy / elapsed / concurrency
+    print(f"{name:>8} {elapsed:>10.2f} {words / elapsed:>12.1f} {utilization:>12.0%}")
+
+
+async def main() -> None:
+    """Run both scheduling modes over the same words."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--address", help="existing Temporal server, e.g. localhost:7233")
+    parser.add_argument("--words", type=int, default=2000)
+    parser.add_argument("--window", type=int, default=WINDOW_SIZE, help="children in flight")
+    args = parser.parse_args()
+    concurrency = args.window * BATCH_SIZE
+
+    async with AsyncExitStack() as stack:
+        if args.address:
+            client = await Client.connect(args.address)
+        else:
+            env = await stack.enter_async_context(await WorkflowEnvironment.start_local())
+            client = env.client
+        await stack.enter_async_context(
+            Worker(
+                client,
+                task_queue=TASK_QUEUE,
+                workflows=[BatchParentWorkflow, BatchChildWorkflow, RecordPoolWorkflow],
+                activities=[activities.create_single_batch, activities.read_batches, timed_process_record],
+                max_concurrent_activities=concurrency * 2,
+            )
+        )
+
+        print(f"{'mode':>8} {'seconds':>10} {'records/s':>12} {'utilization':>12}")
+        await run_case(
+            client,
+            "window",
+            BatchParentWorkflow.run,
+            BatchParentWorkflowParams(
+                args.words, min_window_size=args.window, max_window_size=args.window
+            ),
+            concurrency,
+            args.words,
+        )
+        await run_case(
+            client,
+            "pool",
+            RecordPoolWorkflow.run,
+            RecordPoolWorkflowParams(args.words, pool_size=concurrency),
+            concurrency,
+            args.words,
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
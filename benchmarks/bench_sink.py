@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""Measure the write throughput of the result sinks.
+
+Writes the uppercased words of a synthetic dataset to each sink kind in
+batches of several sizes, with and without fsync, and reports records and
+megabytes per second. Two reference points show what the sink's design is
+worth: appending each record with a write of its own, as a per-record
+activity would, and writing every batch a second time, which the sink skips
+as duplicates.
+
+Run from the repository root with ``python -m benchmarks.bench_sink``; it
+shares the words file writer with bench_batch_read.
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, List
+
+from benchmarks.bench_batch_read import write_words
+from temporal_batch.sinks import SINKS, JsonLinesSink, open_sink
+
+
+def per_record(path: Path, results: List[str], fsync: bool) -> None:
+    """Append each result to path as a JSON Lines row with a write and flush of its own."""
+    encode = JsonLinesSink(path.parent).encode
+    with open(path, "ab") as f:
+        for offset, result in enumerate(results):
+            f.write(encode(offset, [result]))
+            f.flush()
+            if fsync:
+                os.fsync(f.fileno())
+
+
+def timed(fn: Callable[[], object]) -> float:
+    """Return the wall time of fn() in seconds."""
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    """Print records/s and MB/s for each sink, batch size and fsync setting."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--records", type=int, default=50_000, help="records written per run")
+    parser.add_argument("--batch-sizes", default="10,50,200,1000")
+    parser.add_argument(
+        "--fsync-records",
+        type=int,
+        default=5_000,
+        help="records written per run with fsync, which is much slower",
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        words_file = Path(tmp) / "words.txt"
+        write_words(words_file, args.records)
+        results = [line.strip().upper() for line in open(words_file)]
+
+        print(f"{'sink':>8} {'fsync':>6} {'batch':>6} {'records/s':>12} {'MB/s':>8} {'dup records/s':>14}")
+        for fsync in (False, True):
+            records = results if not fsync else results[: args.fsync_records]
+            for kind in SINKS:
+                for batch_size in (int(size) for size in args.batch_sizes.split(",")):
+                    directory = Path(tmp) / f"{kind}-{fsync}-{batch_size}"
+                    # A temporary directory on this host, written by this process only
+                    sink = open_sink(f"{kind}:{directory}?fsync={fsync}&shared=false")
+                    batches = [
+                        (offset, records[offset : offset + batch_size])
+                        for offset in range(0, len(records), batch_size)
+                    ]
+
+                    def write_all() -> None:
+                        for offset, batch in batches:
+                            sink.write("bench", offset, batch)
+
+                    elapsed = timed(write_all)
+                    duplicate = timed(write_all)
+                    size = sink.path("bench").stat().st_size / 1e6
+                    print(
+                        f"{kind:>8} {str(fsync):>6} {batch_size:>6} {len(records) / elapsed:>12,.0f}"
+                        f" {size / elapsed:>8.1f} {len(records) / duplicate:>14,.0f}"
+                    )
+            path = Path(tmp) / f"per-record-{fsync}.jsonl"
+            elapsed = timed(lambda: per_record(path, records, fsync))
+            size = path.stat().st_size / 1e6
+            print(
+                f"{'record':>8} {str(fsync):>6} {1:>6} {len(records) / elapsed:>12,.0f}"
+                f" {size / elapsed:>8.1f} {'-':>14}"
+            )
+
+
+if __name__ == "__main__":
+    main()
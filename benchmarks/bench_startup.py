@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""Measure worker startup time and the sandbox cost of starting a workflow run.
+
+A worker's startup is dominated by importing the package and by the SDK
+validating each workflow, which instantiates it once in the sandbox. Every
+workflow run after that gets a sandbox of its own, in which the workflow's
+module and everything it imports that isn't passed through is imported
+again. The first table times, in fresh interpreters, importing the worker
+script's modules and then validating its workflows. The second times that
+instantiation per workflow class, which is the same cost every new run pays,
+and counts the modules imported into the sandbox for it.
+
+Run it before and after a change to the workflows' imports to compare.
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List, Tuple
+
+from temporalio import workflow
+from temporalio.worker.workflow_sandbox import SandboxedWorkflowRunner
+from temporalio.worker.workflow_sandbox._importer import Importer
+
+from temporal_batch.workflows import (
+    BatchChildWorkflow,
+    BatchParentWorkflow,
+    RecordPoolWorkflow,
+    ShardedBatchWorkflow,
+)
+
+WORKFLOWS = [BatchParentWorkflow, BatchChildWorkflow, RecordPoolWorkflow, ShardedBatchWorkflow]
+
+# Run in a fresh interpreter; prints the seconds spent importing and validating
+COLD_START = """
+import asyncio, json, time
+start = time.perf_counter()
+import scripts.start_worker as start_worker
+from temporalio import workflow
+from temporalio.worker.workflow_sandbox import SandboxedWorkflowRunner
+imported = time.perf_counter()
+
+async def validate():
+    runner = SandboxedWorkflowRunner()
+    for name in {names!r}:
+        runner.prepare_workflow(workflow._Definition.must_from_class(getattr(start_worker, name)))
+
+asyncio.run(validate())
+print(json.dumps({{"import": imported - start, "validate": time.perf_counter() - imported}}))
+"""
+
+
+def cold_start(repeat: int) -> List[Dict[str, float]]:
+    """Return the import, validation and process seconds of repeat fresh worker processes."""
+    code = COLD_START.format(names=[cls.__name__ for cls in WORKFLOWS])
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        output = subprocess.run(
+            [sys.executable, "-c", code], check=True, capture_output=True, text=True
+        ).stdout
+        run = json.loads(output)
+        run["process"] = time.perf_counter() - start
+        runs.append(run)
+    return runs
+
+
+def sandbox_run(cls: Any, repeat: int) -> Tuple[float, int]:
+    """Return the median ms to instantiate cls in a new sandbox and the modules imported into it.
+
+    Instantiation needs a running event loop, as it has on the worker.
+    """
+    runner = SandboxedWorkflowRunner()
+    defn = workflow._Definition.must_from_class(cls)
+    runner.prepare_workflow(defn)
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        runner.prepare_workflow(defn)
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times), sandbox_modules(runner, defn)
+
+
+def sandbox_modules(runner: SandboxedWorkflowRunner, defn: Any) -> int:
+    """Return the number of modules a new sandbox for defn imports itself rather than passes through."""
+    importers: List[Importer] = []
+    original = Importer.__init__
+
+    def recording(self: Importer, *args: Any, **kwargs: Any) -> None:
+        original(self, *args, **kwargs)
+        importers.append(self)
+
+    Importer.__init__ = recording  # type: ignore[method-assign]
+    try:
+        runner.prepare_workflow(defn)
+    finally:
+        Importer.__init__ = original  # type: ignore[method-assign]
+    return sum(
+        module is not sys.modules.get(name)
+        for importer in importers
+        for name, module in importer.new_modules.items()
+        if name != "__main__"
+    )
+
+
+async def main() -> None:
+    """Print cold startup times and per-run sandbox costs."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--processes", type=int, default=5, help="fresh worker processes timed")
+    parser.add_argument("--repeat", type=int, default=50, help="sandbox instantiations per workflow")
+    args = parser.parse_args()
+
+    runs = cold_start(args.processes)
+    print(f"{'cold start':>22} {'median s':>9} {'min s':>9}")
+    for key in ("import", "validate", "process"):
+        values = [run[key] for run in runs]
+        print(f"{key:>22} {statistics.median(values):>9.3f} {min(values):>9.3f}")
+
+    print()
+    print(f"{'workflow':>22} {'ms/run':>9} {'modules':>9}")
+    for cls in WORKFLOWS:
+        ms, modules = sandbox_run(cls, args.repeat)
+        print(f"{cls.__name__:>22} {ms:>9.2f} {modules:>9}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
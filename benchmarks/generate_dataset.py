@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""Generate a large synthetic input file, one record per line.
+
+The same arguments always produce the same file, so results from runs on
+different commits or hosts compare like with like. Record lengths follow a
+size distribution given as a spec:
+
+- ``fixed:N``: every record is N characters
+- ``uniform:MIN-MAX`` (default ``uniform:3-12``, like the words file): lengths
+  drawn uniformly from MIN to MAX
+- ``lognormal:MEDIAN:SIGMA``: lengths drawn from a log-normal distribution,
+  mostly near MEDIAN with a long tail of large records
+
+With ``--duplicate-rate R`` each record is, with probability R, a repeat of
+one of the last ``--duplicate-window`` distinct records, which exercises the
+record cache. Every other record is distinct: it starts with its own
+sequence number in base 26, as many letters wide as the largest needs, and
+is padded with random lowercase letters to its drawn length. A path ending
+in ``.gz`` is written gzip-compressed.
+"""
+
+import argparse
+import gzip
+import math
+import random
+import string
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import IO, List
+
+SIZE_FIXED = "fixed"
+SIZE_UNIFORM = "uniform"
+SIZE_LOGNORMAL = "lognormal"
+DEFAULT_SIZES = "uniform:3-12"
+# Distinct records a duplicate is drawn from by default
+DUPLICATE_WINDOW = 100_000
+# Random letters that records are padded with; drawing them per character
+# would dominate the time to write a large file
+FILLER_SIZE = 1 << 16
+# Records joined into each write
+CHUNK_RECORDS = 10_000
+
+
+@dataclass(frozen=True)
+class SizeDistribution:
+    kind: str
+    first: float
+    second: float = 0.0
+
+    def sample(self, rng: random.Random) -> int:
+        """Return a record length of at least 1."""
+        if self.kind == SIZE_FIXED:
+            return int(self.first)
+        if self.kind == SIZE_UNIFORM:
+            return rng.randint(int(self.first), int(self.second))
+        return max(1, round(rng.lognormvariate(math.log(self.first), self.second)))
+
+
+def parse_sizes(spec: str) -> SizeDistribution:
+    """Parse a size distribution spec, raising ValueError if it is invalid."""
+    kind, _, params = spec.partition(":")
+    try:
+        if kind == SIZE_FIXED:
+            sizes = SizeDistribution(kind, int(params))
+            valid = sizes.first >= 1
+        elif kind == SIZE_UNIFORM:
+            low, _, high = params.partition("-")
+            sizes = SizeDistribution(kind, int(low), int(high))
+            valid = 1 <= sizes.first <= sizes.second
+        elif kind == SIZE_LOGNORMAL:
+            median, _, sigma = params.partition(":")
+            sizes = SizeDistribution(kind, float(median), float(sigma))
+            valid = sizes.first >= 1 and sizes.second >= 0
+        else:
+            raise ValueError(f"Unknown size distribution {kind!r}")
+    except ValueError as e:
+        raise ValueError(f"Invalid size distribution {spec!r}: {e}") from None
+    if not valid:
+        raise ValueError(f"Invalid size distribution {spec!r}")
+    return sizes
+
+
+@dataclass
+class DatasetStats:
+    records: int = 0
+    distinct: int = 0
+    bytes: int = 0
+
+
+def _letters(number: int, width: int) -> str:
+    """Return number written in base 26 with the letters a to z, padded to width."""
+    digits = []
+    for _ in range(width):
+        number, digit = divmod(number, 26)
+        digits.append(string.ascii_lowercase[digit])
+    return "".join(reversed(digits))
+
+
+def generate(
+    path: Path,
+    records: int,
+    sizes: SizeDistribution = parse_sizes(DEFAULT_SIZES),
+    duplicate_rate: float = 0.0,
+    duplicate_window: int = DUPLICATE_WINDOW,
+    seed: int = 0,
+) -> DatasetStats:
+    """Write records to path, returning how many were distinct and the bytes written."""
+    if not 0 <= duplicate_rate < 1:
+        raise ValueError(f"duplicate_rate must be in [0, 1), got {duplicate_rate}")
+    if duplicate_window < 1:
+        raise ValueError(f"duplicate_window must be at least 1, got {duplicate_window}")
+    rng = random.Random(seed)
+    # Sequence numbers all have the same width, so no record is another's prefix
+    width = max(1, math.ceil(math.log(max(records, 1), 26)))
+    # Doubled so a slice of up to FILLER_SIZE can start anywhere in the first half
+    filler = "".join(rng.choices(string.ascii_lowercase, k=FILLER_SIZE)) * 2
+    # Ring buffer of the last duplicate_window distinct records
+    recent: List[str] = []
+    stats = DatasetStats()
+
+    def pad(length: int) -> str:
+        if length <= FILLER_SIZE:
+            start = rng.randrange(FILLER_SIZE)
+            return filler[start : start + length]
+        return (filler * (length // len(filler) + 1))[:length]
+
+    f: IO[str]
+    f = gzip.open(path, "wt", compresslevel=1) if path.suffix == ".gz" else open(path, "w")
+    with f:
+        chunk: List[str] = []
+        for _ in range(records):
+            if recent and rng.random() < duplicate_rate:
+                record = recent[rng.randrange(len(recent))]
+            else:
+                record = _letters(stats.distinct, width)
+                length = sizes.sample(rng)
+                if length > len(record):
+                    record += pad(length - len(record))
+                if len(recent) < duplicate_window:
+                    recent.append(record)
+                else:
+                    recent[stats.distinct % duplicate_window] = record
+                stats.distinct += 1
+            chunk.append(record)
+            if len(chunk) == CHUNK_RECORDS:
+                stats.bytes += f.write("\n".join(chunk) + "\n")
+                chunk = []
+        if chunk:
+            stats.bytes += f.write("\n".join(chunk) + "\n")
+    stats.records = records
+    return stats
+
+
+def main() -> None:
+    """Generate the file and print its size."""
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("path", type=Path, help="file to write; .gz is gzip-compressed")
+    parser.add_argument("--records", type=int, default=10_000_000)
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="record size distribution")
+    parser.add_argument("--duplicate-rate", type=float, default=0.0)
+    parser.add_argument("--duplicate-window", type=int, default=DUPLICATE_WINDOW)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    try:
+        sizes = parse_sizes(args.sizes)
+        start = time.perf_counter()
+        stats = generate(
+            args.path, args.records, sizes, args.duplicate_rate, args.duplicate_window, args.seed
+        )
+    except ValueError as e:
+        parser.error(str(e))
+    elapsed = time.perf_counter() - start
+    print(
+        f"Wrote {stats.records:,} records ({stats.distinct:,} distinct,"
+        f" {stats.bytes / 1e6:,.1f} MB of text) to {args.path} in {elapsed:.1f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
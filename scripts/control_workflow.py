@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""Pause, resume, resize or check the progress of a running batch parent workflow."""
+
+import argparse
+import asyncio
+from typing import Optional
+
+from temporalio.client import Client
+
+from temporal_batch.codec import COMPRESSION_ALGORITHMS, compression_data_converter
+from temporal_batch.shared import ADDRESS, BatchProgress, ResizeRequest
+from temporal_batch.workflows import BatchParentWorkflow
+
+
+def parse_args() -> argparse.Namespace:
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Control a running BatchParentWorkflow.")
+    parser.add_argument("workflow_id", help="ID of the parent workflow, as printed by run_workflow.py")
+    parser.add_argument(
+        "--compression",
+        choices=COMPRESSION_ALGORITHMS,
+        help="decode compressed query results; needed only if workers compress small payloads",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("pause", help="stop starting child workflows; running ones finish")
+    commands.add_parser("resume", help="start child workflows again")
+    commands.add_parser("status", help="print progress, throughput and ETA")
+    resize = commands.add_parser("resize", help="change the window bounds or batch size")
+    resize.add_argument("--window", type=int, help="fix the window at this many child workflows")
+    resize.add_argument("--min-window", type=int, help="minimum number of concurrent child workflows")
+    resize.add_argument("--max-window", type=int, help="maximum number of concurrent child workflows")
+    resize.add_argument("--batch-size", type=int, help="records per child workflow read from now on")
+    args = parser.parse_args()
+    if args.command == "resize":
+        if args.window is not None:
+            if args.min_window is not None or args.max_window is not None:
+                parser.error("--window can't be combined with --min-window or --max-window")
+            args.min_window = args.max_window = args.window
+        for name in ("min_window", "max_window", "batch_size"):
+            value = getattr(args, name)
+            if value is not None and value < 1:
+                parser.error(f"--{name.replace('_', '-')} must be at least 1")
+        if args.min_window is not None and args.max_window is not None:
+            if args.max_window < args.min_window:
+                parser.error("--max-window must be at least --min-window")
+        if args.min_window is None and args.max_window is None and args.batch_size is None:
+            parser.error("resize needs --window, --min-window, --max-window or --batch-size")
+    return args
+
+
+def format_eta(eta: Optional[float]) -> str:
+    """Format an ETA in seconds as hours, minutes and seconds."""
+    if eta is None:
+        return "unknown"
+    minutes, seconds = divmod(int(eta), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}h{minutes:02d}m{seconds:02d}s" if hours else f"{minutes}m{seconds:02d}s"
+
+
+def print_progress(progress: BatchProgress) -> None:
+    """Print the parent's progress query result."""
+    done = progress.completed_records / progress.num_words if progress.num_words else 1.0
+    state = "paused" if progress.paused else "running"
+    print(f"{state}: {progress.completed_records}/{progress.num_words} records ({done:.1%})")
+    print(f"next offset {progress.offset}, {progress.in_flight} children in flight")
+    print(f"window {progress.window_size}, batch size {progress.batch_size}")
+    print(f"throughput {progress.throughput:.1f} records/s, ETA {format_eta(progress.eta)}")
+
+
+async def main() -> None:
+    """Send the requested signal or query to the workflow."""
+    args = parse_args()
+    data_converter, _ = compression_data_converter(args.compression)
+    client = await Client.connect(ADDRESS, data_converter=data_converter)
+    handle = client.get_workflow_handle_for(BatchParentWorkflow.run, args.workflow_id)
+
+    if args.command == "pause":
+        await handle.signal(BatchParentWorkflow.pause)
+    elif args.command == "resume":
+        await handle.signal(BatchParentWorkflow.resume)
+    elif args.command == "resize":
+        await handle.signal(
+            BatchParentWorkflow.resize,
+            ResizeRequest(args.min_window, args.max_window, args.batch_size),
+        )
+    print_progress(await handle.query(BatchParentWorkflow.progress))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
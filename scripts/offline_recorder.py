@@ -0,0 +1,930 @@
+"""Record workflow histories in-process, without a Temporal server.
+
+OfflineRecorder runs workflows through the SDK's own workflow runner, as a
+worker does, and plays the server's part around them. It appends the events
+a server records for each command a workflow task completes with, and runs
+activities with stand-in functions on a simulated clock. It starts children
+and routes signals, cancellations and results back to the workflows as
+events and activations. Each run's history can then be written out and
+replayed like a history fetched from a server.
+
+Workflow time is simulated, so recording takes seconds and gives the same
+history every time. The recorder covers the commands the batch workflows
+issue and raises on any other. Activities never fail, time out or retry, and
+local activities aren't supported. It drives the SDK's internal workflow
+instance API as of temporalio 1.17, so re-record and replay after an SDK
+upgrade to check it still matches.
+"""
+
+import asyncio
+import heapq
+import itertools
+import re
+import struct
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import temporalio.common
+from google.protobuf.message import Message
+from temporalio import workflow
+from temporalio.api.common.v1 import ActivityType, Payloads, WorkflowExecution, WorkflowType
+from temporalio.api.enums.v1 import (
+    CancelExternalWorkflowExecutionFailedCause,
+    EventType,
+    SignalExternalWorkflowExecutionFailedCause,
+    StartChildWorkflowExecutionFailedCause,
+)
+from temporalio.api.failure.v1 import Failure
+from temporalio.api.history import v1 as history
+from temporalio.api.sdk.v1 import WorkflowTaskCompletedMetadata
+from temporalio.api.taskqueue.v1 import TaskQueue
+from temporalio.bridge.proto import child_workflow
+from temporalio.bridge.proto import workflow_activation as activation
+from temporalio.bridge.proto import workflow_commands as commands
+from temporalio.bridge.proto import workflow_completion
+from temporalio.bridge.proto.child_workflow import ParentClosePolicy
+from temporalio.client import WorkflowHistory
+from temporalio.converter import DataConverter
+from temporalio.exceptions import ApplicationError
+from temporalio.worker._workflow_instance import WorkflowInstance, WorkflowInstanceDetails
+from temporalio.worker.workflow_sandbox import SandboxedWorkflowRunner
+
+NAMESPACE = "default"
+# Simulated time of the first event
+START_TIME = datetime(2024, 1, 1, tzinfo=timezone.utc)
+WORKFLOW_TASK_TIMEOUT = timedelta(seconds=10)
+# SDK core flags a current worker records on a run's first workflow task. With
+# flag 1 replay compares the IDs and types of activities and children
+CORE_USED_FLAGS = [1, 2, 3]
+# A server's default thresholds for suggesting continue-as-new
+SUGGEST_CONTINUE_AS_NEW_EVENTS = 4 * 1024
+SUGGEST_CONTINUE_AS_NEW_BYTES = 4 * 1024 * 1024
+# Workflow tasks after which run() gives up on a workflow that never finishes
+MAX_WORKFLOW_TASKS = 1_000_000
+
+_converter = DataConverter.default
+_MASK_64 = (1 << 64) - 1
+
+# Event attributes message name -> its field in HistoryEvent
+_ATTRIBUTE_FIELDS = {
+    field.message_type.name: field.name
+    for field in history.HistoryEvent.DESCRIPTOR.oneofs_by_name["attributes"].fields
+    if field.message_type is not None
+}
+
+
+def _event_type(attributes: Message) -> "EventType.ValueType":
+    """Return the event type whose attributes message attributes is."""
+    name = attributes.DESCRIPTOR.name.removesuffix("EventAttributes")
+    return EventType.Value("EVENT_TYPE_" + re.sub(r"(?<!^)(?=[A-Z])", "_", name).upper())
+
+
+def _randomness_seed(run_id: str) -> int:
+    """Return the seed core derives from run_id on replay.
+
+    That is Rust's SipHash-1-3 with zero keys of the string, whose hash is its
+    UTF-8 bytes and a 0xff byte. Workflow random numbers and UUIDs, such as
+    the default child workflow IDs, come from this seed.
+    """
+    data = run_id.encode() + b"\xff"
+    v = [0x736F6D6570736575, 0x646F72616E646F6D, 0x6C7967656E657261, 0x7465646279746573]
+
+    def rotate(x: int, bits: int) -> int:
+        return ((x << bits) | (x >> (64 - bits))) & _MASK_64
+
+    def sip_round() -> None:
+        v[0] = (v[0] + v[1]) & _MASK_64
+        v[1] = rotate(v[1], 13) ^ v[0]
+        v[0] = rotate(v[0], 32)
+        v[2] = (v[2] + v[3]) & _MASK_64
+        v[3] = rotate(v[3], 16) ^ v[2]
+        v[0] = (v[0] + v[3]) & _MASK_64
+        v[3] = rotate(v[3], 21) ^ v[0]
+        v[2] = (v[2] + v[1]) & _MASK_64
+        v[1] = rotate(v[1], 17) ^ v[2]
+        v[2] = rotate(v[2], 32)
+
+    whole = len(data) - len(data) % 8
+    words = [struct.unpack_from("<Q", data, i)[0] for i in range(0, whole, 8)]
+    words.append((len(data) & 0xFF) << 56 | int.from_bytes(data[whole:], "little"))
+    for word in words:
+        v[3] ^= word
+        sip_round()
+        v[0] ^= word
+    v[2] ^= 0xFF
+    for _ in range(3):
+        sip_round()
+    return v[0] ^ v[1] ^ v[2] ^ v[3]
+
+
+def _payloads(values: Sequence[Any]) -> Payloads:
+    return Payloads(payloads=_converter.payload_converter.to_payloads(list(values)))
+
+
+def _failure(error: BaseException) -> Failure:
+    failure = Failure()
+    _converter.failure_converter.to_failure(error, _converter.payload_converter, failure)
+    return failure
+
+
+def _cancelled_failure(message: str) -> Failure:
+    failure = _failure(asyncio.CancelledError(message))
+    failure.canceled_failure_info.SetInParent()
+    return failure
+
+
+class _Activity:
+    """An activity scheduled by a run, until it is resolved."""
+
+    def __init__(self, scheduled_event_id: int, cancellation_type: int) -> None:
+        self.scheduled_event_id = scheduled_event_id
+        self.cancellation_type = cancellation_type
+        self.cancelled = False
+
+
+class _Child:
+    """A child started by a run: where its result goes once it closes."""
+
+    def __init__(self, parent: "_Run", seq: int, initiated_event_id: int, policy: int) -> None:
+        self.parent = parent
+        self.seq = seq
+        self.initiated_event_id = initiated_event_id
+        self.started_event_id = 0
+        self.policy = policy
+
+
+class _Run:
+    """One run of a workflow: its history, its workflow instance and the jobs of its next task."""
+
+    def __init__(
+        self,
+        workflow_id: str,
+        run_id: str,
+        workflow_type: str,
+        task_queue: str,
+        child: Optional[_Child] = None,
+    ) -> None:
+        self.workflow_id = workflow_id
+        self.run_id = run_id
+        self.workflow_type = workflow_type
+        self.task_queue = task_queue
+        # Set for the runs of a child, including its runs after continue-as-new
+        self.child = child
+        self.events: List[history.HistoryEvent] = []
+        self.jobs: List[activation.WorkflowActivationJob] = []
+        self.instance: Optional[WorkflowInstance] = None
+        self.closed = False
+        self.workflow_tasks = 0
+        self.activities: Dict[int, _Activity] = {}
+        # Timer seq -> started event ID, while the timer is pending
+        self.timers: Dict[int, int] = {}
+        self.children: Dict[int, _Child] = {}
+
+    def add(self, attributes: Message, now: datetime) -> int:
+        """Append an event with attributes at now and return its event ID."""
+        event = history.HistoryEvent(
+            event_id=len(self.events) + 1, event_type=_event_type(attributes)
+        )
+        getattr(event, _ATTRIBUTE_FIELDS[attributes.DESCRIPTOR.name]).CopyFrom(attributes)
+        event.event_time.FromDatetime(now)
+        self.events.append(event)
+        return event.event_id
+
+    def execution(self) -> WorkflowExecution:
+        return WorkflowExecution(workflow_id=self.workflow_id, run_id=self.run_id)
+
+
+class OfflineRecorder:
+    """Run workflows against stand-in activities and record their histories.
+
+    activities maps activity names to plain functions that return the
+    activity's result, and seconds(name, args) gives the simulated time each
+    call takes. Like a worker's, the workflow instances need a running event
+    loop, so create and run the recorder inside one.
+    """
+
+    def __init__(
+        self,
+        workflows: Sequence[type],
+        activities: Dict[str, Callable[..., Any]],
+        seconds: Callable[[str, List[Any]], float],
+        task_queue: str = "offline-recorder",
+    ) -> None:
+        self._runner = SandboxedWorkflowRunner()
+        self._definitions: Dict[str, workflow._Definition] = {}
+        for cls in workflows:
+            definition = workflow._Definition.must_from_class(cls)
+            self._runner.prepare_workflow(definition)
+            if definition.name is None:
+                raise ValueError(f"{cls.__name__} is a dynamic workflow")
+            self._definitions[definition.name] = definition
+        self._activities = activities
+        self._seconds = seconds
+        self._task_queue = task_queue
+        self._now = START_TIME
+        # (time, order, callback) of what happens next on the simulated clock
+        self._timeline: List[Tuple[datetime, int, Callable[[], None]]] = []
+        self._order = itertools.count()
+        self._runs: List[_Run] = []
+        # Workflow ID -> its latest run
+        self._current: Dict[str, _Run] = {}
+
+    def start(self, cls: type, workflow_id: str, *args: Any) -> None:
+        """Start the workflow cls with args."""
+        definition = workflow._Definition.must_from_class(cls)
+        assert definition.name is not None
+        self._start_run(workflow_id, definition.name, self._task_queue, _payloads(args))
+
+    def cancel_at(self, seconds: float, workflow_id: str) -> None:
+        """Request cancellation of workflow_id once seconds have passed since the start."""
+
+        def cancel() -> None:
+            run = self._current[workflow_id]
+            if not run.closed:
+                run.add(history.WorkflowExecutionCancelRequestedEventAttributes(), self._now)
+                run.jobs.append(
+                    activation.WorkflowActivationJob(cancel_workflow=activation.CancelWorkflow())
+                )
+
+        heapq.heappush(
+            self._timeline, (START_TIME + timedelta(seconds=seconds), next(self._order), cancel)
+        )
+
+    async def run(self) -> None:
+        """Run workflow tasks and advance the clock until nothing is left to happen."""
+        tasks = 0
+        while True:
+            ready = [run for run in self._runs if run.jobs and not run.closed]
+            for run in ready:
+                self._workflow_task(run)
+                tasks += 1
+            if tasks > MAX_WORKFLOW_TASKS:
+                raise RuntimeError(f"Gave up after {tasks} workflow tasks")
+            if ready:
+                continue
+            if not self._timeline:
+                return
+            at, _, callback = heapq.heappop(self._timeline)
+            self._now = max(self._now, at)
+            callback()
+
+    def histories(self, workflow_id: str) -> List[WorkflowHistory]:
+        """Return the histories of each run of workflow_id, in the order they ran."""
+        return [
+            WorkflowHistory(workflow_id, list(run.events))
+            for run in self._runs
+            if run.workflow_id == workflow_id
+        ]
+
+    def _later(self, seconds: float, callback: Callable[[], None]) -> None:
+        heapq.heappush(
+            self._timeline, (self._now + timedelta(seconds=seconds), next(self._order), callback)
+        )
+
+    def _start_run(
+        self,
+        workflow_id: str,
+        workflow_type: str,
+        task_queue: str,
+        input: Payloads,
+        child: Optional[_Child] = None,
+        previous: Optional[_Run] = None,
+    ) -> _Run:
+        """Start a run of workflow_id, after previous if it continued as new."""
+        # Derived from the workflow ID, so that a recording always gives the same history
+        run_id = str(uuid.uuid5(uuid.NAMESPACE_URL, f"{workflow_id}/{len(self._runs)}"))
+        run = _Run(workflow_id, run_id, workflow_type, task_queue, child)
+        first_run_id = run_id
+        if previous is not None:
+            first_run_id = previous.events[0].workflow_execution_started_event_attributes.first_execution_run_id
+        started = history.WorkflowExecutionStartedEventAttributes(
+            workflow_type=WorkflowType(name=workflow_type),
+            task_queue=TaskQueue(name=task_queue),
+            input=input,
+            original_execution_run_id=run_id,
+            first_execution_run_id=first_run_id,
+            continued_execution_run_id=previous.run_id if previous is not None else "",
+            attempt=1,
+        )
+        started.workflow_task_timeout.FromTimedelta(WORKFLOW_TASK_TIMEOUT)
+        if child is not None:
+            started.parent_workflow_namespace = NAMESPACE
+            started.parent_workflow_execution.CopyFrom(child.parent.execution())
+            started.parent_initiated_event_id = child.initiated_event_id
+        run.add(started, self._now)
+
+        init = activation.InitializeWorkflow(
+            workflow_type=workflow_type,
+            workflow_id=workflow_id,
+            arguments=list(input.payloads),
+            randomness_seed=_randomness_seed(run_id),
+            first_execution_run_id=first_run_id,
+            continued_from_execution_run_id=started.continued_execution_run_id,
+            attempt=1,
+        )
+        init.start_time.FromDatetime(self._now)
+        init.workflow_task_timeout.FromTimedelta(WORKFLOW_TASK_TIMEOUT)
+        if child is not None:
+            init.parent_workflow_info.namespace = NAMESPACE
+            init.parent_workflow_info.workflow_id = child.parent.workflow_id
+            init.parent_workflow_info.run_id = child.parent.run_id
+        run.jobs.append(activation.WorkflowActivationJob(initialize_workflow=init))
+        self._runs.append(run)
+        self._current[workflow_id] = run
+        return run
+
+    def _instance(self, run: _Run) -> WorkflowInstance:
+        """Create the workflow instance of run, as a worker does for a new run."""
+        parent = None
+        if run.child is not None:
+            parent = workflow.ParentInfo(
+                namespace=NAMESPACE,
+                run_id=run.child.parent.run_id,
+                workflow_id=run.child.parent.workflow_id,
+            )
+        started = run.events[0].workflow_execution_started_event_attributes
+        info = workflow.Info(
+            attempt=1,
+            continued_run_id=started.continued_execution_run_id or None,
+            cron_schedule=None,
+            execution_timeout=None,
+            first_execution_run_id=started.first_execution_run_id,
+            headers={},
+            namespace=NAMESPACE,
+            parent=parent,
+            root=None,
+            priority=temporalio.common.Priority.default,
+            raw_memo={},
+            retry_policy=None,
+            run_id=run.run_id,
+            run_timeout=None,
+            search_attributes={},
+            start_time=self._now,
+            task_queue=run.task_queue,
+            task_timeout=WORKFLOW_TASK_TIMEOUT,
+            typed_search_attributes=temporalio.common.TypedSearchAttributes.empty,
+            workflow_id=run.workflow_id,
+            workflow_start_time=self._now,
+            workflow_type=run.workflow_type,
+        )
+        return self._runner.create_instance(
+            WorkflowInstanceDetails(
+                payload_converter_class=_converter.payload_converter_class,
+                failure_converter_class=_converter.failure_converter_class,
+                interceptor_classes=[],
+                defn=self._definitions[run.workflow_type],
+                info=info,
+                randomness_seed=_randomness_seed(run.run_id),
+                extern_functions={
+                    "__temporal_get_metric_meter": lambda: temporalio.common.MetricMeter.noop,
+                    "__temporal_assert_local_activity_valid": lambda name: None,
+                },
+                disable_eager_activity_execution=True,
+                worker_level_failure_exception_types=[],
+            )
+        )
+
+    def _activate(
+        self, run: _Run, act: activation.WorkflowActivation
+    ) -> workflow_completion.WorkflowActivationCompletion:
+        assert run.instance is not None
+        # The instance runs its own event loop, and leaves it set as the running one
+        loop = asyncio.events._get_running_loop()
+        try:
+            return run.instance.activate(act)
+        finally:
+            asyncio.events._set_running_loop(loop)
+
+    def _workflow_task(self, run: _Run) -> None:
+        """Run a workflow task on run's pending jobs and record the commands it completes with."""
+        jobs, run.jobs = run.jobs, []
+        scheduled = run.add(
+            history.WorkflowTaskScheduledEventAttributes(
+                task_queue=TaskQueue(name=run.task_queue), attempt=1
+            ),
+            self._now,
+        )
+        size = sum(event.ByteSize() for event in run.events)
+        suggest = (
+            len(run.events) + 1 >= SUGGEST_CONTINUE_AS_NEW_EVENTS
+            or size >= SUGGEST_CONTINUE_AS_NEW_BYTES
+        )
+        started = run.add(
+            history.WorkflowTaskStartedEventAttributes(
+                scheduled_event_id=scheduled, history_size_bytes=size, suggest_continue_as_new=suggest
+            ),
+            self._now,
+        )
+        if run.instance is None:
+            run.instance = self._instance(run)
+
+        completed_commands: List[commands.WorkflowCommand] = []
+        lang_flags: List[int] = []
+        while jobs:
+            act = activation.WorkflowActivation(
+                run_id=run.run_id,
+                history_length=started,
+                history_size_bytes=size,
+                continue_as_new_suggested=suggest,
+                jobs=jobs,
+            )
+            act.timestamp.FromDatetime(self._now)
+            completion = self._activate(run, act)
+            if completion.HasField("failed"):
+                raise RuntimeError(
+                    f"Workflow task of {run.workflow_id} failed: {completion.failed.failure.message}"
+                )
+            new = [c for c in completion.successful.commands if not c.HasField("respond_to_query")]
+            completed_commands.extend(new)
+            lang_flags.extend(completion.successful.used_internal_flags)
+            # Like the SDK core, resolve activities cancelled without waiting
+            # for the cancellation in another activation of the same task
+            jobs = self._resolve_cancelled_activities(run, new)
+
+        run.workflow_tasks += 1
+        metadata = WorkflowTaskCompletedMetadata(lang_used_flags=sorted(set(lang_flags)))
+        if run.workflow_tasks == 1:
+            metadata.core_used_flags.extend(CORE_USED_FLAGS)
+        completed = run.add(
+            history.WorkflowTaskCompletedEventAttributes(
+                scheduled_event_id=scheduled, started_event_id=started, sdk_metadata=metadata
+            ),
+            self._now,
+        )
+        for command in completed_commands:
+            if run.closed:
+                break
+            self._command(run, completed, command)
+
+    def _resolve_cancelled_activities(
+        self, run: _Run, new: List[commands.WorkflowCommand]
+    ) -> List[activation.WorkflowActivationJob]:
+        jobs = []
+        for command in new:
+            if not command.HasField("request_cancel_activity"):
+                continue
+            seq = command.request_cancel_activity.seq
+            if run.activities[seq].cancellation_type != commands.ActivityCancellationType.WAIT_CANCELLATION_COMPLETED:
+                jobs.append(self._activity_cancelled(seq))
+        return jobs
+
+    @staticmethod
+    def _activity_cancelled(seq: int) -> activation.WorkflowActivationJob:
+        resolve = activation.ResolveActivity(seq=seq)
+        resolve.result.cancelled.failure.CopyFrom(_cancelled_failure("Activity cancelled"))
+        return activation.WorkflowActivationJob(resolve_activity=resolve)
+
+    def _command(self, run: _Run, completed: int, command: commands.WorkflowCommand) -> None:
+        """Record the events of command, completed by workflow task completed, and carry it out."""
+        kind = command.WhichOneof("variant")
+        if kind == "schedule_activity":
+            self._schedule_activity(run, completed, command.schedule_activity)
+        elif kind == "request_cancel_activity":
+            self._cancel_activity(run, completed, command.request_cancel_activity.seq)
+        elif kind == "start_timer":
+            self._start_timer(run, completed, command.start_timer)
+        elif kind == "cancel_timer":
+            seq = command.cancel_timer.seq
+            run.add(
+                history.TimerCanceledEventAttributes(
+                    timer_id=str(seq),
+                    started_event_id=run.timers.pop(seq),
+                    workflow_task_completed_event_id=completed,
+                ),
+                self._now,
+            )
+        elif kind == "start_child_workflow_execution":
+            self._start_child(run, completed, command.start_child_workflow_execution)
+        elif kind == "signal_external_workflow_execution":
+            self._signal_external(run, completed, command.signal_external_workflow_execution)
+        elif kind == "request_cancel_external_workflow_execution":
+            self._cancel_external(run, completed, command.request_cancel_external_workflow_execution)
+        elif kind == "complete_workflow_execution":
+            result = Payloads()
+            if command.complete_workflow_execution.HasField("result"):
+                result.payloads.append(command.complete_workflow_execution.result)
+            run.add(
+                history.WorkflowExecutionCompletedEventAttributes(
+                    result=result, workflow_task_completed_event_id=completed
+                ),
+                self._now,
+            )
+            self._close(run)
+        elif kind == "fail_workflow_execution":
+            run.add(
+                history.WorkflowExecutionFailedEventAttributes(
+                    failure=command.fail_workflow_execution.failure,
+                    workflow_task_completed_event_id=completed,
+                ),
+                self._now,
+            )
+            self._close(run)
+        elif kind == "cancel_workflow_execution":
+            run.add(
+                history.WorkflowExecutionCanceledEventAttributes(
+                    workflow_task_completed_event_id=completed
+                ),
+                self._now,
+            )
+            self._close(run)
+        elif kind == "continue_as_new_workflow_execution":
+            self._continue_as_new(run, completed, command.continue_as_new_workflow_execution)
+        else:
+            raise NotImplementedError(f"{run.workflow_type} issued unsupported command {kind}")
+
+    def _schedule_activity(
+        self, run: _Run, completed: int, command: commands.ScheduleActivity
+    ) -> None:
+        scheduled = history.ActivityTaskScheduledEventAttributes(
+            activity_id=command.activity_id,
+            activity_type=ActivityType(name=command.activity_type),
+            task_queue=TaskQueue(name=command.task_queue or run.task_queue),
+            input=Payloads(payloads=command.arguments),
+            workflow_task_completed_event_id=completed,
+        )
+        for timeout in (
+            "schedule_to_close_timeout",
+            "schedule_to_start_timeout",
+            "start_to_close_timeout",
+            "heartbeat_timeout",
+        ):
+            if command.HasField(timeout):
+                getattr(scheduled, timeout).CopyFrom(getattr(command, timeout))
+        if command.HasField("retry_policy"):
+            scheduled.retry_policy.CopyFrom(command.retry_policy)
+        scheduled_event_id = run.add(scheduled, self._now)
+        activity = _Activity(scheduled_event_id, command.cancellation_type)
+        run.activities[command.seq] = activity
+
+        args = _converter.payload_converter.from_payloads(list(command.arguments))
+        result = self._activities[command.activity_type](*args)
+
+        def complete() -> None:
+            if activity.cancelled or run.closed:
+                return
+            del run.activities[command.seq]
+            started = run.add(
+                history.ActivityTaskStartedEventAttributes(
+                    scheduled_event_id=scheduled_event_id, attempt=1
+                ),
+                self._now,
+            )
+            payloads = _payloads([result])
+            run.add(
+                history.ActivityTaskCompletedEventAttributes(
+                    result=payloads,
+                    scheduled_event_id=scheduled_event_id,
+                    started_event_id=started,
+                ),
+                self._now,
+            )
+            resolve = activation.ResolveActivity(seq=command.seq)
+            resolve.result.completed.result.CopyFrom(payloads.payloads[0])
+            run.jobs.append(activation.WorkflowActivationJob(resolve_activity=resolve))
+
+        self._later(self._seconds(command.activity_type, args), complete)
+
+    def _cancel_activity(self, run: _Run, completed: int, seq: int) -> None:
+        activity = run.activities.pop(seq)
+        activity.cancelled = True
+        if activity.cancellation_type == commands.ActivityCancellationType.ABANDON:
+            # Abandoned without telling the server
+            return
+        requested = run.add(
+            history.ActivityTaskCancelRequestedEventAttributes(
+                scheduled_event_id=activity.scheduled_event_id,
+                workflow_task_completed_event_id=completed,
+            ),
+            self._now,
+        )
+
+        def cancelled() -> None:
+            # The stand-in activities stop as soon as they are asked to
+            if run.closed:
+                return
+            run.add(
+                history.ActivityTaskCanceledEventAttributes(
+                    scheduled_event_id=activity.scheduled_event_id,
+                    latest_cancel_requested_event_id=requested,
+                ),
+                self._now,
+            )
+            if activity.cancellation_type == commands.ActivityCancellationType.WAIT_CANCELLATION_COMPLETED:
+                run.jobs.append(self._activity_cancelled(seq))
+
+        self._later(0, cancelled)
+
+    def _start_timer(self, run: _Run, completed: int, command: commands.StartTimer) -> None:
+        started = history.TimerStartedEventAttributes(
+            timer_id=str(command.seq), workflow_task_completed_event_id=completed
+        )
+        started.start_to_fire_timeout.CopyFrom(command.start_to_fire_timeout)
+        run.timers[command.seq] = run.add(started, self._now)
+
+        def fire() -> None:
+            started_event_id = run.timers.pop(command.seq, None)
+            if started_event_id is None or run.closed:
+                return
+            run.add(
+                history.TimerFiredEventAttributes(
+                    timer_id=str(command.seq), started_event_id=started_event_id
+                ),
+                self._now,
+            )
+            run.jobs.append(
+                activation.WorkflowActivationJob(fire_timer=activation.FireTimer(seq=command.seq))
+            )
+
+        self._later(command.start_to_fire_timeout.ToTimedelta().total_seconds(), fire)
+
+    def _start_child(
+        self, run: _Run, completed: int, command: commands.StartChildWorkflowExecution
+    ) -> None:
+        task_queue = command.task_queue or run.task_queue
+        input = Payloads(payloads=command.input)
+        initiated = history.StartChildWorkflowExecutionInitiatedEventAttributes(
+            namespace=NAMESPACE,
+            workflow_id=command.workflow_id,
+            workflow_type=WorkflowType(name=command.workflow_type),
+            task_queue=TaskQueue(name=task_queue),
+            input=input,
+            parent_close_policy=command.parent_close_policy,  # type: ignore[arg-type]
+            workflow_id_reuse_policy=command.workflow_id_reuse_policy,  # type: ignore[arg-type]
+            workflow_task_completed_event_id=completed,
+        )
+        child = _Child(run, command.seq, run.add(initiated, self._now), command.parent_close_policy)
+
+        def start() -> None:
+            if run.closed:
+                return
+            resolve = activation.ResolveChildWorkflowExecutionStart(seq=command.seq)
+            existing = self._current.get(command.workflow_id)
+            if existing is not None and not existing.closed:
+                run.add(
+                    history.StartChildWorkflowExecutionFailedEventAttributes(
+                        namespace=NAMESPACE,
+                        workflow_id=command.workflow_id,
+                        workflow_type=WorkflowType(name=command.workflow_type),
+                        cause=StartChildWorkflowExecutionFailedCause.START_CHILD_WORKFLOW_EXECUTION_FAILED_CAUSE_WORKFLOW_ALREADY_EXISTS,
+                        initiated_event_id=child.initiated_event_id,
+                        workflow_task_completed_event_id=completed,
+                    ),
+                    self._now,
+                )
+                resolve.failed.workflow_id = command.workflow_id
+                resolve.failed.workflow_type = command.workflow_type
+                resolve.failed.cause = (
+                    child_workflow.StartChildWorkflowExecutionFailedCause.START_CHILD_WORKFLOW_EXECUTION_FAILED_CAUSE_WORKFLOW_ALREADY_EXISTS
+                )
+            else:
+                started = self._start_run(
+                    command.workflow_id, command.workflow_type, task_queue, input, child
+                )
+                child.started_event_id = run.add(
+                    history.ChildWorkflowExecutionStartedEventAttributes(
+                        namespace=NAMESPACE,
+                        initiated_event_id=child.initiated_event_id,
+                        workflow_execution=started.execution(),
+                        workflow_type=WorkflowType(name=command.workflow_type),
+                    ),
+                    self._now,
+                )
+                run.children[command.seq] = child
+                resolve.succeeded.run_id = started.run_id
+            run.jobs.append(
+                activation.WorkflowActivationJob(resolve_child_workflow_execution_start=resolve)
+            )
+
+        self._later(0, start)
+
+    def _signal_external(
+        self, run: _Run, completed: int, command: commands.SignalExternalWorkflowExecution
+    ) -> None:
+        target_id = command.child_workflow_id or command.workflow_execution.workflow_id
+        execution = WorkflowExecution(workflow_id=target_id)
+        initiated = run.add(
+            history.SignalExternalWorkflowExecutionInitiatedEventAttributes(
+                namespace=NAMESPACE,
+                workflow_execution=execution,
+                signal_name=command.signal_name,
+                input=Payloads(payloads=command.args),
+                child_workflow_only=bool(command.child_workflow_id),
+                workflow_task_completed_event_id=completed,
+            ),
+            self._now,
+        )
+
+        def signal() -> None:
+            if run.closed:
+                return
+            resolve = activation.ResolveSignalExternalWorkflow(seq=command.seq)
+            target = self._current.get(target_id)
+            if target is not None and not target.closed:
+                target.add(
+                    history.WorkflowExecutionSignaledEventAttributes(
+                        signal_name=command.signal_name, input=Payloads(payloads=command.args)
+                    ),
+                    self._now,
+                )
+                target.jobs.append(
+                    activation.WorkflowActivationJob(
+                        signal_workflow=activation.SignalWorkflow(
+                            signal_name=command.signal_name, input=command.args
+                        )
+                    )
+                )
+                run.add(
+                    history.ExternalWorkflowExecutionSignaledEventAttributes(
+                        initiated_event_id=initiated,
+                        namespace=NAMESPACE,
+                        workflow_execution=execution,
+                    ),
+                    self._now,
+                )
+            else:
+                run.add(
+                    history.SignalExternalWorkflowExecutionFailedEventAttributes(
+                        cause=SignalExternalWorkflowExecutionFailedCause.SIGNAL_EXTERNAL_WORKFLOW_EXECUTION_FAILED_CAUSE_EXTERNAL_WORKFLOW_EXECUTION_NOT_FOUND,
+                        workflow_task_completed_event_id=completed,
+                        namespace=NAMESPACE,
+                        workflow_execution=execution,
+                        initiated_event_id=initiated,
+                    ),
+                    self._now,
+                )
+                resolve.failure.CopyFrom(
+                    _failure(ApplicationError("Unable to signal external workflow because it was not found"))
+                )
+            run.jobs.append(activation.WorkflowActivationJob(resolve_signal_external_workflow=resolve))
+
+        self._later(0, signal)
+
+    def _cancel_external(
+        self, run: _Run, completed: int, command: commands.RequestCancelExternalWorkflowExecution
+    ) -> None:
+        target_id = command.workflow_execution.workflow_id
+        execution = WorkflowExecution(workflow_id=target_id)
+        initiated = run.add(
+            history.RequestCancelExternalWorkflowExecutionInitiatedEventAttributes(
+                namespace=NAMESPACE,
+                workflow_execution=execution,
+                reason=command.reason,
+                workflow_task_completed_event_id=completed,
+            ),
+            self._now,
+        )
+
+        def cancel() -> None:
+            if run.closed:
+                return
+            resolve = activation.ResolveRequestCancelExternalWorkflow(seq=command.seq)
+            target = self._current.get(target_id)
+            if target is not None and not target.closed:
+                target.add(history.WorkflowExecutionCancelRequestedEventAttributes(), self._now)
+                target.jobs.append(
+                    activation.WorkflowActivationJob(cancel_workflow=activation.CancelWorkflow())
+                )
+                run.add(
+                    history.ExternalWorkflowExecutionCancelRequestedEventAttributes(
+                        initiated_event_id=initiated,
+                        namespace=NAMESPACE,
+                        workflow_execution=execution,
+                    ),
+                    self._now,
+                )
+            else:
+                run.add(
+                    history.RequestCancelExternalWorkflowExecutionFailedEventAttributes(
+                        cause=CancelExternalWorkflowExecutionFailedCause.CANCEL_EXTERNAL_WORKFLOW_EXECUTION_FAILED_CAUSE_EXTERNAL_WORKFLOW_EXECUTION_NOT_FOUND,
+                        workflow_task_completed_event_id=completed,
+                        namespace=NAMESPACE,
+                        workflow_execution=execution,
+                        initiated_event_id=initiated,
+                    ),
+                    self._now,
+                )
+                resolve.failure.CopyFrom(
+                    _failure(ApplicationError("Unable to cancel external workflow because it was not found"))
+                )
+            run.jobs.append(
+                activation.WorkflowActivationJob(resolve_request_cancel_external_workflow=resolve)
+            )
+
+        self._later(0, cancel)
+
+    def _continue_as_new(
+        self, run: _Run, completed: int, command: commands.ContinueAsNewWorkflowExecution
+    ) -> None:
+        workflow_type = command.workflow_type or run.workflow_type
+        task_queue = command.task_queue or run.task_queue
+        input = Payloads(payloads=command.arguments)
+        # The next run's ID is in this run's last event, so start it first
+        next_run_id = str(uuid.uuid5(uuid.NAMESPACE_URL, f"{run.workflow_id}/{len(self._runs)}"))
+        continued = history.WorkflowExecutionContinuedAsNewEventAttributes(
+            new_execution_run_id=next_run_id,
+            workflow_type=WorkflowType(name=workflow_type),
+            task_queue=TaskQueue(name=task_queue),
+            input=input,
+            workflow_task_completed_event_id=completed,
+        )
+        continued.workflow_task_timeout.FromTimedelta(WORKFLOW_TASK_TIMEOUT)
+        run.add(continued, self._now)
+        self._close(run, continued=True)
+        started = self._start_run(run.workflow_id, workflow_type, task_queue, input, run.child, run)
+        assert started.run_id == next_run_id
+
+    def _close(self, run: _Run, continued: bool = False) -> None:
+        """Close run, apply its parent close policies and report to its parent unless it continued."""
+        run.closed = True
+        run.jobs = []
+        self._evict(run)
+        for child in run.children.values():
+            current = self._current_of_child(child)
+            if current is None or current.closed:
+                continue
+            if child.policy == ParentClosePolicy.PARENT_CLOSE_POLICY_TERMINATE:
+                current.add(
+                    history.WorkflowExecutionTerminatedEventAttributes(reason="parent closed"),
+                    self._now,
+                )
+                self._close(current)
+            elif child.policy == ParentClosePolicy.PARENT_CLOSE_POLICY_REQUEST_CANCEL:
+                current.add(history.WorkflowExecutionCancelRequestedEventAttributes(), self._now)
+                current.jobs.append(
+                    activation.WorkflowActivationJob(cancel_workflow=activation.CancelWorkflow())
+                )
+        if not continued and run.child is not None and not run.child.parent.closed:
+            self._report_to_parent(run, run.child)
+
+    def _current_of_child(self, child: _Child) -> Optional[_Run]:
+        """Return the latest run of the child started as child, if it was started."""
+        for run in reversed(self._runs):
+            if run.child is child:
+                return run
+        return None
+
+    def _report_to_parent(self, run: _Run, child: _Child) -> None:
+        """Record how the child run closed in its parent's history and resolve it there."""
+        parent = child.parent
+        last = run.events[-1]
+        common: Dict[str, Any] = dict(
+            namespace=NAMESPACE,
+            workflow_execution=WorkflowExecution(workflow_id=run.workflow_id, run_id=run.run_id),
+            workflow_type=WorkflowType(name=run.workflow_type),
+            initiated_event_id=child.initiated_event_id,
+            started_event_id=child.started_event_id,
+        )
+        resolve = activation.ResolveChildWorkflowExecution(seq=child.seq)
+        kind = last.WhichOneof("attributes")
+        if kind == "workflow_execution_completed_event_attributes":
+            result = last.workflow_execution_completed_event_attributes.result
+            parent.add(history.ChildWorkflowExecutionCompletedEventAttributes(result=result, **common), self._now)
+            resolve.result.completed.result.CopyFrom(
+                result.payloads[0] if result.payloads else _payloads([None]).payloads[0]
+            )
+        elif kind == "workflow_execution_failed_event_attributes":
+            cause = last.workflow_execution_failed_event_attributes.failure
+            parent.add(history.ChildWorkflowExecutionFailedEventAttributes(failure=cause, **common), self._now)
+            failure = Failure(message="Child Workflow execution failed", cause=cause)
+            self._set_child_failure_info(failure, common)
+            resolve.result.failed.failure.CopyFrom(failure)
+        elif kind == "workflow_execution_canceled_event_attributes":
+            parent.add(history.ChildWorkflowExecutionCanceledEventAttributes(**common), self._now)
+            failure = Failure(
+                message="Child Workflow execution cancelled",
+                cause=_cancelled_failure("Workflow cancelled"),
+            )
+            self._set_child_failure_info(failure, common)
+            resolve.result.cancelled.failure.CopyFrom(failure)
+        else:
+            parent.add(history.ChildWorkflowExecutionTerminatedEventAttributes(**common), self._now)
+            failure = Failure(message="Child Workflow execution terminated")
+            self._set_child_failure_info(failure, common)
+            resolve.result.failed.failure.CopyFrom(failure)
+        parent.jobs.append(activation.WorkflowActivationJob(resolve_child_workflow_execution=resolve))
+
+    @staticmethod
+    def _set_child_failure_info(failure: Failure, common: Dict[str, Any]) -> None:
+        info = failure.child_workflow_execution_failure_info
+        info.namespace = NAMESPACE
+        info.workflow_execution.CopyFrom(common["workflow_execution"])
+        info.workflow_type.CopyFrom(common["workflow_type"])
+        info.initiated_event_id = common["initiated_event_id"]
+        info.started_event_id = common["started_event_id"]
+
+    def _evict(self, run: _Run) -> None:
+        """Drop run's workflow instance, as a worker evicts a closed run from its cache."""
+        if run.instance is None:
+            return
+        act = activation.WorkflowActivation(
+            run_id=run.run_id,
+            jobs=[
+                activation.WorkflowActivationJob(
+                    remove_from_cache=activation.RemoveFromCache(message="run closed")
+                )
+            ],
+        )
+        act.timestamp.FromDatetime(self._now)
+        self._activate(run, act)
+        run.instance = None
@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""Record BatchParentWorkflow histories for the replay tests.
+
+Runs the parent in each scenario below and writes the history of every run,
+including each run after continue-as-new, to tests/histories as
+<scenario>-<run>.json. The scenario name is the parent's workflow ID, so
+replay derives the same child IDs. Then it replays each history and writes
+the time per event to tests/histories/baseline.json. tests/test_replay.py
+replays the histories with the current workflow code, which fails if the
+code is no longer deterministic for them or replays slower than the
+baseline allows.
+
+The records and their transform come from stand-in activities that take
+10ms a record, and a second for every twentieth, so children finish out of
+order as real ones do. By default the scenarios run in-process with
+scripts/offline_recorder.py, which plays the server's part on a simulated
+clock: recording takes seconds and needs no server or data file. With
+--server they run against a Temporal server in real time instead.
+Re-record after an intended change to the parent's commands, and re-measure
+with --baseline-only on the machine that runs the tests, since replay times
+differ from host to host.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import logging
+import math
+import statistics
+import time
+from contextlib import AsyncExitStack
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from temporalio import activity
+from temporalio.client import Client, WorkflowFailureError, WorkflowHistory
+from temporalio.testing import WorkflowEnvironment
+from temporalio.worker import Replayer, Worker
+
+from scripts.offline_recorder import OfflineRecorder
+from temporal_batch.legacy_workflows import LegacyBatchChildWorkflow, LegacyBatchParentWorkflow
+from temporal_batch.shared import PROCESSING_MODE_BATCH, BatchParentWorkflowParams, SourceBatches
+from temporal_batch.workflows import BatchChildWorkflow, BatchParentWorkflow
+
+HISTORIES_DIR = Path(__file__).parents[1] / "tests" / "histories"
+BASELINE_FILE = HISTORIES_DIR / "baseline.json"
+TASK_QUEUE = "record-histories"
+# Simulated seconds per read and per record, and for every twentieth record
+READ_SECONDS = 0.01
+RECORD_SECONDS = 0.01
+SLOW_RECORD_SECONDS = 1.0
+
+
+@dataclass
+class Scenario:
+    """A parent run to record."""
+
+    params: BatchParentWorkflowParams
+    # Run the first release's parent, as workflows started before V2 replay
+    legacy: bool = False
+    # Cancel the parent this many seconds after it starts
+    cancel_after: Optional[float] = None
+
+
+SCENARIOS: Dict[str, Scenario] = {
+    "small": Scenario(BatchParentWorkflowParams(500, processing_mode=PROCESSING_MODE_BATCH)),
+    # Continues as new every 300 events, carrying the children still running
+    "continue-as-new": Scenario(
+        BatchParentWorkflowParams(
+            1000, batch_size=10, processing_mode=PROCESSING_MODE_BATCH, max_history_length=300
+        )
+    ),
+    # 100 children at a time, until the server suggests continuing as new
+    "large-window": Scenario(
+        BatchParentWorkflowParams(
+            3000,
+            batch_size=10,
+            processing_mode=PROCESSING_MODE_BATCH,
+            min_window_size=100,
+            max_window_size=100,
+        )
+    ),
+    "prefetch": Scenario(
+        BatchParentWorkflowParams(2000, processing_mode=PROCESSING_MODE_BATCH, prefetch_batches=8)
+    ),
+    "hedge": Scenario(BatchParentWorkflowParams(500, hedge_percentile=0.9)),
+    "cancelled": Scenario(
+        BatchParentWorkflowParams(2000, processing_mode=PROCESSING_MODE_BATCH), cancel_after=3.0
+    ),
+    "legacy": Scenario(BatchParentWorkflowParams(1000), legacy=True),
+}
+
+
+def read_batches(
+    batch_size: int,
+    read_until_line: int,
+    offset: int,
+    num_batches: int,
+    cursor: Optional[str],
+) -> SourceBatches:
+    """Return synthetic records numbered by their offset, with offsets as cursors."""
+    end = min(offset + batch_size * num_batches, read_until_line)
+    starts = range(offset, end, batch_size)
+    batches = [[f"record{i}" for i in range(start, min(start + batch_size, end))] for start in starts]
+    return SourceBatches(batches, [str(min(start + batch_size, end)) for start in starts])
+
+
+def create_single_batch(batch_size: int, read_until_line: int, offset: int) -> List[str]:
+    """Return the synthetic records of one batch."""
+    return [f"record{i}" for i in range(offset, min(offset + batch_size, read_until_line))]
+
+
+def process_batch(records: List[str]) -> List[str]:
+    """Uppercase the batch."""
+    return [record.upper() for record in records]
+
+
+def process_record(record: str) -> str:
+    """Uppercase the record."""
+    return record.upper()
+
+
+# Activity name -> stand-in
+STAND_INS: Dict[str, Callable[..., Any]] = {
+    "read_batches": read_batches,
+    "create_single_batch": create_single_batch,
+    "process_batch": process_batch,
+    "process_record": process_record,
+}
+
+
+def record_seconds(record: str) -> float:
+    """Return the time the stand-ins take to transform record."""
+    return SLOW_RECORD_SECONDS if int(record.removeprefix("record")) % 20 == 7 else RECORD_SECONDS
+
+
+def stand_in_seconds(name: str, args: List[Any]) -> float:
+    """Return the time the stand-in activity name takes for args."""
+    if name == "process_batch":
+        return sum(record_seconds(record) for record in args[0])
+    if name == "process_record":
+        return record_seconds(args[0])
+    return READ_SECONDS
+
+
+def server_activities() -> List[Callable[..., Any]]:
+    """Return the stand-ins as activities that take their time for real."""
+
+    def define(name: str, stand_in: Callable[..., Any]) -> Callable[..., Any]:
+        @activity.defn(name=name)
+        async def run(*args: Any) -> Any:
+            await asyncio.sleep(stand_in_seconds(name, list(args)))
+            return stand_in(*args)
+
+        return run
+
+    return [define(name, stand_in) for name, stand_in in STAND_INS.items()]
+
+
+def history_files() -> List[Path]:
+    """Return the recorded history files, in name order."""
+    return sorted(path for path in HISTORIES_DIR.glob("*.json") if path != BASELINE_FILE)
+
+
+def load_history(path: Path) -> WorkflowHistory:
+    """Read a recorded history, using its scenario name as the workflow ID."""
+    return WorkflowHistory.from_json(path.stem.rsplit("-", 1)[0], path.read_text())
+
+
+async def replay_seconds_per_event(history: WorkflowHistory, repeat: int = 3) -> float:
+    """Replay history repeat times and return the fastest time per event.
+
+    Raises if the workflow code is no longer deterministic for history.
+    """
+    replayer = Replayer(workflows=[BatchParentWorkflow, LegacyBatchParentWorkflow])
+    best = math.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await replayer.replay_workflow(history)
+        best = min(best, time.perf_counter() - start)
+    return best / len(history.events)
+
+
+async def record_offline(name: str, scenario: Scenario) -> List[WorkflowHistory]:
+    """Run the scenario in-process and return the history of each of its runs."""
+    parent, child = (
+        (LegacyBatchParentWorkflow, LegacyBatchChildWorkflow)
+        if scenario.legacy
+        else (BatchParentWorkflow, BatchChildWorkflow)
+    )
+    recorder = OfflineRecorder([parent, child], STAND_INS, stand_in_seconds, TASK_QUEUE)
+    recorder.start(parent, name, scenario.params)
+    if scenario.cancel_after is not None:
+        recorder.cancel_at(scenario.cancel_after, name)
+    await recorder.run()
+    return recorder.histories(name)
+
+
+async def record_on_server(client: Client, name: str, scenario: Scenario) -> List[WorkflowHistory]:
+    """Run the scenario on the server and return the history of each of its runs."""
+    parent = LegacyBatchParentWorkflow if scenario.legacy else BatchParentWorkflow
+    handle = await client.start_workflow(parent.run, scenario.params, id=name, task_queue=TASK_QUEUE)
+    if scenario.cancel_after is not None:
+        await asyncio.sleep(scenario.cancel_after)
+        await handle.cancel()
+    with contextlib.suppress(WorkflowFailureError):
+        await handle.result()
+    histories: List[WorkflowHistory] = []
+    run_id: Optional[str] = handle.first_execution_run_id
+    while run_id:
+        history = await client.get_workflow_handle(handle.id, run_id=run_id).fetch_history()
+        histories.append(history)
+        last = history.events[-1]
+        run_id = None
+        if last.HasField("workflow_execution_continued_as_new_event_attributes"):
+            run_id = last.workflow_execution_continued_as_new_event_attributes.new_execution_run_id
+    return histories
+
+
+def write_histories(name: str, histories: List[WorkflowHistory]) -> None:
+    """Replace the scenario's history files with histories."""
+    for stale in HISTORIES_DIR.glob(f"{name}-*.json"):
+        stale.unlink()
+    for run, history in enumerate(histories):
+        path = HISTORIES_DIR / f"{name}-{run}.json"
+        path.write_text(history.to_json())
+        logging.info(f"Recorded {path.name}: {len(history.events)} events")
+
+
+async def write_baseline(repeat: int, passes: int) -> None:
+    """Replay each recorded history and write its time per event to the baseline file.
+
+    Each pass measures every history once, and the baseline is the median of
+    the passes, so a spell of a busy or idle host doesn't set it.
+    """
+    histories = {path.name: load_history(path) for path in history_files()}
+    measured: Dict[str, List[float]] = {name: [] for name in histories}
+    for _ in range(passes):
+        for name, history in histories.items():
+            measured[name].append(await replay_seconds_per_event(history, repeat))
+    baseline = {}
+    for name, history in histories.items():
+        seconds = statistics.median(measured[name])
+        baseline[name] = {"events": len(history.events), "us_per_event": seconds * 1e6}
+        logging.info(f"{name}: {len(history.events)} events, {seconds * 1e6:.1f} us/event")
+    BASELINE_FILE.write_text(json.dumps(baseline, indent=2, sort_keys=True) + "\n")
+
+
+async def main() -> None:
+    """Record the scenarios and write the replay baseline."""
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--server",
+        action="store_true",
+        help="record against a Temporal server, a local dev server unless --address is given",
+    )
+    parser.add_argument("--address", help="existing Temporal server, e.g. localhost:7233")
+    parser.add_argument(
+        "--scenarios",
+        default=",".join(SCENARIOS),
+        help=f"comma-separated scenarios to record (default: {','.join(SCENARIOS)})",
+    )
+    parser.add_argument(
+        "--baseline-only",
+        action="store_true",
+        help="re-measure the baseline from the recorded histories without recording",
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="replays per measurement, fastest kept")
+    parser.add_argument("--passes", type=int, default=5, help="measurements per history, median kept")
+    args = parser.parse_args()
+
+    if not args.baseline_only:
+        names = args.scenarios.split(",")
+        unknown = set(names) - set(SCENARIOS)
+        if unknown:
+            parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+        HISTORIES_DIR.mkdir(parents=True, exist_ok=True)
+        if not args.server:
+            for name in names:
+                write_histories(name, await record_offline(name, SCENARIOS[name]))
+        else:
+            async with AsyncExitStack() as stack:
+                if args.address:
+                    client = await Client.connect(args.address)
+                else:
+                    env = await stack.enter_async_context(await WorkflowEnvironment.start_local())
+                    client = env.client
+                await stack.enter_async_context(
+                    Worker(
+                        client,
+                        task_queue=TASK_QUEUE,
+                        workflows=[
+                            BatchParentWorkflow,
+                            BatchChildWorkflow,
+                            LegacyBatchParentWorkflow,
+                            LegacyBatchChildWorkflow,
+                        ],
+                        activities=server_activities(),
+                    )
+                )
+                for name in names:
+                    write_histories(name, await record_on_server(client, name, SCENARIOS[name]))
+    await write_baseline(args.repeat, args.passes)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
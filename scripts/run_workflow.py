@@ -1,30 +1,196 @@
 #!/usr/bin/env python3
 """Start the batch processing workflow."""
 
+import argparse
 import asyncio
 import logging
-import sys
 import time
 
 from temporalio.client import Client
 
-from temporal_batch.shared import ADDRESS, TASK_QUEUE, BatchParentWorkflowParams
-from temporal_batch.workflows import BatchParentWorkflow
+from temporal_batch.codec import (
+    COMPRESSION_ALGORITHMS,
+    COMPRESSION_THRESHOLD,
+    compression_data_converter,
+)
+from temporal_batch.shared import (
+    ADDRESS,
+    PROCESSING_MODE_RECORD,
+    PROCESSING_MODES,
+    TASK_QUEUE,
+    BatchParentWorkflowParams,
+    RecordPoolWorkflowParams,
+    ShardedBatchWorkflowParams,
+)
+from temporal_batch.workflows import BatchParentWorkflow, RecordPoolWorkflow, ShardedBatchWorkflow
+
+
+def parse_args() -> argparse.Namespace:
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Start the batch processing workflow.")
+    parser.add_argument("num_words", type=int, nargs="?", default=0, help="number of words to process")
+    parser.add_argument(
+        "--mode",
+        choices=PROCESSING_MODES,
+        default=PROCESSING_MODE_RECORD,
+        help="run one activity per record, one per batch, or one CPU-bound activity per chunk",
+    )
+    parser.add_argument("--batch-size", type=int, help="records per child workflow (default: 50)")
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        help="records per transform_records activity in cpu mode",
+    )
+    parser.add_argument(
+        "--read-in-child",
+        action="store_true",
+        help="pass (offset, count) ranges to child workflows instead of word lists",
+    )
+    parser.add_argument(
+        "--max-history-length",
+        type=int,
+        help="continue-as-new once the parent's history has this many events",
+    )
+    parser.add_argument(
+        "--max-history-size",
+        type=int,
+        help="continue-as-new once the parent's history reaches this many bytes",
+    )
+    parser.add_argument("--min-window", type=int, help="minimum number of concurrent child workflows")
+    parser.add_argument("--max-window", type=int, help="maximum number of concurrent child workflows")
+    parser.add_argument(
+        "--target-batch-latency",
+        type=float,
+        help="shrink the window when a child takes longer than this many seconds",
+    )
+    parser.add_argument(
+        "--prefetch-batches",
+        type=int,
+        help="read this many batches ahead of the window, several per activity call",
+    )
+    parser.add_argument(
+        "--hedge-percentile",
+        type=float,
+        help="duplicate records still running once this fraction of their batch is done (record mode)",
+    )
+    parser.add_argument(
+        "--local-record-timeout",
+        type=float,
+        help="run records as local activities, retrying ones slower than this many seconds "
+        "as regular activities (record mode)",
+    )
+    parser.add_argument(
+        "--sink",
+        help="append each batch's results to this sink, a directory on storage every worker "
+        "shares, e.g. /mnt/shared/output or frames:./output?shared=false&fsync=false when all "
+        "workers run on this host (not with --pool-size)",
+    )
+    parser.add_argument(
+        "--per-parent-metrics",
+        action="store_true",
+        help="label the window gauges with each parent's workflow ID",
+    )
+    parser.add_argument(
+        "--pool-size",
+        type=int,
+        help="run RecordPoolWorkflow instead, keeping this many record activities in flight",
+    )
+    parser.add_argument(
+        "--shards",
+        type=int,
+        help="split the words into this many shards, each run by its own parent workflow",
+    )
+    parser.add_argument(
+        "--shard-size",
+        type=int,
+        help="words per shard; --shards then limits how many shards run at once",
+    )
+    parser.add_argument(
+        "--task-queues",
+        type=lambda value: value.split(","),
+        default=[],
+        help="comma-separated task queues to spread the shards across (default: the orchestrator's)",
+    )
+    parser.add_argument(
+        "--compression",
+        choices=COMPRESSION_ALGORITHMS,
+        help="compress large payloads; workers need a codec too",
+    )
+    parser.add_argument(
+        "--compression-threshold",
+        type=int,
+        default=COMPRESSION_THRESHOLD,
+        help="smallest payload in bytes that is compressed (default: %(default)s)",
+    )
+    return parser.parse_args()
 
 
 async def main() -> None:
     """Start the batch processing workflow."""
     logging.basicConfig(level=logging.INFO)
-    num_words = int(sys.argv[1]) if len(sys.argv) > 1 else 0
-    client = await Client.connect(ADDRESS)
-    await client.execute_workflow(
+    args = parse_args()
+    data_converter, _ = compression_data_converter(args.compression, args.compression_threshold)
+    client = await Client.connect(ADDRESS, data_converter=data_converter)
+    if args.pool_size:
+        await client.execute_workflow(
+            RecordPoolWorkflow.run,
+            RecordPoolWorkflowParams(
+                args.num_words,
+                pool_size=args.pool_size,
+                max_history_length=args.max_history_length,
+                max_history_size=args.max_history_size,
+            ),
+            id=f"record-pool-workflow-{int(time.time())}",
+            task_queue=TASK_QUEUE,
+        )
+        print("Batch processing complete")
+        return
+
+    parent_params = BatchParentWorkflowParams(
+        args.num_words,
+        0,
+        processing_mode=args.mode,
+        read_in_child=args.read_in_child,
+        max_history_length=args.max_history_length,
+        max_history_size=args.max_history_size,
+        min_window_size=args.min_window,
+        max_window_size=args.max_window,
+        target_batch_latency=args.target_batch_latency,
+        chunk_size=args.chunk_size,
+        prefetch_batches=args.prefetch_batches,
+        hedge_percentile=args.hedge_percentile,
+        local_record_timeout=args.local_record_timeout,
+        batch_size=args.batch_size,
+        sink=args.sink,
+        per_parent_metrics=args.per_parent_metrics,
+    )
+    if args.shards or args.shard_size:
+        await client.execute_workflow(
+            ShardedBatchWorkflow.run,
+            ShardedBatchWorkflowParams(
+                args.num_words,
+                num_shards=args.shards,
+                shard_size=args.shard_size,
+                task_queues=args.task_queues,
+                parent=parent_params,
+            ),
+            id=f"sharded-batch-workflow-{int(time.time())}",
+            task_queue=TASK_QUEUE,
+        )
+        print("Batch processing complete")
+        return
+
+    handle = await client.start_workflow(
         BatchParentWorkflow.run,
-        BatchParentWorkflowParams(num_words, 0),
+        parent_params,
         id=f"batch-parent-workflow-{int(time.time())}",
         task_queue=TASK_QUEUE,
     )
+    # The ID is what control_workflow.py needs to pause, resize or query the run
+    print(f"Started {handle.id}")
+    await handle.result()
     print("Batch processing complete")
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    asyncio.run(main())
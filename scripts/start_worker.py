@@ -1,43 +1,296 @@
 #!/usr/bin/env python3
 """Start the Temporal worker for batch processing."""
 
+import argparse
 import asyncio
+import dataclasses
 import logging
+import multiprocessing
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from pathlib import Path
+from typing import Callable, List, Optional
 
 from temporalio.client import Client
-from temporalio.worker import Worker
+from temporalio.runtime import PrometheusConfig, Runtime, TelemetryConfig
+from temporalio.worker import SharedStateManager, Worker
 
-from temporal_batch.activities import create_single_batch, process_record
+from temporal_batch.activities import (
+    create_single_batch,
+    init_record_cache,
+    process_batch,
+    process_record,
+    read_batches,
+    set_io_executor,
+    transform_records,
+    write_results,
+)
+from temporal_batch.codec import (
+    COMPRESSION_ALGORITHMS,
+    COMPRESSION_THRESHOLD,
+    compression_data_converter,
+)
+from temporal_batch.interceptors import TimingInterceptor
+from temporal_batch.legacy_workflows import LegacyBatchChildWorkflow, LegacyBatchParentWorkflow
+from temporal_batch.metrics import HISTOGRAM_BUCKETS
 from temporal_batch.shared import ADDRESS, TASK_QUEUE
-from temporal_batch.workflows import BatchChildWorkflow, BatchParentWorkflow
+from temporal_batch.worker_config import TUNERS, WorkerConfig, load_worker_config
+from temporal_batch.workflows import (
+    BatchChildWorkflow,
+    BatchParentWorkflow,
+    RecordPoolWorkflow,
+    ShardedBatchWorkflow,
+)
+
+
+def parse_args() -> argparse.Namespace:
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Start the Temporal worker for batch processing.")
+    parser.add_argument(
+        "--io-threads",
+        type=int,
+        default=4,
+        help="threads that run the activities' blocking file reads",
+    )
+    parser.add_argument(
+        "--process-pool",
+        type=int,
+        metavar="PROCESSES",
+        help="run the CPU-bound transform_records activity (--mode cpu) on this many processes "
+        "instead of a thread pool",
+    )
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        help="serve SDK and batch metrics for Prometheus on this port",
+    )
+    parser.add_argument(
+        "--timing",
+        action="store_true",
+        help="record the wall time of every activity execution and workflow step",
+    )
+    parser.add_argument(
+        "--profile-dir",
+        type=Path,
+        help="profile sampled activity executions and write the slow ones here (implies --timing)",
+    )
+    parser.add_argument(
+        "--profile-threshold",
+        type=float,
+        default=1.0,
+        help="seconds above which a profiled activity execution is written out (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--profile-sample-rate",
+        type=float,
+        default=0.1,
+        help="fraction of activity executions to profile (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--record-cache-mb",
+        type=float,
+        help="cache record transform results in up to this many MB per worker process",
+    )
+    parser.add_argument(
+        "--record-cache-ttl",
+        type=float,
+        help="seconds a cached record transform stays valid (default: no expiry)",
+    )
+    parser.add_argument(
+        "--compression",
+        choices=COMPRESSION_ALGORITHMS,
+        help="compress large payloads; clients starting workflows need a codec too",
+    )
+    parser.add_argument(
+        "--compression-threshold",
+        type=int,
+        default=COMPRESSION_THRESHOLD,
+        help="smallest payload in bytes that is compressed (default: %(default)s)",
+    )
+    tuning = parser.add_argument_group(
+        "worker tuning",
+        "These override the --config file and TEMPORAL_BATCH_WORKER_* environment variables.",
+    )
+    tuning.add_argument(
+        "--config",
+        type=Path,
+        help="TOML file of worker settings, named like the flags below with underscores",
+    )
+    tuning.add_argument(
+        "--max-task-queue-activities-per-second",
+        type=float,
+        help="activities started per second across the task queue's workers; 0 for no limit "
+        "(default: 150)",
+    )
+    tuning.add_argument(
+        "--max-concurrent-workflow-tasks",
+        type=int,
+        help="workflow tasks run at once (a cap with --tuner resource)",
+    )
+    tuning.add_argument(
+        "--max-concurrent-activities",
+        type=int,
+        help="activities run at once (a cap with --tuner resource)",
+    )
+    tuning.add_argument(
+        "--max-concurrent-local-activities",
+        type=int,
+        help="local activities run at once (a cap with --tuner resource)",
+    )
+    tuning.add_argument("--workflow-task-pollers", type=int, help="concurrent workflow task polls")
+    tuning.add_argument("--activity-task-pollers", type=int, help="concurrent activity task polls")
+    tuning.add_argument(
+        "--autoscale-pollers",
+        action="store_true",
+        default=None,
+        help="scale pollers with the backlog, up to --workflow-task-pollers/--activity-task-pollers",
+    )
+    tuning.add_argument(
+        "--max-cached-workflows",
+        type=int,
+        help="workflows kept in the sticky cache between workflow tasks",
+    )
+    tuning.add_argument(
+        "--tuner",
+        choices=TUNERS,
+        help="size slots from fixed limits or from the host's CPU and memory use (default: fixed)",
+    )
+    tuning.add_argument(
+        "--target-cpu-usage",
+        type=float,
+        help="CPU use, 0-1, that the resource tuner adds slots up to (default: 0.8)",
+    )
+    tuning.add_argument(
+        "--target-memory-usage",
+        type=float,
+        help="memory use, 0-1, that the resource tuner adds slots up to (default: 0.8)",
+    )
+    args = parser.parse_args()
+    try:
+        args.worker_config = worker_config(args)
+    except (OSError, ValueError) as e:
+        parser.error(f"invalid worker settings: {e}")
+    return args
+
+
+def worker_config(args: argparse.Namespace) -> WorkerConfig:
+    """Merge the config file, environment variables and flags into the worker settings."""
+    overrides = {
+        field.name: getattr(args, field.name)
+        for field in dataclasses.fields(WorkerConfig)
+        if hasattr(args, field.name)
+    }
+    return load_worker_config(args.config, os.environ, overrides)
 
 
 async def main() -> None:
     """Start the Temporal worker."""
     logging.basicConfig(level=logging.INFO)
     logger = logging.getLogger(__name__)
+    args = parse_args()
+    config: WorkerConfig = args.worker_config
     
     logger.info(f"Connecting to Temporal at: {ADDRESS}")
     logger.info(f"Using task queue: {TASK_QUEUE}")
+    logger.info(f"Worker settings: {config}")
     
+    io_executor = ThreadPoolExecutor(args.io_threads, thread_name_prefix="batch-io")
+    set_io_executor(io_executor)
+    record_cache = None
+    if args.record_cache_mb:
+        record_cache = init_record_cache(int(args.record_cache_mb * 2**20), args.record_cache_ttl)
+        logger.info(f"Caching record transforms in up to {args.record_cache_mb} MB")
+    data_converter, codec = compression_data_converter(
+        args.compression, args.compression_threshold
+    )
     try:
-        client = await Client.connect(ADDRESS)
+        runtime = None
+        if args.metrics_port:
+            runtime = Runtime(
+                telemetry=TelemetryConfig(
+                    metrics=PrometheusConfig(
+                        bind_address=f"0.0.0.0:{args.metrics_port}",
+                        histogram_bucket_overrides=HISTOGRAM_BUCKETS,
+                    )
+                )
+            )
+            logger.info(f"Serving metrics on port {args.metrics_port}")
+        client = await Client.connect(ADDRESS, runtime=runtime, data_converter=data_converter)
+        interceptors = []
+        if args.timing or args.profile_dir:
+            if args.profile_dir:
+                args.profile_dir.mkdir(parents=True, exist_ok=True)
+            interceptors.append(
+                TimingInterceptor(
+                    (runtime or Runtime.default()).metric_meter,
+                    profile_dir=args.profile_dir,
+                    profile_threshold=args.profile_threshold,
+                    profile_sample_rate=args.profile_sample_rate,
+                )
+            )
         logger.info("Successfully connected to Temporal server")
         logger.info(f"Client identity: {client.identity}")
         logger.info(f"Namespace: {client.namespace}")
         
+        activities: List[Callable] = [
+            create_single_batch,
+            read_batches,
+            process_record,
+            process_batch,
+            write_results,
+            transform_records,
+        ]
+        if args.process_pool:
+            # Synchronous activities run on the process pool, one core per process
+            pool_initializer = None
+            if record_cache is not None:
+                # Every pool process gets a record cache of its own
+                pool_initializer = partial(init_record_cache, record_cache.max_bytes, record_cache.ttl)
+            activity_executor: Executor = ProcessPoolExecutor(
+                args.process_pool, initializer=pool_initializer
+            )
+            shared_state_manager: Optional[SharedStateManager] = (
+                SharedStateManager.create_from_multiprocessing(multiprocessing.Manager())
+            )
+            logger.info(f"Running CPU-bound activities on {args.process_pool} processes")
+        else:
+            # Synchronous activities run on threads and share one core. A
+            # thread per activity slot, so they never queue for a thread
+            threads = config.activity_slots()
+            activity_executor = ThreadPoolExecutor(threads, thread_name_prefix="batch-cpu")
+            shared_state_manager = None
+            logger.info(f"Running CPU-bound activities on a pool of {threads} threads")
+
         worker = Worker(
             client,
             task_queue=TASK_QUEUE,
-            workflows=[BatchParentWorkflow, BatchChildWorkflow],
-            activities=[create_single_batch, process_record],
-            max_task_queue_activities_per_second=150,
+            workflows=[
+                ShardedBatchWorkflow,
+                BatchParentWorkflow,
+                BatchChildWorkflow,
+                RecordPoolWorkflow,
+                # Runs started before the V2 parent and child
+                LegacyBatchParentWorkflow,
+                LegacyBatchChildWorkflow,
+            ],
+            activities=activities,
+            interceptors=interceptors,
+            activity_executor=activity_executor,
+            shared_state_manager=shared_state_manager,
+            **config.worker_options(),
         )
         logger.info("Worker created successfully, starting worker...")
         await worker.run()
     except Exception as e:
         logger.error(f"Failed to start worker: {e}")
         raise
+    finally:
+        io_executor.shutdown()
+        if record_cache is not None:
+            logger.info(f"Record cache: {record_cache.stats.summary()}")
+        if codec is not None:
+            logger.info(f"Payload compression: {codec.stats.summary()}")
 
 
 if __name__ == "__main__":
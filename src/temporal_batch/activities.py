@@ -1,42 +1,275 @@
 import asyncio
+import hashlib
 import random
+import time
+from concurrent.futures import Executor
 from pathlib import Path
-from typing import List
+from typing import List, Optional, Tuple, cast
 
 from temporalio import activity
+from temporalio.exceptions import ApplicationError
 
-# Path to words file located in project data directory
+from temporal_batch.cache import RecordCache
+from temporal_batch.metrics import (
+    BATCH_READ_LATENCY,
+    RECORD_CACHE_EVICTIONS,
+    RECORD_CACHE_HITS,
+    RECORD_CACHE_MISSES,
+    RECORD_LATENCY,
+    SINK_DUPLICATE_BATCHES,
+    SINK_WRITE_LATENCY,
+)
+from temporal_batch.shared import DATA_SOURCE, READER_BACKEND, SourceBatches
+from temporal_batch.sinks import open_sink
+from temporal_batch.sources import DataSource, TextFileSource, open_source
+
+# Path to words file located in project data directory, read when no
+# TEMPORAL_BATCH_SOURCE is set
 WORDS_FILE = Path(__file__).parents[2] / "data" / "words_alpha.txt"
 
+# Seconds between heartbeats of process_record while it works
+HEARTBEAT_INTERVAL = 0.25
+
+# Rounds of hashing that stand in for a CPU-heavy production transform
+CPU_TRANSFORM_ROUNDS = 2000
+
+# Thread pool for blocking file reads and writes, set by the worker; None
+# uses the event loop's default executor
+_io_executor: Optional[Executor] = None
+
+
+# Cache of transform results, set by the worker; None recomputes every record
+_record_cache: Optional[RecordCache] = None
+
+
+def set_io_executor(executor: Optional[Executor]) -> None:
+    """Run file reads and writes of this process's activities on executor."""
+    global _io_executor
+    _io_executor = executor
+
+
+def set_record_cache(cache: Optional[RecordCache]) -> None:
+    """Answer this process's repeated record transforms from cache."""
+    global _record_cache
+    _record_cache = cache
+
+
+def init_record_cache(max_bytes: int, ttl: Optional[float] = None) -> RecordCache:
+    """Give this process a new record cache; also a process pool initializer."""
+    cache = RecordCache(max_bytes, ttl)
+    set_record_cache(cache)
+    return cache
+
+
+def _record_latency(name: str, description: str, started: float) -> None:
+    """Record the seconds since started on an activity histogram."""
+    # Activities are also called directly, outside of any worker
+    if activity.in_activity():
+        activity.metric_meter().create_histogram_float(name, description, "s").record(
+            time.perf_counter() - started
+        )
+
+
+def _count(name: str, description: str, value: int) -> None:
+    """Add value to an activity counter."""
+    if not value:
+        return
+    try:
+        activity.metric_meter().create_counter(name, description).add(value)
+    except RuntimeError:
+        # Outside an activity, or in a sync activity on a process pool
+        pass
+
+
+def _cache_get(key: Tuple[str, str]) -> Optional[str]:
+    """Look up a transform result in the record cache, if there is one."""
+    if _record_cache is None:
+        return None
+    result = _record_cache.get(key)
+    if result is None:
+        _count(RECORD_CACHE_MISSES, "Record transforms not found in the cache", 1)
+    else:
+        _count(RECORD_CACHE_HITS, "Record transforms answered from the cache", 1)
+    return result
+
+
+def _cache_put(key: Tuple[str, str], result: str) -> None:
+    """Store a transform result in the record cache, if there is one."""
+    if _record_cache is not None:
+        _count(
+            RECORD_CACHE_EVICTIONS,
+            "Record cache entries evicted to stay within the memory budget",
+            _record_cache.put(key, result),
+        )
+
+
+def _source() -> DataSource:
+    """Return the configured data source, the words file by default."""
+    if DATA_SOURCE:
+        return open_source(DATA_SOURCE)
+    return TextFileSource(WORDS_FILE, READER_BACKEND)
+
+
+def _read_source(
+    offset: int, counts: List[int], cursor: Optional[str]
+) -> Tuple[List[List[str]], List[str]]:
+    """Read consecutive runs of records and the cursor after each, stopping at the end."""
+    source = _source()
+    # Without a cursor the source finds the offset itself, which may mean a scan
+    cursor = source.seek(offset) if cursor is None else cursor
+    batches: List[List[str]] = []
+    cursors: List[str] = []
+    for count in counts:
+        records, cursor = source.read(cursor, count)
+        if not records:
+            break
+        batches.append(records)
+        cursors.append(cursor)
+    return batches, cursors
+
+
+async def _read_words(
+    offset: int, counts: List[int], cursor: Optional[str] = None
+) -> Tuple[List[List[str]], List[str]]:
+    """Read from the data source off the event loop."""
+    started = time.perf_counter()
+    # Reading on the loop would stall every other async activity on the worker
+    result = await asyncio.get_running_loop().run_in_executor(
+        _io_executor, _read_source, offset, counts, cursor
+    )
+    _record_latency(BATCH_READ_LATENCY, "Time to read a batch from the data source", started)
+    return result
+
+
+def _batch_counts(batch_size: int, total: int) -> List[int]:
+    """Split total records into batches of batch_size, the last one possibly short."""
+    return [min(batch_size, total - start) for start in range(0, total, batch_size)]
+
 
 @activity.defn
 async def create_single_batch(batch_size: int, read_until_line: int, offset: int) -> List[str]:
-    """Read a batch of words from the words file."""
+    """Read a batch of records from the data source."""
     if offset >= read_until_line:
         return []
 
-    words: List[str] = []
-    with open(WORDS_FILE, "r") as f:
-        # Skip already processed lines
-        for _ in range(offset):
-            if not f.readline():
-                return []
-        # Read up to batch_size lines, but not beyond read_until_line
-        for i in range(batch_size):
-            if offset + i >= read_until_line:
-                break
-            line = f.readline()
-            if not line:
-                break
-            words.append(line.strip())
-    return words
+    batches, _ = await _read_words(offset, [min(batch_size, read_until_line - offset)])
+    return batches[0] if batches else []
+
+
+@activity.defn
+async def read_batches(
+    batch_size: int,
+    read_until_line: int,
+    offset: int,
+    num_batches: int,
+    cursor: Optional[str],
+) -> SourceBatches:
+    """Read up to num_batches consecutive batches, resuming from cursor if one is given.
+
+    Each batch comes back with the cursor of the record after it, for the
+    next read to resume from without seeking to its offset.
+    """
+    if offset >= read_until_line:
+        return SourceBatches()
+
+    total = min(batch_size * num_batches, read_until_line - offset)
+    batches, cursors = await _read_words(offset, _batch_counts(batch_size, total), cursor)
+    return SourceBatches(batches, cursors)
+
+
+@activity.defn
+async def write_results(sink: str, key: str, offset: int, results: List[str]) -> bool:
+    """Append a batch's results to key's file in the sink; return False if the batch was there."""
+    started = time.perf_counter()
+    try:
+        result_sink = open_sink(sink)
+    except ValueError as e:
+        # A retry can't fix the spec
+        raise ApplicationError(str(e), non_retryable=True) from e
+    written = await asyncio.get_running_loop().run_in_executor(
+        _io_executor, result_sink.write, key, offset, results
+    )
+    _record_latency(SINK_WRITE_LATENCY, "Time to append a batch of results to the sink", started)
+    if not written and results:
+        _count(SINK_DUPLICATE_BATCHES, "Batches already in the sink when written again", 1)
+    return written
+
+
+async def _transform(record: str, heartbeat: bool = False) -> str:
+    """Convert a record to uppercase with simulated delay, heartbeating through it if asked."""
+    started = time.perf_counter()
+    key = ("process_record", record)
+    result = _cache_get(key)
+    if result is None:
+        delay_ms = 10
+        if random.random() < 0.05:
+            delay_ms = 1000
+        if heartbeat:
+            await _sleep_heartbeating(delay_ms / 1000)
+        else:
+            await asyncio.sleep(delay_ms / 1000)
+        result = record.upper()
+        _cache_put(key, result)
+    _record_latency(RECORD_LATENCY, "Time to process a single record", started)
+    return result
+
+
+async def _sleep_heartbeating(seconds: float) -> None:
+    """Sleep, heartbeating so that a cancellation of the activity reaches it."""
+    deadline = time.monotonic() + seconds
+    while (remaining := deadline - time.monotonic()) > 0:
+        activity.heartbeat()
+        await asyncio.sleep(min(remaining, HEARTBEAT_INTERVAL))
 
 
 @activity.defn
 async def process_record(record: str) -> str:
     """Convert a record to uppercase with simulated delay."""
-    delay_ms = 10
-    if random.random() < 0.05:
-        delay_ms = 1000
-    await asyncio.sleep(delay_ms / 1000)
+    # Only hedgeable attempts have a heartbeat timeout: a hedged child cancels
+    # whichever attempt loses its race, and heartbeats deliver the cancellation
+    heartbeat = activity.in_activity() and activity.info().heartbeat_timeout is not None
+    return await _transform(record, heartbeat=heartbeat)
+
+
+@activity.defn
+async def process_batch(records: List[str]) -> List[str]:
+    """Convert a whole batch of records, resuming from the last heartbeat on retry."""
+    # Heartbeat details hold the results so far, with None for unfinished records
+    details = activity.info().heartbeat_details
+    results: List[Optional[str]] = list(details[0]) if details else [None] * len(records)
+
+    async def transform(i: int) -> None:
+        results[i] = await _transform(records[i])
+        activity.heartbeat(results)
+
+    await asyncio.gather(*(transform(i) for i, result in enumerate(results) if result is None))
+    return cast(List[str], results)
+
+
+def _cpu_transform(record: str) -> str:
+    """Convert a record to uppercase after a fixed amount of CPU work."""
+    digest = record.encode()
+    for _ in range(CPU_TRANSFORM_ROUNDS):
+        digest = hashlib.sha256(digest).digest()
     return record.upper()
+
+
+@activity.defn
+def transform_records(records: List[str]) -> List[str]:
+    """Run the CPU-bound transform over a chunk of records.
+
+    This is a synchronous activity so the worker can run it on a process
+    pool; one call per chunk amortizes the pickling of arguments and
+    results between the worker and the pool.
+    """
+    return [_cached_cpu_transform(record) for record in records]
+
+
+def _cached_cpu_transform(record: str) -> str:
+    """Run the CPU-bound transform unless its result is already cached."""
+    key = ("transform_records", record)
+    result = _cache_get(key)
+    if result is None:
+        result = _cpu_transform(record)
+        _cache_put(key, result)
+    return result
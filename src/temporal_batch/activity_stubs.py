@@ -0,0 +1,60 @@
+"""Definitions of the activities for workflows to call, without their implementations.
+
+The workflow sandbox imports a workflow's module again for every workflow
+run, along with every module it imports that is not passed through.
+Workflows only need an activity's name and signature to call it, so they
+import these stubs instead of ``temporal_batch.activities``, which would
+bring the data sources, sinks, readers and record cache into every run.
+
+Each stub has the name and signature of the activity in
+``temporal_batch.activities`` that the worker registers under that name;
+the stubs themselves are never run.
+"""
+
+from typing import List, Optional
+
+from temporalio import activity
+
+from temporal_batch.shared import SourceBatches
+
+
+@activity.defn
+async def create_single_batch(batch_size: int, read_until_line: int, offset: int) -> List[str]:
+    """Read a batch of records from the data source."""
+    raise NotImplementedError
+
+
+@activity.defn
+async def read_batches(
+    batch_size: int,
+    read_until_line: int,
+    offset: int,
+    num_batches: int,
+    cursor: Optional[str],
+) -> SourceBatches:
+    """Read up to num_batches consecutive batches, resuming from cursor if one is given."""
+    raise NotImplementedError
+
+
+@activity.defn
+async def write_results(sink: str, key: str, offset: int, results: List[str]) -> bool:
+    """Append a batch's results to key's file in the sink; return False if the batch was there."""
+    raise NotImplementedError
+
+
+@activity.defn
+async def process_record(record: str) -> str:
+    """Convert a record to uppercase with simulated delay."""
+    raise NotImplementedError
+
+
+@activity.defn
+async def process_batch(records: List[str]) -> List[str]:
+    """Convert a whole batch of records, resuming from the last heartbeat on retry."""
+    raise NotImplementedError
+
+
+@activity.defn
+def transform_records(records: List[str]) -> List[str]:
+    """Run the CPU-bound transform over a chunk of records."""
+    raise NotImplementedError
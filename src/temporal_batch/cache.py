@@ -0,0 +1,110 @@
+"""Per-worker LRU cache of record transform results.
+
+Real datasets repeat records, and a transform of a record that this worker
+has already seen can be answered from memory instead of being recomputed.
+Entries are evicted least recently used first once the cache's estimated
+size exceeds its memory budget, and expire after an optional TTL so that a
+long-running worker picks up changes to the transform's inputs.
+
+The cache lives in one worker process; process-pool workers get a cache of
+their own in every pool process.
+"""
+
+import sys
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Hashable, Optional, Tuple
+
+# Estimated bytes per entry besides its key and value: the OrderedDict
+# node, the entry tuple and the float holding its expiry time
+ENTRY_OVERHEAD = 200
+
+
+# Counters kept by a RecordCache
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    # Entries dropped to stay within the memory budget
+    evictions: int = 0
+    # Entries found past their TTL
+    expirations: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        """Fraction of lookups answered from the cache."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def summary(self) -> str:
+        """Describe the counters in one line for logging."""
+        return (
+            f"{self.hits} hits, {self.misses} misses (hit rate {self.hit_rate:.1%}), "
+            f"{self.evictions} evictions, {self.expirations} expirations"
+        )
+
+
+class RecordCache:
+    """LRU cache of strings with a memory budget and an optional TTL."""
+
+    def __init__(self, max_bytes: int, ttl: Optional[float] = None) -> None:
+        if max_bytes <= 0:
+            raise ValueError(f"Cache budget must be positive, got {max_bytes}")
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.stats = CacheStats()
+        self.size = 0
+        # key -> (value, expiry time on the monotonic clock, estimated size)
+        self._entries: "OrderedDict[Hashable, Tuple[str, float, int]]" = OrderedDict()
+        # Sync activities run on a thread pool alongside the event loop
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[str]:
+        """Return the cached value for key, or None on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats.misses += 1
+                return None
+            value, expires_at, size = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self.size -= size
+                self.stats.expirations += 1
+                self.stats.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: str) -> int:
+        """Cache value for key and return the number of entries evicted to make room."""
+        size = _sizeof(key) + sys.getsizeof(value) + ENTRY_OVERHEAD
+        if size > self.max_bytes:
+            return 0
+        expires_at = time.monotonic() + self.ttl if self.ttl is not None else float("inf")
+        evicted = 0
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.size -= previous[2]
+            self._entries[key] = (value, expires_at, size)
+            self.size += size
+            while self.size > self.max_bytes:
+                _, (_, _, evicted_size) = self._entries.popitem(last=False)
+                self.size -= evicted_size
+                evicted += 1
+            self.stats.evictions += evicted
+        return evicted
+
+
+def _sizeof(key: Hashable) -> int:
+    """Estimate the bytes held by a key, including the items of a tuple key."""
+    if isinstance(key, tuple):
+        return sys.getsizeof(key) + sum(sys.getsizeof(item) for item in key)
+    return sys.getsizeof(key)
@@ -0,0 +1,138 @@
+"""Payload codec that compresses large payloads with zlib or lzma.
+
+Batches travel as JSON payloads in activity results, child workflow inputs
+and continue-as-new arguments, and every one of them is sent over gRPC and
+stored in history. ``CompressionCodec`` compresses each payload whose
+serialized size reaches a threshold and leaves smaller ones untouched, since
+a few hundred bytes compress poorly and aren't worth the CPU.
+
+Decoding recognizes both algorithms whatever the codec encodes with, so
+clients and workers only need to agree on whether compression is on, not on
+which algorithm or threshold they use.
+"""
+
+import dataclasses
+import lzma
+import time
+import zlib
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from temporalio.api.common.v1 import Payload
+from temporalio.converter import DataConverter, PayloadCodec
+
+COMPRESSION_ZLIB = "zlib"
+COMPRESSION_LZMA = "lzma"
+COMPRESSION_ALGORITHMS = (COMPRESSION_ZLIB, COMPRESSION_LZMA)
+
+# Payloads smaller than this many serialized bytes are sent uncompressed
+COMPRESSION_THRESHOLD = 1024
+
+_ENCODINGS: Dict[str, bytes] = {
+    COMPRESSION_ZLIB: b"binary/zlib",
+    COMPRESSION_LZMA: b"binary/lzma",
+}
+
+_DECOMPRESSORS: Dict[bytes, Callable[[bytes], bytes]] = {
+    _ENCODINGS[COMPRESSION_ZLIB]: zlib.decompress,
+    _ENCODINGS[COMPRESSION_LZMA]: lzma.decompress,
+}
+
+
+# Running totals kept by a CompressionCodec
+@dataclass
+class CompressionStats:
+    # Payloads passed to encode and how many of them were compressed
+    payloads: int = 0
+    compressed: int = 0
+    # Serialized size of the compressed payloads before and after compression
+    bytes_in: int = 0
+    bytes_out: int = 0
+    # CPU time spent in encode and decode, in seconds
+    encode_seconds: float = 0.0
+    decode_seconds: float = 0.0
+    decoded: int = 0
+
+    @property
+    def ratio(self) -> float:
+        """Uncompressed over compressed size of the payloads that were compressed."""
+        return self.bytes_in / self.bytes_out if self.bytes_out else 1.0
+
+    def summary(self) -> str:
+        """Describe the totals in one line for logging."""
+        encode_us = self.encode_seconds / self.payloads * 1e6 if self.payloads else 0.0
+        decode_us = self.decode_seconds / self.decoded * 1e6 if self.decoded else 0.0
+        return (
+            f"compressed {self.compressed}/{self.payloads} payloads, "
+            f"{self.bytes_in} -> {self.bytes_out} bytes (ratio {self.ratio:.2f}), "
+            f"encode {encode_us:.1f}us/payload, decode {decode_us:.1f}us/payload"
+        )
+
+
+class CompressionCodec(PayloadCodec):
+    """Compress payloads of at least ``threshold`` serialized bytes."""
+
+    def __init__(
+        self,
+        algorithm: str = COMPRESSION_ZLIB,
+        threshold: int = COMPRESSION_THRESHOLD,
+        level: Optional[int] = None,
+    ) -> None:
+        if algorithm not in _ENCODINGS:
+            raise ValueError(f"Unknown compression algorithm: {algorithm}")
+        self.algorithm = algorithm
+        self.threshold = threshold
+        self.stats = CompressionStats()
+        self._encoding = _ENCODINGS[algorithm]
+        if algorithm == COMPRESSION_ZLIB:
+            zlib_level = zlib.Z_DEFAULT_COMPRESSION if level is None else level
+            self._compress: Callable[[bytes], bytes] = lambda data: zlib.compress(data, zlib_level)
+        else:
+            lzma_preset = lzma.PRESET_DEFAULT if level is None else level
+            self._compress = lambda data: lzma.compress(data, preset=lzma_preset)
+
+    async def encode(self, payloads: Sequence[Payload]) -> List[Payload]:
+        started = time.process_time()
+        encoded = [self._encode_one(payload) for payload in payloads]
+        self.stats.payloads += len(payloads)
+        self.stats.encode_seconds += time.process_time() - started
+        return encoded
+
+    async def decode(self, payloads: Sequence[Payload]) -> List[Payload]:
+        started = time.process_time()
+        decoded = [_decode_one(payload) for payload in payloads]
+        self.stats.decoded += len(payloads)
+        self.stats.decode_seconds += time.process_time() - started
+        return decoded
+
+    def _encode_one(self, payload: Payload) -> Payload:
+        data = payload.SerializeToString()
+        if len(data) < self.threshold:
+            return payload
+        compressed = self._compress(data)
+        # Already-compressed or random data can grow; keep whichever is smaller
+        if len(compressed) >= len(data):
+            return payload
+        self.stats.compressed += 1
+        self.stats.bytes_in += len(data)
+        self.stats.bytes_out += len(compressed)
+        return Payload(metadata={"encoding": self._encoding}, data=compressed)
+
+
+def _decode_one(payload: Payload) -> Payload:
+    decompress = _DECOMPRESSORS.get(payload.metadata.get("encoding", b""))
+    if decompress is None:
+        return payload
+    decoded = Payload()
+    decoded.ParseFromString(decompress(payload.data))
+    return decoded
+
+
+def compression_data_converter(
+    algorithm: Optional[str], threshold: int = COMPRESSION_THRESHOLD
+) -> Tuple[DataConverter, Optional[CompressionCodec]]:
+    """Return the default data converter, with a compression codec unless algorithm is None."""
+    if algorithm is None:
+        return DataConverter.default, None
+    codec = CompressionCodec(algorithm, threshold)
+    return dataclasses.replace(DataConverter.default, payload_codec=codec), codec
@@ -0,0 +1,243 @@
+"""Worker interceptors that show where time goes inside a worker.
+
+``TimingInterceptor`` records the wall time of every activity execution,
+tagged with the activity and workflow type, and of every workflow step: the
+code a workflow's run method or a signal handler runs between two awaits,
+tagged with the workflow type. With a profile directory set, a sampled
+fraction of activity executions also run under cProfile, and the profiles of
+the slow ones are written out for inspection with ``pstats`` or snakeviz.
+
+A synchronous activity is profiled where it runs, inside the activity
+executor's thread or process, so its profile holds the activity's own work.
+An async activity shares the event loop thread with every other coroutine on
+the worker, and cProfile can't tell them apart: its profile covers the whole
+loop while it ran, and is written with a ``-loop`` suffix. Only one profile
+runs on the loop at a time, and where cProfile allows only one profile per
+process (Python 3.12 and later) only one per process; samples that find a
+profile already running are skipped and logged.
+
+The interceptor is only installed when the worker is started with
+``--timing`` or ``--profile-dir``, so a worker without them pays nothing.
+"""
+
+import cProfile
+import dataclasses
+import functools
+import inspect
+import logging
+import random
+import re
+import time
+from pathlib import Path
+from typing import Any, Callable, Coroutine, Generator, Optional, Type
+
+from temporalio import activity, workflow
+from temporalio.common import MetricMeter
+from temporalio.worker import (
+    ActivityInboundInterceptor,
+    ExecuteActivityInput,
+    ExecuteWorkflowInput,
+    HandleSignalInput,
+    Interceptor,
+    WorkflowInboundInterceptor,
+    WorkflowInterceptorClassInput,
+)
+
+from temporal_batch.metrics import ACTIVITY_EXECUTION_TIME, WORKFLOW_STEP_TIME
+
+logger = logging.getLogger(__name__)
+
+
+class TimingInterceptor(Interceptor):
+    """Time activity executions and workflow steps, optionally profiling slow activities."""
+
+    def __init__(
+        self,
+        meter: MetricMeter,
+        profile_dir: Optional[Path] = None,
+        profile_threshold: float = 1.0,
+        profile_sample_rate: float = 0.1,
+    ) -> None:
+        # The runtime's meter, since process-pool activities have none of their own
+        self.meter = meter
+        self.profile_dir = profile_dir
+        self.profile_threshold = profile_threshold
+        self.profile_sample_rate = profile_sample_rate
+        # A profile on the event loop covers every coroutine, so only one runs at a time
+        self._profiling = False
+
+    def intercept_activity(self, next: ActivityInboundInterceptor) -> ActivityInboundInterceptor:
+        return _ActivityTimingInterceptor(next, self)
+
+    def workflow_interceptor_class(
+        self, input: WorkflowInterceptorClassInput
+    ) -> Type[WorkflowInboundInterceptor]:
+        return _WorkflowTimingInterceptor
+
+    def sampled(self) -> bool:
+        """Return whether to profile an activity execution."""
+        return self.profile_dir is not None and random.random() < self.profile_sample_rate
+
+    def start_loop_profile(self, info: activity.Info) -> Optional[cProfile.Profile]:
+        """Start profiling the event loop for a sampled async execution, or return None."""
+        if self._profiling:
+            _log_skipped(info)
+            return None
+        profiler = _start_profiler(info)
+        self._profiling = profiler is not None
+        return profiler
+
+    def finish_loop_profile(
+        self, profiler: cProfile.Profile, info: activity.Info, elapsed: float
+    ) -> None:
+        """Stop profiling the event loop and keep the profile if the execution was slow."""
+        profiler.disable()
+        self._profiling = False
+        assert self.profile_dir is not None
+        _keep_if_slow(profiler, info, self.profile_dir, self.profile_threshold, elapsed, "-loop")
+
+    def profiled(self, fn: Callable[..., Any]) -> Callable[..., Any]:
+        """Wrap a synchronous activity function to profile it where the executor runs it."""
+        assert self.profile_dir is not None
+        # A partial of a module-level function pickles, for process pools
+        return functools.partial(_profile_call, fn, self.profile_dir, self.profile_threshold)
+
+
+def _profile_call(fn: Callable[..., Any], profile_dir: Path, threshold: float, *args: Any) -> Any:
+    """Call a synchronous activity function under cProfile and keep the profile if it was slow."""
+    info = activity.info()
+    profiler = _start_profiler(info)
+    if profiler is None:
+        return fn(*args)
+    started = time.perf_counter()
+    try:
+        return fn(*args)
+    finally:
+        profiler.disable()
+        _keep_if_slow(profiler, info, profile_dir, threshold, time.perf_counter() - started)
+
+
+def _start_profiler(info: activity.Info) -> Optional[cProfile.Profile]:
+    """Return an enabled profiler, or None if another one is active in this process."""
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        _log_skipped(info)
+        return None
+    return profiler
+
+
+def _log_skipped(info: activity.Info) -> None:
+    logger.info(
+        "Not profiling activity %s %s: another profile is running",
+        info.activity_type,
+        info.activity_id,
+    )
+
+
+def _keep_if_slow(
+    profiler: cProfile.Profile,
+    info: activity.Info,
+    profile_dir: Path,
+    threshold: float,
+    elapsed: float,
+    suffix: str = "",
+) -> None:
+    """Write the profile of an execution out if it took at least threshold seconds."""
+    if elapsed < threshold:
+        return
+    name = f"{info.activity_type}-{info.workflow_id}-{info.activity_id}-{info.attempt}{suffix}"
+    path = profile_dir / f"{re.sub(r'[^A-Za-z0-9_.-]', '_', name)}.prof"
+    profiler.dump_stats(path)
+    logger.warning(
+        "Activity %s took %.3fs, profile written to %s", info.activity_type, elapsed, path
+    )
+
+
+class _ActivityTimingInterceptor(ActivityInboundInterceptor):
+    def __init__(self, next: ActivityInboundInterceptor, root: TimingInterceptor) -> None:
+        super().__init__(next)
+        self._root = root
+
+    async def execute_activity(self, input: ExecuteActivityInput) -> Any:
+        info = activity.info()
+        profiler = None
+        if self._root.sampled():
+            if _is_async(input.fn):
+                profiler = self._root.start_loop_profile(info)
+            else:
+                # The function's work happens in the executor, not on this thread
+                input = dataclasses.replace(input, fn=self._root.profiled(input.fn))
+        started = time.perf_counter()
+        try:
+            return await self.next.execute_activity(input)
+        finally:
+            elapsed = time.perf_counter() - started
+            if profiler is not None:
+                self._root.finish_loop_profile(profiler, info, elapsed)
+            self._root.meter.with_additional_attributes(
+                {
+                    "activity_type": info.activity_type,
+                    "workflow_type": info.workflow_type or "",
+                    "task_queue": info.task_queue,
+                }
+            ).create_histogram_float(
+                ACTIVITY_EXECUTION_TIME, "Wall time of an activity execution", "s"
+            ).record(elapsed)
+
+
+def _is_async(fn: Callable[..., Any]) -> bool:
+    """Return whether an activity function is async, the way the SDK decides."""
+    return inspect.iscoroutinefunction(fn) or inspect.iscoroutinefunction(
+        getattr(fn, "__call__", None)
+    )
+
+
+class _WorkflowTimingInterceptor(WorkflowInboundInterceptor):
+    async def execute_workflow(self, input: ExecuteWorkflowInput) -> Any:
+        return await _TimedSteps(self.next.execute_workflow(input), _step_recorder())
+
+    async def handle_signal(self, input: HandleSignalInput) -> None:
+        return await _TimedSteps(self.next.handle_signal(input), _step_recorder())
+
+
+def _step_recorder() -> Callable[[float], None]:
+    """Return a callback that records a workflow step's duration."""
+    histogram = workflow.metric_meter().create_histogram_float(
+        WORKFLOW_STEP_TIME, "Wall time of workflow code between two awaits", "s"
+    )
+
+    def record(elapsed: float) -> None:
+        # Replayed steps already ran once; the meter drops them anyway
+        if not workflow.unsafe.is_replaying():
+            histogram.record(elapsed)
+
+    return record
+
+
+class _TimedSteps:
+    """Await a coroutine, timing each step it runs until it suspends."""
+
+    def __init__(self, coro: Coroutine[Any, Any, Any], record: Callable[[float], None]) -> None:
+        self._coro = coro
+        self._record = record
+
+    def __await__(self) -> Generator[Any, Any, Any]:
+        value: Any = None
+        error: Optional[BaseException] = None
+        while True:
+            started = time.perf_counter()
+            try:
+                yielded = self._coro.send(value) if error is None else self._coro.throw(error)
+            except StopIteration as stop:
+                self._record(time.perf_counter() - started)
+                return stop.value
+            except BaseException:
+                self._record(time.perf_counter() - started)
+                raise
+            self._record(time.perf_counter() - started)
+            try:
+                value, error = (yield yielded), None
+            except BaseException as e:
+                value, error = None, e
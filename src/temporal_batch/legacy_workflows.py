@@ -0,0 +1,78 @@
+"""The parent and child workflows as first released, kept for runs started before V2.
+
+BatchParentWorkflow and BatchChildWorkflow in temporal_batch.workflows read
+batches with read_batches, name and abandon their children and complete them
+by signal, so they can't replay histories recorded by these. They are
+registered as BatchParentWorkflowV2 and BatchChildWorkflowV2, and workers
+keep registering these under the original type names until no run of them is
+left open. Don't change the commands these send.
+"""
+
+import asyncio
+from datetime import timedelta
+from typing import List
+
+from temporalio import workflow
+
+with workflow.unsafe.imports_passed_through():
+    from temporal_batch.activity_stubs import create_single_batch, process_record
+    from temporal_batch.shared import BatchParentWorkflowParams
+
+BATCH_SIZE = 50
+WINDOW_SIZE = 4
+CONTINUE_AS_NEW_THRESHOLD = 500
+
+
+@workflow.defn(name="BatchChildWorkflow")
+class LegacyBatchChildWorkflow:
+    @workflow.run
+    async def run(self, batch: List[str]) -> None:
+        tasks = [
+            workflow.execute_activity(
+                process_record,
+                record,
+                start_to_close_timeout=timedelta(seconds=60),
+            )
+            for record in batch
+        ]
+        await asyncio.gather(*tasks)
+
+
+@workflow.defn(name="BatchParentWorkflow")
+class LegacyBatchParentWorkflow:
+    @workflow.run
+    async def run(self, params: BatchParentWorkflowParams) -> None:
+        active: set[asyncio.Task[None]] = set()
+        processed = 0
+        current_offset = params.offset
+
+        while True:
+            batch = await workflow.execute_activity(
+                create_single_batch,
+                args=[BATCH_SIZE, params.num_words, current_offset],
+                start_to_close_timeout=timedelta(seconds=60),
+            )
+            if not batch:
+                break
+
+            if len(active) >= WINDOW_SIZE:
+                # workflow.wait rather than asyncio.wait, which the sandbox restricts;
+                # the commands are the same
+                _, pending = await workflow.wait(active, return_when=asyncio.FIRST_COMPLETED)
+                active = set(pending)
+
+            child_task = asyncio.create_task(
+                workflow.execute_child_workflow(LegacyBatchChildWorkflow.run, batch)
+            )
+            active.add(child_task)
+            processed += 1
+            current_offset += BATCH_SIZE
+
+            if processed >= CONTINUE_AS_NEW_THRESHOLD:
+                await asyncio.gather(*active)
+                workflow.continue_as_new(
+                    BatchParentWorkflowParams(params.num_words, current_offset)
+                )
+
+        if active:
+            await asyncio.gather(*active)
@@ -0,0 +1,160 @@
+"""Persisted byte-offset index over the lines of a text file.
+
+The index lets batch reads seek straight to a line instead of scanning every
+line before it. It is stored in a sidecar file next to the data file and is
+rebuilt whenever the data file's mtime or size changes. An index that skips
+blank lines numbers only the lines that hold a record; it has a sidecar of
+its own.
+"""
+
+import os
+import struct
+import sys
+import threading
+from array import array
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+INDEX_SUFFIX = ".idx"
+RECORD_INDEX_SUFFIX = ".records.idx"
+
+_MAGIC = b"TBLIDX01"
+# magic, data file mtime_ns, data file size, number of stored offsets
+_HEADER = struct.Struct("<8sQQQ")
+_READ_CHUNK = 1 << 20
+
+# Indexes already loaded by this process, keyed by data file path and skip_blank
+_loaded: Dict[Tuple[Path, bool], "LineIndex"] = {}
+# Activities read on a thread pool; only one thread loads or builds an index
+_lock = threading.Lock()
+
+
+class LineIndex:
+    """Start offset of every line in a file, followed by the end-of-file offset."""
+
+    def __init__(self, mtime_ns: int, size: int, offsets: "array[int]") -> None:
+        self.mtime_ns = mtime_ns
+        self.size = size
+        self.offsets = offsets
+
+    def __len__(self) -> int:
+        """Return the number of lines in the indexed file."""
+        return len(self.offsets) - 1
+
+    def matches(self, stat: os.stat_result) -> bool:
+        """Return True if the index was built for a file with this stat."""
+        return self.mtime_ns == stat.st_mtime_ns and self.size == stat.st_size
+
+    def clamp(self, start: int, count: int) -> Tuple[int, int]:
+        """Clamp the line range [start, start + count) to the indexed lines."""
+        start = min(max(start, 0), len(self))
+        end = min(start + max(count, 0), len(self))
+        return start, end
+
+
+def sidecar_path(path: Path, skip_blank: bool = False) -> Path:
+    """Return the path of the index sidecar for a data file."""
+    return path.with_name(path.name + (RECORD_INDEX_SUFFIX if skip_blank else INDEX_SUFFIX))
+
+
+def build_line_index(path: Path, skip_blank: bool = False) -> LineIndex:
+    """Scan a file once and record the byte offset of each line, or of each non-blank one."""
+    stat = os.stat(path)
+    if skip_blank:
+        return LineIndex(stat.st_mtime_ns, stat.st_size, _non_blank_offsets(path))
+    offsets = array("Q", [0])
+    position = 0
+    with open(path, "rb") as f:
+        while chunk := f.read(_READ_CHUNK):
+            newline = chunk.find(b"\n")
+            while newline != -1:
+                offsets.append(position + newline + 1)
+                newline = chunk.find(b"\n", newline + 1)
+            position += len(chunk)
+    # A final line without a trailing newline still counts as a line
+    if offsets[-1] != position:
+        offsets.append(position)
+    return LineIndex(stat.st_mtime_ns, stat.st_size, offsets)
+
+
+def _non_blank_offsets(path: Path) -> "array[int]":
+    """Return the start offset of each line that is not blank, followed by the end of file."""
+    offsets = array("Q")
+    position = 0
+    with open(path, "rb") as f:
+        for line in f:
+            if not line.isspace():
+                offsets.append(position)
+            position += len(line)
+    offsets.append(position)
+    return offsets
+
+
+def load_line_index(path: Path, skip_blank: bool = False) -> Optional[LineIndex]:
+    """Load the sidecar index for a file, or None if it is missing or stale."""
+    try:
+        stat = os.stat(path)
+        with open(sidecar_path(path, skip_blank), "rb") as f:
+            header = f.read(_HEADER.size)
+            if len(header) != _HEADER.size:
+                return None
+            magic, mtime_ns, size, count = _HEADER.unpack(header)
+            if magic != _MAGIC or mtime_ns != stat.st_mtime_ns or size != stat.st_size:
+                return None
+            offsets = array("Q")
+            offsets.fromfile(f, count)
+    except (OSError, EOFError):
+        return None
+    if sys.byteorder != "little":
+        offsets.byteswap()
+    return LineIndex(mtime_ns, size, offsets)
+
+
+def save_line_index(path: Path, index: LineIndex, skip_blank: bool = False) -> None:
+    """Persist an index next to its data file, replacing any previous sidecar."""
+    target = sidecar_path(path, skip_blank)
+    tmp = target.with_name(f"{target.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    offsets = array("Q", index.offsets)
+    if sys.byteorder != "little":
+        offsets.byteswap()
+    with open(tmp, "wb") as f:
+        f.write(_HEADER.pack(_MAGIC, index.mtime_ns, index.size, len(offsets)))
+        offsets.tofile(f)
+    os.replace(tmp, target)
+
+
+def get_line_index(path: Path, skip_blank: bool = False) -> LineIndex:
+    """Return a current index for a file, loading or rebuilding it as needed."""
+    stat = os.stat(path)
+    index = _loaded.get((path, skip_blank))
+    if index is not None and index.matches(stat):
+        return index
+
+    with _lock:
+        index = _loaded.get((path, skip_blank))
+        if index is not None and index.matches(stat):
+            return index
+        index = load_line_index(path, skip_blank)
+        if index is None or not index.matches(stat):
+            index = build_line_index(path, skip_blank)
+            try:
+                save_line_index(path, index, skip_blank)
+            except OSError:
+                # Read-only data directory: keep the index in memory only
+                pass
+        _loaded[(path, skip_blank)] = index
+    return index
+
+
+def read_lines(path: Path, start: int, count: int) -> List[str]:
+    """Read up to count lines starting at line number start with a single seek."""
+    index = get_line_index(path)
+    first, last = index.clamp(start, count)
+    if first >= last:
+        return []
+
+    offsets = index.offsets
+    with open(path, "rb") as f:
+        f.seek(offsets[first])
+        data = f.read(offsets[last] - offsets[first])
+    return [line.strip() for line in data.decode().split("\n")[: last - first]]
@@ -0,0 +1,43 @@
+"""Names and histogram buckets of the custom metrics emitted by workers.
+
+Activities and workflows record these through the SDK's metric meters, so
+they are exported together with the SDK's own metrics when the worker runs
+with ``--metrics-port``.
+"""
+
+from typing import Dict, Sequence
+
+# Activities
+BATCH_READ_LATENCY = "batch_read_latency"
+RECORD_LATENCY = "record_latency"
+RECORD_CACHE_HITS = "record_cache_hits"
+RECORD_CACHE_MISSES = "record_cache_misses"
+RECORD_CACHE_EVICTIONS = "record_cache_evictions"
+SINK_WRITE_LATENCY = "sink_write_latency"
+SINK_DUPLICATE_BATCHES = "sink_duplicate_batches"
+
+# BatchParentWorkflow
+CHILD_WORKFLOW_DURATION = "child_workflow_duration"
+WINDOW_OCCUPANCY = "window_occupancy"
+WINDOW_LIMIT = "window_limit"
+CONTINUE_AS_NEW = "parent_continue_as_new"
+
+# TimingInterceptor
+ACTIVITY_EXECUTION_TIME = "activity_execution_time"
+WORKFLOW_STEP_TIME = "workflow_step_time"
+
+# BatchChildWorkflow
+HEDGES_STARTED = "batch_hedges_started"
+HEDGES_WON = "batch_hedges_won"
+LOCAL_RECORD_FALLBACKS = "batch_local_record_fallbacks"
+
+# Bucket boundaries in seconds. process_record takes 10ms normally and 1s for
+# stragglers, and a child's duration is set by its slowest record.
+HISTOGRAM_BUCKETS: Dict[str, Sequence[float]] = {
+    BATCH_READ_LATENCY: (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0),
+    SINK_WRITE_LATENCY: (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0),
+    RECORD_LATENCY: (0.005, 0.01, 0.02, 0.05, 0.1, 0.25, 0.5, 1.0, 1.5, 2.5, 5.0),
+    CHILD_WORKFLOW_DURATION: (0.05, 0.1, 0.25, 0.5, 1.0, 1.5, 2.0, 3.0, 5.0, 10.0, 30.0, 60.0),
+    ACTIVITY_EXECUTION_TIME: (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+    WORKFLOW_STEP_TIME: (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.05),
+}
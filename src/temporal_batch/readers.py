@@ -0,0 +1,70 @@
+"""Reader backends that slice batches of lines out of a data file.
+
+``readline`` opens the file for every batch and seeks to the first line.
+``mmap`` maps the file once per worker process, shares the mapping between
+activity calls and decodes only the lines it returns.
+"""
+
+import mmap
+import os
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from temporal_batch import line_index
+from temporal_batch.line_index import LineIndex, get_line_index
+
+READLINE_BACKEND = "readline"
+MMAP_BACKEND = "mmap"
+BACKENDS = (READLINE_BACKEND, MMAP_BACKEND)
+
+# Mappings shared by every activity call in this process, keyed by data file path
+_mapped: Dict[Path, "MappedFile"] = {}
+_lock = threading.Lock()
+
+
+class MappedFile:
+    """A read-only memory mapping of a data file together with its line index."""
+
+    def __init__(self, path: Path) -> None:
+        self.index: LineIndex = get_line_index(path)
+        self.map: Optional[mmap.mmap] = None
+        if self.index.size:
+            with open(path, "rb") as f:
+                self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def read_lines(self, start: int, count: int) -> List[str]:
+        """Decode up to count lines starting at line number start."""
+        first, last = self.index.clamp(start, count)
+        if self.map is None or first >= last:
+            return []
+        offsets = self.index.offsets
+        # Slicing a memoryview does not copy; only the returned lines are decoded
+        with memoryview(self.map) as view:
+            text = str(view[offsets[first] : offsets[last]], "utf-8")
+        return [line.strip() for line in text.split("\n")[: last - first]]
+
+
+def get_mapped_file(path: Path) -> MappedFile:
+    """Return this process's mapping of a file, remapping it if the file changed."""
+    stat = os.stat(path)
+    mapped = _mapped.get(path)
+    if mapped is not None and mapped.index.matches(stat):
+        return mapped
+
+    with _lock:
+        mapped = _mapped.get(path)
+        if mapped is None or not mapped.index.matches(stat):
+            # The previous mapping is released once no reader references it
+            mapped = MappedFile(path)
+            _mapped[path] = mapped
+    return mapped
+
+
+def read_lines(path: Path, start: int, count: int, backend: str = READLINE_BACKEND) -> List[str]:
+    """Read up to count lines starting at line number start using a backend."""
+    if backend == READLINE_BACKEND:
+        return line_index.read_lines(path, start, count)
+    if backend == MMAP_BACKEND:
+        return get_mapped_file(path).read_lines(start, count)
+    raise ValueError(f"Unknown reader backend {backend!r}, expected one of {BACKENDS}")
@@ -1,12 +1,213 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 import os
+from typing import List, Optional
 
 TASK_QUEUE = os.getenv("TEMPORAL_BATCHPROCESSING_TASKQUEUE", "BatchWorkflow")
 ADDRESS = os.getenv("TEMPORAL_ADDRESS", "localhost:7233")
 NAMESPACE = os.getenv("TEMPORAL_NAMESPACE", "default")
+READER_BACKEND = os.getenv("TEMPORAL_BATCH_READER", "readline")
+# Data source spec, see temporal_batch.sources; empty reads the bundled words file
+DATA_SOURCE = os.getenv("TEMPORAL_BATCH_SOURCE", "")
+
+# How a child workflow processes its batch: one activity per record, one per
+# batch, or one CPU-bound transform_records activity per chunk of records
+PROCESSING_MODE_RECORD = "record"
+PROCESSING_MODE_BATCH = "batch"
+PROCESSING_MODE_CPU = "cpu"
+PROCESSING_MODES = (PROCESSING_MODE_RECORD, PROCESSING_MODE_BATCH, PROCESSING_MODE_CPU)
+
+# Lifecycle of a shard run by ShardedBatchWorkflow
+SHARD_PENDING = "pending"
+SHARD_RUNNING = "running"
+SHARD_COMPLETED = "completed"
+SHARD_FAILED = "failed"
+
+
+# Consecutive batches read from the data source, each with the cursor of the
+# record after it
+@dataclass
+class SourceBatches:
+    batches: List[List[str]] = field(default_factory=list)
+    cursors: List[str] = field(default_factory=list)
+
+
+# A child workflow that was still running when its parent continued-as-new
+@dataclass
+class InFlightBatch:
+    workflow_id: str
+    offset: int
+    # Workflow time the child was started, in seconds since the epoch
+    started_at: float = 0.0
+    attempt: int = 1
+    # Number of records in the batch
+    count: int = 0
+
+
+# A failed batch waiting to be started again
+@dataclass
+class BatchRetry:
+    offset: int
+    attempt: int
+    # Number of records in the batch; 0 uses the parent's batch size
+    count: int = 0
+
+
+# Hedged record executions in a child workflow, summed by the parent
+@dataclass
+class HedgeStats:
+    started: int = 0
+    won: int = 0
+
+
+# Signalled by a child workflow to its parent when it finishes
+@dataclass
+class BatchCompletion:
+    workflow_id: str
+    succeeded: bool = True
+    hedge_stats: HedgeStats = field(default_factory=HedgeStats)
+    # Records the child read and processed; fewer than its range holds once
+    # the data runs out. None counts the whole batch
+    records: Optional[int] = None
+
+
+# Signalled to a running parent to change its window bounds or batch size;
+# None leaves a setting as it is. A new batch size applies to batches not yet
+# read, and a new window bound takes effect as children complete.
+@dataclass
+class ResizeRequest:
+    min_window_size: Optional[int] = None
+    max_window_size: Optional[int] = None
+    batch_size: Optional[int] = None
+
+
+# A parent's progress, as returned by its progress query
+@dataclass
+class BatchProgress:
+    num_words: int
+    completed_records: int
+    # Offset of the next batch not yet started
+    offset: int
+    in_flight: int
+    window_size: int
+    batch_size: int
+    paused: bool
+    # Records completed per second over the last THROUGHPUT_WINDOW seconds
+    throughput: float
+    # Seconds until the remaining records complete at that throughput; None
+    # while nothing has completed yet
+    eta: Optional[float] = None
 
 
 @dataclass
 class BatchParentWorkflowParams:
     num_words: int
     offset: int = 0
+    processing_mode: str = PROCESSING_MODE_RECORD
+    # Hand children (offset, count) ranges to read themselves instead of word lists
+    read_in_child: bool = False
+    # Continue-as-new once history reaches either cap (None uses the workflow default)
+    max_history_length: Optional[int] = None
+    max_history_size: Optional[int] = None
+    # Bounds of the adaptive window of running children (None uses the workflow
+    # default) and the child latency above which the window shrinks
+    min_window_size: Optional[int] = None
+    max_window_size: Optional[int] = None
+    target_batch_latency: Optional[float] = None
+    # Records per transform_records call in cpu mode
+    chunk_size: Optional[int] = None
+    # Batches read ahead of the window with one read_batches call
+    prefetch_batches: Optional[int] = None
+    # Hedge records still running once this fraction of their batch is done
+    hedge_percentile: Optional[float] = None
+    # Run records as local activities, falling back to a regular activity for
+    # a record that takes longer than this many seconds
+    local_record_timeout: Optional[float] = None
+    # Records per child workflow (None uses the workflow default)
+    batch_size: Optional[int] = None
+    # Sink spec that each child appends its batch's results to, see
+    # temporal_batch.sinks; None discards the results
+    sink: Optional[str] = None
+    # Label the window gauges with the parent's workflow ID. Each parent then
+    # exports series of its own, so only set it for a bounded number of parents
+    per_parent_metrics: bool = False
+    # State carried over from the previous run
+    # Data source cursor of the record at offset; None seeks to offset
+    cursor: Optional[str] = None
+    window_size: Optional[float] = None
+    in_flight: List[InFlightBatch] = field(default_factory=list)
+    retries: List[BatchRetry] = field(default_factory=list)
+    hedge_stats: HedgeStats = field(default_factory=HedgeStats)
+    completed_records: int = 0
+    # Offset at which a child found the data to end; no new batch starts past it
+    source_end: Optional[int] = None
+    # Start no new children until the resume signal
+    paused: bool = False
+
+
+@dataclass
+class BatchChildWorkflowParams:
+    processing_mode: str = PROCESSING_MODE_RECORD
+    # When set, the child reads lines [offset, offset + count) itself
+    offset: Optional[int] = None
+    count: int = 0
+    hedge_percentile: Optional[float] = None
+    chunk_size: Optional[int] = None
+    local_record_timeout: Optional[float] = None
+    # Sink spec to write the results to, keyed by the batch's offset
+    sink: Optional[str] = None
+    batch_offset: int = 0
+
+
+@dataclass
+class RecordPoolWorkflowParams:
+    num_words: int
+    offset: int = 0
+    # Number of process_record activities kept in flight
+    pool_size: Optional[int] = None
+    # Continue-as-new caps on the workflow's own history
+    max_history_length: Optional[int] = None
+    max_history_size: Optional[int] = None
+    # Records still running when the previous run continued as new, started
+    # again before any record from offset
+    in_flight: List[str] = field(default_factory=list)
+
+
+# Signalled by a shard's parent workflow to the orchestrator that started it
+@dataclass
+class ShardProgress:
+    workflow_id: str
+    completed_records: int
+    # The shard's outcome, SHARD_COMPLETED or SHARD_FAILED, on its final report
+    status: Optional[str] = None
+
+
+# A shard's range [offset, end) and state, as returned by the progress query
+@dataclass
+class ShardStatus:
+    workflow_id: str
+    offset: int
+    end: int
+    task_queue: str
+    status: str = SHARD_PENDING
+    completed_records: int = 0
+
+
+@dataclass
+class ShardedBatchWorkflowParams:
+    num_words: int
+    # Shards running at once; also the number of shards when shard_size is not set
+    num_shards: Optional[int] = None
+    shard_size: Optional[int] = None
+    # Shards are assigned to these task queues round-robin; defaults to the
+    # orchestrator's own task queue
+    task_queues: List[str] = field(default_factory=list)
+    # Settings for every shard's BatchParentWorkflow; num_words and offset are
+    # replaced by the shard's range
+    parent: BatchParentWorkflowParams = field(
+        default_factory=lambda: BatchParentWorkflowParams(0)
+    )
+    # Continue-as-new caps of the orchestrator itself (None uses the workflow default)
+    max_history_length: Optional[int] = None
+    max_history_size: Optional[int] = None
+    # State carried over from the previous run: every shard and its status
+    shards: List[ShardStatus] = field(default_factory=list)
@@ -0,0 +1,271 @@
+"""Append-only sinks that the results of batches are written to.
+
+Each child workflow hands its batch's results to one ``write_results``
+activity. That activity appends them to a file named after a key, the
+parent's workflow ID, so every shard of a sharded run writes a file of its
+own. A batch goes out as a single sequential write, rather than one small
+write per record.
+
+Writes are keyed by the batch's offset. Before appending, a sink reads the
+batch offsets already in the file and skips a batch that is there. A
+retried ``write_results`` activity, a retried child, or a child started
+again after continue-as-new therefore never duplicates rows. Only what was
+appended since a process's last write is read again, and a file lock keeps
+writers from appending at the same time. A batch cut short by a crash is
+found by the next writer and truncated before it appends; the batch's own
+retry writes it again.
+
+A retried batch can run on any worker, so this only holds if every worker
+writes to the same files: the directory must be on shared storage whose file
+locks work across hosts, such as NFSv4 or CephFS. A sink refuses a directory
+on a local filesystem unless the spec says all workers share this host.
+
+Sinks are selected with a spec of the form ``[KIND:]DIRECTORY[?OPTION=VALUE&...]``:
+
+- ``jsonl`` (default): one JSON object per result, with the result, the
+  offset of its record, and the offset and size of its batch
+- ``frames``: one length-prefixed binary frame per batch. A frame is a header
+  holding the batch's offset, its number of results, the payload length and
+  the payload's CRC-32, followed by a payload of each result as a 4-byte
+  length and its UTF-8 bytes
+
+Both take the options ``fsync`` (default true), which flushes each batch to
+disk before the activity completes so that a batch recorded as written
+survives a crash of the host, and ``shared`` (default true). With ``shared``
+the directory must be on one of the shared filesystems below; set it to
+false when every worker runs on the host that holds the directory. Where the
+filesystem can't be told, as off Linux, the directory is trusted to be
+shared.
+"""
+
+import functools
+import json
+import os
+import re
+import struct
+import sys
+import threading
+import zlib
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import IO, Dict, Iterator, List, Optional, Set, Tuple
+from urllib.parse import parse_qsl
+
+if sys.platform != "win32":
+    import fcntl
+
+JSONL_SINK = "jsonl"
+FRAMES_SINK = "frames"
+SINKS = (JSONL_SINK, FRAMES_SINK)
+
+# Characters of a key that can't appear in a file name are replaced with "_"
+_UNSAFE_KEY = re.compile(r"[^A-Za-z0-9._-]")
+# Batch offset, result count, payload length and payload CRC-32
+_FRAME_HEADER = struct.Struct("<QIII")
+_LENGTH = struct.Struct("<I")
+# Filesystems that hosts mounting them share, with file locks that hold across hosts
+SHARED_FILESYSTEMS = (
+    "nfs",
+    "nfs4",
+    "cifs",
+    "smb3",
+    "ceph",
+    "fuse.glusterfs",
+    "lustre",
+    "gpfs",
+    "beegfs",
+)
+_MOUNTS = Path("/proc/self/mounts")
+
+
+class ResultSink(ABC):
+    """Files of batch results, one per key, that each batch is appended to once."""
+
+    suffix = ""
+
+    def __init__(self, directory: Path, fsync: bool = True) -> None:
+        self.directory = directory
+        self.fsync = fsync
+        # key -> (bytes of the file read so far, batch offsets in them)
+        self._indexes: Dict[str, Tuple[int, Set[int]]] = {}
+        # Sync I/O runs on a thread pool, so writes from one process can
+        # overlap; only writes to the same key wait for each other
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_lock = threading.Lock()
+
+    def path(self, key: str) -> Path:
+        """Return the file that key's batches are written to."""
+        return self.directory / f"{_UNSAFE_KEY.sub('_', key)}{self.suffix}"
+
+    def write(self, key: str, offset: int, results: List[str]) -> bool:
+        """Append the batch at offset to key's file unless it is there; return whether it was.
+
+        An empty batch has nothing to append and is never recorded.
+        """
+        if not results:
+            return False
+        data = self.encode(offset, results)
+        path = self.path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with self._key_lock(key), open(path, "a+b") as f:
+            # Held until the file is closed
+            _lock_file(f)
+            scanned, offsets = self._refresh(key, f)
+            if offset in offsets:
+                return False
+            f.write(data)
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+            offsets.add(offset)
+            self._indexes[key] = (scanned + len(data), offsets)
+            return True
+
+    def read(self, key: str) -> Iterator[Tuple[int, List[str]]]:
+        """Yield the offset and results of each complete batch in key's file, in write order."""
+        try:
+            f = open(self.path(key), "rb")
+        except FileNotFoundError:
+            return
+        with f:
+            for offset, results, _ in self.batches(f):
+                yield offset, results
+
+    def _key_lock(self, key: str) -> threading.Lock:
+        """Return the lock that writes to key's file hold."""
+        with self._locks_lock:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def _refresh(self, key: str, f: IO[bytes]) -> Tuple[int, Set[int]]:
+        """Read the batches appended to key's file since this process last did."""
+        end = f.seek(0, os.SEEK_END)
+        scanned, offsets = self._indexes.get(key, (0, set()))
+        if end < scanned:
+            # The file was replaced or truncated since; start over
+            scanned, offsets = 0, set()
+        f.seek(scanned)
+        for offset, _, scanned in self.batches(f):
+            offsets.add(offset)
+        if scanned < end:
+            # A write cut short by a crash, which its activity's retry repeats
+            f.truncate(scanned)
+        self._indexes[key] = (scanned, offsets)
+        return scanned, offsets
+
+    @abstractmethod
+    def encode(self, offset: int, results: List[str]) -> bytes:
+        """Return the bytes that the batch at offset is appended as."""
+
+    @abstractmethod
+    def batches(self, f: IO[bytes]) -> Iterator[Tuple[int, List[str], int]]:
+        """Yield each complete batch from f's position on with the file position after it."""
+
+
+class JsonLinesSink(ResultSink):
+    """One JSON object per result; a batch is complete once all its lines are."""
+
+    suffix = ".jsonl"
+
+    def encode(self, offset: int, results: List[str]) -> bytes:
+        # Only the result needs escaping; formatting the rest is several times faster
+        # than json.dumps of a whole object per row
+        batch = f'"batch": {offset}, "batch_size": {len(results)}'
+        return "".join(
+            f'{{"offset": {offset + i}, {batch}, "result": {json.dumps(result)}}}\n'
+            for i, result in enumerate(results)
+        ).encode()
+
+    def batches(self, f: IO[bytes]) -> Iterator[Tuple[int, List[str], int]]:
+        rows: List[Dict[str, object]] = []
+        for line in iter(f.readline, b""):
+            if not line.endswith(b"\n"):
+                return
+            try:
+                row = json.loads(line)
+            except ValueError:
+                return
+            rows.append(row)
+            if len(rows) == row["batch_size"]:
+                yield row["batch"], [str(r["result"]) for r in rows], f.tell()
+                rows = []
+
+
+class FramesSink(ResultSink):
+    """One length-prefixed frame per batch, checked against its CRC-32."""
+
+    suffix = ".frames"
+
+    def encode(self, offset: int, results: List[str]) -> bytes:
+        encoded = [result.encode() for result in results]
+        payload = b"".join(_LENGTH.pack(len(data)) + data for data in encoded)
+        return _FRAME_HEADER.pack(offset, len(results), len(payload), zlib.crc32(payload)) + payload
+
+    def batches(self, f: IO[bytes]) -> Iterator[Tuple[int, List[str], int]]:
+        while len(header := f.read(_FRAME_HEADER.size)) == _FRAME_HEADER.size:
+            offset, count, length, crc = _FRAME_HEADER.unpack(header)
+            payload = f.read(length)
+            if len(payload) < length or zlib.crc32(payload) != crc:
+                return
+            results: List[str] = []
+            position = 0
+            for _ in range(count):
+                (size,) = _LENGTH.unpack_from(payload, position)
+                position += _LENGTH.size
+                results.append(payload[position : position + size].decode())
+                position += size
+            yield offset, results, f.tell()
+
+
+def filesystem_type(path: Path) -> Optional[str]:
+    """Return the type of the filesystem that holds path, or None where it can't be told."""
+    try:
+        mounts = _MOUNTS.read_text().splitlines()
+    except OSError:
+        return None
+    path = path.resolve()
+    found: Optional[str] = None
+    longest = -1
+    for mount in mounts:
+        fields = mount.split()
+        if len(fields) < 3:
+            continue
+        # Spaces in mount points are escaped as \040
+        mount_point = Path(fields[1].replace("\\040", " "))
+        # The innermost mount holding path wins
+        depth = len(mount_point.parts)
+        if (mount_point == path or mount_point in path.parents) and depth >= longest:
+            found, longest = fields[2], depth
+    return found
+
+
+def _require_shared(directory: Path) -> None:
+    """Raise ValueError if directory is known to be on a filesystem other hosts don't share."""
+    fs_type = filesystem_type(directory)
+    if fs_type is not None and fs_type not in SHARED_FILESYSTEMS:
+        raise ValueError(
+            f"Sink directory {directory} is on a local {fs_type} filesystem, so a batch "
+            "retried on another worker host would be written again. Put it on shared "
+            "storage, or add ?shared=false to the sink spec if every worker runs on this host"
+        )
+
+
+def _lock_file(f: IO[bytes]) -> None:
+    """Hold an exclusive lock on f until it is closed, where the platform has one."""
+    if sys.platform != "win32":
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+
+
+@functools.lru_cache(maxsize=None)
+def open_sink(spec: str) -> ResultSink:
+    """Return the result sink described by spec, raising ValueError if it can't be exactly-once."""
+    kind, separator, rest = spec.partition(":")
+    if not separator or kind not in SINKS:
+        kind, rest = JSONL_SINK, spec
+    location, _, query = rest.partition("?")
+    options: Dict[str, str] = dict(parse_qsl(query))
+    fsync = options.get("fsync", "true").lower() in ("1", "true", "yes")
+    if options.get("shared", "true").lower() in ("1", "true", "yes"):
+        _require_shared(Path(location))
+    if kind == FRAMES_SINK:
+        return FramesSink(Path(location), fsync)
+    return JsonLinesSink(Path(location), fsync)
@@ -0,0 +1,321 @@
+"""Data sources that batches of records are read from.
+
+A source is read with an opaque cursor: ``read`` returns the records that
+start at a cursor together with the cursor of the record after them. The
+parent workflow keeps that cursor and hands it to the next read, so reading
+batch K costs the same as reading batch 1 whatever the source, on any
+worker and across continue-as-new. ``seek`` turns a record number into a
+cursor for reads that only know an offset, such as retries, shards and
+children reading their own range. It is cheap for text and JSON Lines
+files, which have a line index; the other sources seek by reading through
+the records before the offset.
+
+Sources are selected with a spec of the form ``[KIND:]PATH[?OPTION=VALUE&...]``.
+Without a kind, it is taken from the file suffix:
+
+- ``text`` (any other suffix): one record per line; option ``backend``
+  (``readline`` or ``mmap``)
+- ``gzip`` (``.gz``): gzip-compressed text, one record per line. A cursor
+  points into a gzip member, so resuming costs at most one member's worth of
+  decompression; write large files as many members, see
+  ``write_gzip_lines``
+- ``csv`` (``.csv``): one record per row; options ``column`` (name or index,
+  default 0) and ``header`` (default: true when ``column`` is a name)
+- ``jsonl`` (``.jsonl``, ``.ndjson``): one JSON value per line; option
+  ``field`` to take the record from an object's field. Blank lines are
+  skipped and not counted, as the CSV source skips blank rows
+- ``sqlite`` (``.db``, ``.sqlite``, ``.sqlite3``): rows of a table in key
+  order, paginated with ``WHERE key > cursor`` instead of ``OFFSET``; options
+  ``table`` and ``column`` (required) and ``key`` (default ``rowid``)
+"""
+
+import csv
+import functools
+import gzip
+import json
+import re
+import sqlite3
+import zlib
+from abc import ABC, abstractmethod
+from contextlib import closing
+from pathlib import Path
+from typing import IO, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+from urllib.parse import parse_qsl
+
+from temporal_batch.line_index import get_line_index
+from temporal_batch.readers import READLINE_BACKEND, read_lines
+
+TEXT_SOURCE = "text"
+GZIP_SOURCE = "gzip"
+CSV_SOURCE = "csv"
+JSONL_SOURCE = "jsonl"
+SQLITE_SOURCE = "sqlite"
+SOURCES = (TEXT_SOURCE, GZIP_SOURCE, CSV_SOURCE, JSONL_SOURCE, SQLITE_SOURCE)
+
+_SUFFIXES = {
+    ".gz": GZIP_SOURCE,
+    ".csv": CSV_SOURCE,
+    ".jsonl": JSONL_SOURCE,
+    ".ndjson": JSONL_SOURCE,
+    ".db": SQLITE_SOURCE,
+    ".sqlite": SQLITE_SOURCE,
+    ".sqlite3": SQLITE_SOURCE,
+}
+_IDENTIFIER = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+_READ_CHUNK = 1 << 16
+
+
+class DataSource(ABC):
+    """Records addressed by opaque cursors."""
+
+    @abstractmethod
+    def seek(self, offset: int) -> str:
+        """Return the cursor of record number offset, or of the end if there are fewer."""
+
+    @abstractmethod
+    def read(self, cursor: str, count: int) -> Tuple[List[str], str]:
+        """Read up to count records from cursor and return them with the cursor after them."""
+
+
+class TextFileSource(DataSource):
+    """Lines of a text file; a cursor is a line number, found through the line index."""
+
+    def __init__(self, path: Path, backend: str = READLINE_BACKEND) -> None:
+        self.path = path
+        self.backend = backend
+
+    def seek(self, offset: int) -> str:
+        return str(offset)
+
+    def read(self, cursor: str, count: int) -> Tuple[List[str], str]:
+        start = int(cursor)
+        lines = read_lines(self.path, start, count, self.backend)
+        return lines, str(start + len(lines))
+
+
+class GzipTextSource(DataSource):
+    """Lines of a gzip file; a cursor is a member's file offset and a position inside it."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+
+    def seek(self, offset: int) -> str:
+        cursor = "0:0"
+        for _, (_, cursor) in zip(range(offset), self._lines(cursor)):
+            pass
+        return cursor
+
+    def read(self, cursor: str, count: int) -> Tuple[List[str], str]:
+        lines: List[str] = []
+        for line, cursor in self._lines(cursor):
+            lines.append(line)
+            if len(lines) == count:
+                break
+        return lines, cursor
+
+    def _lines(self, cursor: str) -> Iterator[Tuple[str, str]]:
+        """Yield each line from cursor on with the cursor after it."""
+        member_start, skip = (int(part) for part in cursor.split(":"))
+        pending = b""
+        with open(self.path, "rb") as f:
+            f.seek(member_start)
+            for member_start, position, data in _decompress_members(f, member_start):
+                # Drop what precedes the cursor in its member
+                if skip:
+                    dropped = min(skip, len(data))
+                    data, position, skip = data[dropped:], position + dropped, skip - dropped
+                start = 0
+                while (newline := data.find(b"\n", start)) != -1:
+                    line = (pending + data[start:newline]).decode().strip()
+                    pending = b""
+                    yield line, f"{member_start}:{position + newline + 1}"
+                    start = newline + 1
+                pending += data[start:]
+        # A final line without a trailing newline still counts as a line
+        if pending:
+            yield pending.decode().strip(), f"{member_start}:{position + len(data)}"
+
+
+def _decompress_members(f: IO[bytes], member_start: int) -> Iterator[Tuple[int, int, bytes]]:
+    """Yield (member file offset, position in member, data) for the members from f's position."""
+    decompressor = zlib.decompressobj(zlib.MAX_WBITS | 16)
+    position = 0
+    # Compressed bytes of the current member consumed so far
+    consumed = 0
+    pending = b""
+    while True:
+        if not pending:
+            pending = f.read(_READ_CHUNK)
+            if not pending:
+                return
+        fed = len(pending)
+        data = decompressor.decompress(pending, _READ_CHUNK)
+        pending = decompressor.unused_data if decompressor.eof else decompressor.unconsumed_tail
+        consumed += fed - len(pending)
+        if data:
+            yield member_start, position, data
+            position += len(data)
+        if decompressor.eof:
+            # The next member starts where this one's compressed data ended
+            member_start += consumed
+            decompressor = zlib.decompressobj(zlib.MAX_WBITS | 16)
+            position = consumed = 0
+
+
+def write_gzip_lines(path: Path, lines: Iterable[str], member_lines: int = 10_000) -> None:
+    """Write lines as a gzip file of many members, so that any cursor resumes cheaply."""
+    with open(path, "wb") as f:
+        member: List[str] = []
+        for line in lines:
+            member.append(line)
+            if len(member) == member_lines:
+                f.write(gzip.compress("".join(f"{item}\n" for item in member).encode()))
+                member = []
+        if member:
+            f.write(gzip.compress("".join(f"{item}\n" for item in member).encode()))
+
+
+class CsvSource(DataSource):
+    """One column of a CSV file; a cursor is the file offset of a row."""
+
+    def __init__(self, path: Path, column: Union[int, str] = 0, header: Optional[bool] = None) -> None:
+        self.path = path
+        self.column = column
+        self.header = not isinstance(column, int) if header is None else header
+
+    def seek(self, offset: int) -> str:
+        cursor = str(self._first_row())
+        for _, (_, cursor) in zip(range(offset), self._rows(int(cursor))):
+            pass
+        return cursor
+
+    def read(self, cursor: str, count: int) -> Tuple[List[str], str]:
+        column = self._column_index()
+        records: List[str] = []
+        for row, cursor in self._rows(int(cursor)):
+            records.append(row[column])
+            if len(records) == count:
+                break
+        return records, cursor
+
+    def _first_row(self) -> int:
+        """Return the file offset of the first data row."""
+        if not self.header:
+            return 0
+        return next((int(cursor) for _, cursor in self._rows(0)), 0)
+
+    def _column_index(self) -> int:
+        if isinstance(self.column, int):
+            return self.column
+        header = next((row for row, _ in self._rows(0)), [])
+        if self.column not in header:
+            raise ValueError(f"Column {self.column!r} not in the header of {self.path}")
+        return header.index(self.column)
+
+    def _rows(self, position: int) -> Iterator[Tuple[List[str], str]]:
+        """Yield each row from the file offset position on with the cursor after it."""
+        with open(self.path, "rb") as f:
+            f.seek(position)
+            # csv.reader pulls one line at a time, so f.tell() is the end of its row
+            lines = (line.decode() for line in iter(f.readline, b""))
+            for row in csv.reader(lines):
+                if row:
+                    yield row, str(f.tell())
+
+
+class JsonLinesSource(DataSource):
+    """JSON values, one per non-blank line; a cursor is the file offset of a line."""
+
+    def __init__(self, path: Path, field: Optional[str] = None) -> None:
+        self.path = path
+        self.field = field
+
+    def seek(self, offset: int) -> str:
+        # Record numbers count only the lines that hold a value
+        index = get_line_index(self.path, skip_blank=True)
+        return str(index.offsets[min(max(offset, 0), len(index))])
+
+    def read(self, cursor: str, count: int) -> Tuple[List[str], str]:
+        records: List[str] = []
+        with open(self.path, "rb") as f:
+            f.seek(int(cursor))
+            while len(records) < count and (line := f.readline()):
+                if line.isspace():
+                    continue
+                value = json.loads(line)
+                if self.field is not None:
+                    value = value[self.field]
+                records.append(value if isinstance(value, str) else json.dumps(value))
+            return records, str(f.tell())
+
+
+class SqliteSource(DataSource):
+    """One column of a SQLite table in key order; a cursor is the JSON-encoded last key read."""
+
+    def __init__(self, path: Path, table: str, column: str, key: str = "rowid") -> None:
+        for identifier in (table, column, key):
+            if not _IDENTIFIER.fullmatch(identifier):
+                raise ValueError(f"Invalid SQLite identifier {identifier!r}")
+        self.path = path
+        self._select = f'SELECT "{key}", "{column}" FROM "{table}"'
+        self._order = f'ORDER BY "{key}"'
+        self._key = key
+        self._table = table
+
+    def seek(self, offset: int) -> str:
+        if offset <= 0:
+            return json.dumps(None)
+        with closing(sqlite3.connect(self.path)) as db:
+            # OFFSET walks the preceding keys, but only once per seek
+            row = db.execute(
+                f'SELECT "{self._key}" FROM "{self._table}" {self._order} LIMIT 1 OFFSET ?',
+                (offset - 1,),
+            ).fetchone()
+            if row is None:
+                row = db.execute(f'SELECT MAX("{self._key}") FROM "{self._table}"').fetchone()
+        return json.dumps(row[0])
+
+    def read(self, cursor: str, count: int) -> Tuple[List[str], str]:
+        last_key = json.loads(cursor)
+        with closing(sqlite3.connect(self.path)) as db:
+            if last_key is None:
+                rows = db.execute(f"{self._select} {self._order} LIMIT ?", (count,)).fetchall()
+            else:
+                # The key's index finds the first row directly, however far in it is
+                rows = db.execute(
+                    f'{self._select} WHERE "{self._key}" > ? {self._order} LIMIT ?',
+                    (last_key, count),
+                ).fetchall()
+        if not rows:
+            return [], cursor
+        return [str(value) for _, value in rows], json.dumps(rows[-1][0])
+
+
+@functools.lru_cache(maxsize=None)
+def open_source(spec: str) -> DataSource:
+    """Return the data source described by spec."""
+    kind, separator, rest = spec.partition(":")
+    if not separator or kind not in SOURCES:
+        kind, rest = "", spec
+    location, _, query = rest.partition("?")
+    path = Path(location)
+    options: Dict[str, str] = dict(parse_qsl(query))
+    kind = kind or _SUFFIXES.get(path.suffix, TEXT_SOURCE)
+
+    if kind == TEXT_SOURCE:
+        return TextFileSource(path, options.get("backend", READLINE_BACKEND))
+    if kind == GZIP_SOURCE:
+        return GzipTextSource(path)
+    if kind == CSV_SOURCE:
+        column = options.get("column", "0")
+        header = options.get("header")
+        return CsvSource(
+            path,
+            int(column) if column.isdigit() else column,
+            None if header is None else header.lower() in ("1", "true", "yes"),
+        )
+    if kind == JSONL_SOURCE:
+        return JsonLinesSource(path, options.get("field"))
+    if "table" not in options or "column" not in options:
+        raise ValueError(f"SQLite source {spec!r} needs table and column options")
+    return SqliteSource(path, options["table"], options["column"], options.get("key", "rowid"))
@@ -0,0 +1,74 @@
+"""Deterministic AIMD controller for the parent workflow's concurrency window.
+
+The window starts at its minimum and grows by one slot per successful child
+completion (doubling every round) until the first decrease. After that it
+grows by one slot for every window's worth of successful completions. It is
+multiplied by ``decrease_factor`` when a child fails or, with a latency
+target set, completes slower than the target. Only one decrease is applied
+per window's worth of completions so that a burst of slow children from the
+same round doesn't collapse the window.
+
+All inputs come from workflow history (completion signals and
+``workflow.now()``), so the controller is replay-safe.
+"""
+
+import math
+from typing import Optional
+
+
+class AdaptiveWindow:
+    """Additive-increase/multiplicative-decrease window between min and max size."""
+
+    def __init__(
+        self,
+        min_size: int,
+        max_size: int,
+        size: Optional[float] = None,
+        latency_target: Optional[float] = None,
+        decrease_factor: float = 0.5,
+    ) -> None:
+        if min_size < 1 or max_size < min_size:
+            raise ValueError(f"Invalid window bounds [{min_size}, {max_size}]")
+        self.min_size = min_size
+        self.max_size = max_size
+        self.size = self._clamp(min_size if size is None else size)
+        self.latency_target = latency_target
+        self.decrease_factor = decrease_factor
+        # A window carried over from an earlier run has already left slow start
+        self._slow_start = size is None
+        self._completions_since_decrease = math.inf
+
+    @property
+    def limit(self) -> int:
+        """Return the number of children allowed in flight."""
+        return int(self.size)
+
+    def set_bounds(self, min_size: int, max_size: int) -> None:
+        """Move the window's bounds, clamping its current size into them."""
+        if min_size < 1 or max_size < min_size:
+            raise ValueError(f"Invalid window bounds [{min_size}, {max_size}]")
+        self.min_size = min_size
+        self.max_size = max_size
+        self.size = self._clamp(self.size)
+
+    def on_success(self, latency: float) -> None:
+        """Record a child that completed after latency seconds."""
+        if self.latency_target is not None and latency > self.latency_target:
+            self._decrease()
+            return
+        self._completions_since_decrease += 1
+        self.size = self._clamp(self.size + (1 if self._slow_start else 1 / self.size))
+
+    def on_failure(self) -> None:
+        """Record a child that failed."""
+        self._decrease()
+
+    def _decrease(self) -> None:
+        self._slow_start = False
+        if self._completions_since_decrease < self.limit:
+            return
+        self._completions_since_decrease = 0
+        self.size = self._clamp(self.size * self.decrease_factor)
+
+    def _clamp(self, size: float) -> float:
+        return min(max(size, float(self.min_size)), float(self.max_size))
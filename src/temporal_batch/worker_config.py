@@ -0,0 +1,194 @@
+"""Worker settings read from a config file, environment variables and flags.
+
+Hosts differ in cores, memory and how hard they may hit downstream systems,
+so the limits that ``start_worker.py`` passes to the SDK's ``Worker`` are
+settings rather than code. Each setting is taken from, in increasing order
+of precedence, the defaults below, a TOML file of ``name = value`` pairs,
+environment variables named ``TEMPORAL_BATCH_WORKER_`` followed by the
+setting's name in upper case, and command line flags.
+
+With the ``resource`` tuner the SDK sizes the workflow task, activity and
+local activity slots itself, adding slots while the host's CPU and memory
+use stay below their targets. The ``max_concurrent_*`` settings then cap
+the slots instead of fixing them.
+"""
+
+import dataclasses
+import tomllib
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Mapping, Optional, Union, get_args, get_origin, get_type_hints
+
+from temporalio.worker import (
+    PollerBehavior,
+    PollerBehaviorAutoscaling,
+    PollerBehaviorSimpleMaximum,
+    ResourceBasedSlotConfig,
+    WorkerTuner,
+)
+
+TUNER_FIXED = "fixed"
+TUNER_RESOURCE = "resource"
+TUNERS = (TUNER_FIXED, TUNER_RESOURCE)
+
+ENV_PREFIX = "TEMPORAL_BATCH_WORKER_"
+
+# The SDK's activity slots: fixed when unset, and the resource tuner's cap
+SDK_DEFAULT_ACTIVITY_SLOTS = 100
+SDK_DEFAULT_MAX_RESOURCE_SLOTS = 500
+
+
+@dataclass
+class WorkerConfig:
+    # Activities started per second across every worker of the task queue; 0
+    # removes the limit
+    max_task_queue_activities_per_second: float = 150.0
+    # Concurrent workflow tasks, activities and local activities on this
+    # worker (None uses the SDK default); caps on the slots with the resource tuner
+    max_concurrent_workflow_tasks: Optional[int] = None
+    max_concurrent_activities: Optional[int] = None
+    max_concurrent_local_activities: Optional[int] = None
+    # Pollers per task type (None uses the SDK default); with autoscaling,
+    # pollers are added and removed with the load up to this many
+    workflow_task_pollers: Optional[int] = None
+    activity_task_pollers: Optional[int] = None
+    autoscale_pollers: bool = False
+    # Workflows kept in memory between workflow tasks (None uses the SDK default)
+    max_cached_workflows: Optional[int] = None
+    # fixed: slots are set by max_concurrent_*; resource: slots follow the
+    # host's CPU and memory use toward these fractions
+    tuner: str = TUNER_FIXED
+    target_cpu_usage: float = 0.8
+    target_memory_usage: float = 0.8
+
+    def __post_init__(self) -> None:
+        if self.tuner not in TUNERS:
+            raise ValueError(f"Unknown tuner {self.tuner!r}, expected one of {', '.join(TUNERS)}")
+        for name in ("target_cpu_usage", "target_memory_usage"):
+            if not 0 < getattr(self, name) <= 1:
+                raise ValueError(f"{name} must be in (0, 1], got {getattr(self, name)}")
+        if self.max_task_queue_activities_per_second < 0:
+            raise ValueError("max_task_queue_activities_per_second must not be negative")
+        for name in (
+            "max_concurrent_workflow_tasks",
+            "max_concurrent_activities",
+            "max_concurrent_local_activities",
+            "workflow_task_pollers",
+            "activity_task_pollers",
+            "max_cached_workflows",
+        ):
+            value = getattr(self, name)
+            # A workflow cache of 0 is allowed; it turns sticky execution off
+            minimum = 0 if name == "max_cached_workflows" else 1
+            if value is not None and value < minimum:
+                raise ValueError(f"{name} must be at least {minimum}, got {value}")
+
+    def worker_options(self) -> Dict[str, Any]:
+        """Return the ``Worker`` keyword arguments for these settings."""
+        options: Dict[str, Any] = {
+            "max_task_queue_activities_per_second": self.max_task_queue_activities_per_second
+            or None,
+        }
+        if self.max_cached_workflows is not None:
+            options["max_cached_workflows"] = self.max_cached_workflows
+        if self.workflow_task_pollers is not None or self.autoscale_pollers:
+            options["workflow_task_poller_behavior"] = self._pollers(self.workflow_task_pollers)
+        if self.activity_task_pollers is not None or self.autoscale_pollers:
+            options["activity_task_poller_behavior"] = self._pollers(self.activity_task_pollers)
+
+        if self.tuner == TUNER_RESOURCE:
+            # The SDK rejects max_concurrent_* together with a tuner
+            options["tuner"] = WorkerTuner.create_resource_based(
+                target_memory_usage=self.target_memory_usage,
+                target_cpu_usage=self.target_cpu_usage,
+                workflow_config=_slot_config(self.max_concurrent_workflow_tasks),
+                activity_config=_slot_config(self.max_concurrent_activities),
+                local_activity_config=_slot_config(self.max_concurrent_local_activities),
+            )
+            return options
+        for name in (
+            "max_concurrent_workflow_tasks",
+            "max_concurrent_activities",
+            "max_concurrent_local_activities",
+        ):
+            if getattr(self, name) is not None:
+                options[name] = getattr(self, name)
+        return options
+
+    def activity_slots(self) -> int:
+        """Return the most activities this worker runs at once, e.g. to size its executor."""
+        if self.max_concurrent_activities is not None:
+            return self.max_concurrent_activities
+        if self.tuner == TUNER_RESOURCE:
+            return SDK_DEFAULT_MAX_RESOURCE_SLOTS
+        return SDK_DEFAULT_ACTIVITY_SLOTS
+
+    def _pollers(self, maximum: Optional[int]) -> PollerBehavior:
+        """Return the poller behavior for up to maximum pollers of one task type."""
+        if not self.autoscale_pollers:
+            if maximum is None:
+                return PollerBehaviorSimpleMaximum()
+            return PollerBehaviorSimpleMaximum(maximum)
+        if maximum is None:
+            return PollerBehaviorAutoscaling()
+        # The SDK starts with 5 pollers, more than a small maximum allows
+        return PollerBehaviorAutoscaling(
+            maximum=maximum, initial=min(maximum, PollerBehaviorAutoscaling().initial)
+        )
+
+
+def _slot_config(maximum: Optional[int]) -> Optional[ResourceBasedSlotConfig]:
+    """Return the resource-based slot settings capped at maximum, or None for the SDK's."""
+    return None if maximum is None else ResourceBasedSlotConfig(maximum_slots=maximum)
+
+
+def load_worker_config(
+    path: Optional[Path] = None,
+    environ: Optional[Mapping[str, str]] = None,
+    overrides: Optional[Mapping[str, Any]] = None,
+) -> WorkerConfig:
+    """Merge the config file at path, TEMPORAL_BATCH_WORKER_* variables in environ and overrides.
+
+    Overrides whose value is None are ignored, so unset command line flags
+    can be passed as they are.
+    """
+    values: Dict[str, Any] = {}
+    if path is not None:
+        with open(path, "rb") as f:
+            for name, value in tomllib.load(f).items():
+                values[name] = _convert(name, value, str(path))
+    for variable, value in (environ or {}).items():
+        if variable.startswith(ENV_PREFIX):
+            name = variable[len(ENV_PREFIX) :].lower()
+            values[name] = _convert(name, value, variable)
+    for name, value in (overrides or {}).items():
+        if value is not None:
+            values[name] = _convert(name, value, "command line")
+    return WorkerConfig(**values)
+
+
+def _convert(name: str, value: Any, origin: str) -> Any:
+    """Convert a setting's value, possibly a string, to the type of its field."""
+    field_type = _FIELD_TYPES.get(name)
+    if field_type is None:
+        raise ValueError(f"Unknown worker setting {name!r} in {origin}")
+    if get_origin(field_type) is Union:
+        # Optional[X]: the value is never None here, so convert to X
+        field_type = next(arg for arg in get_args(field_type) if arg is not type(None))
+    if isinstance(value, str) and field_type is not str:
+        if field_type is bool:
+            return value.lower() in ("1", "true", "yes")
+        try:
+            return field_type(value)
+        except ValueError:
+            raise ValueError(f"Invalid value {value!r} for {name} in {origin}") from None
+    if field_type is float and isinstance(value, int) and not isinstance(value, bool):
+        return float(value)
+    if not isinstance(value, field_type) or (field_type is int and isinstance(value, bool)):
+        raise ValueError(f"Invalid value {value!r} for {name} in {origin}")
+    return value
+
+
+_FIELD_TYPES = {
+    field.name: get_type_hints(WorkerConfig)[field.name] for field in dataclasses.fields(WorkerConfig)
+}
@@ -1,64 +1,1071 @@
 import asyncio
+import dataclasses
+import math
+from collections import deque
 from datetime import timedelta
-from typing import List
+from typing import Any, Callable, Deque, Dict, List, NoReturn, Optional, Set, Tuple
 
 from temporalio import workflow
+from temporalio.common import RetryPolicy
+from temporalio.workflow import ActivityCancellationType
+from temporalio.exceptions import (
+    ActivityError,
+    ApplicationError,
+    ChildWorkflowError,
+    FailureError,
+    WorkflowAlreadyStartedError,
+    is_cancelled_exception,
+)
 
-from temporal_batch.activities import create_single_batch, process_record
-from temporal_batch.shared import BatchParentWorkflowParams
+# Deterministic modules that are the same in every run; importing them once
+# for the worker rather than per run keeps starting a workflow run cheap
+with workflow.unsafe.imports_passed_through():
+    from temporal_batch.activity_stubs import (
+        create_single_batch,
+        process_batch,
+        process_record,
+        read_batches,
+        transform_records,
+        write_results,
+    )
+    from temporal_batch.metrics import (
+        CHILD_WORKFLOW_DURATION,
+        CONTINUE_AS_NEW,
+        HEDGES_STARTED,
+        HEDGES_WON,
+        LOCAL_RECORD_FALLBACKS,
+        WINDOW_LIMIT,
+        WINDOW_OCCUPANCY,
+    )
+    from temporal_batch.shared import (
+        PROCESSING_MODE_BATCH,
+        PROCESSING_MODE_CPU,
+        PROCESSING_MODE_RECORD,
+        SHARD_COMPLETED,
+        SHARD_FAILED,
+        SHARD_PENDING,
+        SHARD_RUNNING,
+        BatchChildWorkflowParams,
+        BatchCompletion,
+        BatchParentWorkflowParams,
+        BatchProgress,
+        BatchRetry,
+        HedgeStats,
+        InFlightBatch,
+        RecordPoolWorkflowParams,
+        ResizeRequest,
+        ShardProgress,
+        ShardStatus,
+        ShardedBatchWorkflowParams,
+        SourceBatches,
+    )
+    from temporal_batch.window import AdaptiveWindow
 
 BATCH_SIZE = 50
 WINDOW_SIZE = 4
-CONTINUE_AS_NEW_THRESHOLD = 500
+# Records per transform_records activity in cpu mode
+CHUNK_SIZE = 10
+# Times a failed batch is started before the parent gives up
+MAX_BATCH_ATTEMPTS = 3
+# Records in flight in RecordPoolWorkflow by default, matching what the
+# default window of children runs at once
+POOL_SIZE = WINDOW_SIZE * BATCH_SIZE
+# Seconds RecordPoolWorkflow waits for its running records before continuing
+# as new; those still running are started again by the next run
+POOL_DRAIN_TIMEOUT = 1.0
+# Never hedge a record that has been running for less than this many seconds
+HEDGE_MIN_DELAY = 0.05
+# Heartbeat timeout of record attempts that hedging may cancel; a cancellation
+# reaches the activity with its next heartbeat
+RECORD_HEARTBEAT_TIMEOUT = 2.0
+# Shards ShardedBatchWorkflow runs at once when its params don't say
+NUM_SHARDS = 4
+# Seconds between checks that children carried over from a previous parent run
+# are still running
+CARRIED_CHILD_CHECK_INTERVAL = 60.0
+# Seconds of workflow time between progress reports from a shard to its
+# orchestrator, so the orchestrator's history grows with time, not records
+PROGRESS_REPORT_INTERVAL = 30.0
+# Continue-as-new caps used when the parent's params don't set their own
+MAX_HISTORY_LENGTH = 10_000
+MAX_HISTORY_SIZE = 10 * 1024 * 1024
+# Seconds of recent completions the parent's progress query measures throughput over
+THROUGHPUT_WINDOW = 60.0
 
 
-@workflow.defn
+# The parent and child are registered under new type names because their
+# commands differ from the first release's; runs started before then finish
+# on the workers' temporal_batch.legacy_workflows
+@workflow.defn(name="BatchChildWorkflowV2")
 class BatchChildWorkflow:
+    def __init__(self) -> None:
+        self._hedge_stats = HedgeStats()
+        # Losing attempts of hedged records, cancelled when their race was decided
+        self._losers: List["asyncio.Task[str]"] = []
+        self._local_record_timeout: Optional[float] = None
+
+    @workflow.query
+    def hedge_stats(self) -> HedgeStats:
+        return self._hedge_stats
+
+    @workflow.signal
+    def ping(self) -> None:
+        # Sent by a parent run that inherited this child, only to see that it is running
+        pass
+
     @workflow.run
-    async def run(self, batch: List[str]) -> None:
-        tasks = [
-            workflow.execute_activity(
+    async def run(
+        self, batch: List[str], params: Optional[BatchChildWorkflowParams] = None
+    ) -> int:
+        params = params or BatchChildWorkflowParams()
+        self._local_record_timeout = params.local_record_timeout
+        try:
+            records = await self._process(batch, params)
+        except (FailureError, asyncio.CancelledError):
+            # A cancelled child reports too, so the parent can retry its batch
+            await self._notify_parent(False)
+            raise
+        await self._notify_parent(True, records)
+        return records
+
+    async def _process(self, batch: List[str], params: BatchChildWorkflowParams) -> int:
+        """Load the batch if only a range was given, process it, write its results and count it."""
+        if params.offset is not None:
+            batch = await workflow.execute_activity(
+                create_single_batch,
+                args=[params.count, params.offset + params.count, params.offset],
+                start_to_close_timeout=timedelta(seconds=60),
+            )
+
+        if params.processing_mode == PROCESSING_MODE_BATCH:
+            results = await self._process_batch(batch)
+        elif params.processing_mode == PROCESSING_MODE_CPU:
+            results = await self._process_chunks(batch, params.chunk_size or CHUNK_SIZE)
+        elif params.processing_mode == PROCESSING_MODE_RECORD and params.hedge_percentile:
+            results = await self._process_records_hedged(batch, params.hedge_percentile)
+        elif params.processing_mode == PROCESSING_MODE_RECORD:
+            results = await self._process_records(batch)
+        else:
+            raise ApplicationError(
+                f"Unknown processing mode {params.processing_mode!r}", non_retryable=True
+            )
+
+        if params.sink and results:
+            info = workflow.info()
+            # One file per parent, so each shard of a sharded run has its own
+            key = info.parent.workflow_id if info.parent else info.workflow_id
+            # The whole batch in one write; the sink skips it if an earlier attempt wrote it
+            await workflow.execute_activity(
+                write_results,
+                args=[params.sink, key, params.batch_offset, results],
+                start_to_close_timeout=timedelta(seconds=60),
+            )
+        return len(batch)
+
+    async def _notify_parent(self, succeeded: bool, records: Optional[int] = None) -> None:
+        """Tell the parent's current run that this batch has finished."""
+        info = workflow.info()
+        if info.parent is None:
+            return
+        try:
+            # Signalling by workflow ID reaches whichever run of the parent is
+            # current, including one started by continue-as-new
+            await workflow.get_external_workflow_handle(info.parent.workflow_id).signal(
+                BatchParentWorkflow.batch_completed,
+                BatchCompletion(info.workflow_id, succeeded, self._hedge_stats, records),
+            )
+        except FailureError:
+            workflow.logger.warning("Parent %s is no longer running", info.parent.workflow_id)
+
+    async def _process_records(self, batch: List[str]) -> List[str]:
+        """Run one process_record activity per record."""
+        tasks = [self._process_record(record) for record in batch]
+        return list(await asyncio.gather(*tasks))
+
+    async def _process_record(self, record: str, cancellable: bool = False) -> str:
+        """Run process_record for one record.
+
+        A cancellable attempt heartbeats, so that cancelling it reaches the
+        running activity and frees its slot, and its task only resolves once
+        the activity has stopped.
+        """
+        if self._local_record_timeout is not None:
+            try:
+                # Runs in this worker without a task queue round trip or its
+                # rate limit, and records one marker instead of three events
+                return await workflow.execute_local_activity(
+                    process_record,
+                    record,
+                    start_to_close_timeout=timedelta(seconds=self._local_record_timeout),
+                    retry_policy=RetryPolicy(maximum_attempts=1),
+                )
+            except ActivityError as err:
+                if is_cancelled_exception(err):
+                    raise
+                workflow.metric_meter().create_counter(
+                    LOCAL_RECORD_FALLBACKS, "Records retried as regular activities"
+                ).add(1)
+        if cancellable:
+            return await workflow.execute_activity(
                 process_record,
                 record,
                 start_to_close_timeout=timedelta(seconds=60),
+                heartbeat_timeout=timedelta(seconds=RECORD_HEARTBEAT_TIMEOUT),
+                cancellation_type=ActivityCancellationType.WAIT_CANCELLATION_COMPLETED,
             )
-            for record in batch
+        return await workflow.execute_activity(
+            process_record,
+            record,
+            start_to_close_timeout=timedelta(seconds=60),
+        )
+
+    async def _process_records_hedged(self, batch: List[str], percentile: float) -> List[str]:
+        """Run one activity per record and hedge the records in the latency tail.
+
+        Once ``percentile`` of the batch has completed, every record still
+        running is a tail record and gets a duplicate activity; whichever
+        attempt finishes first wins and the other is cancelled. This needs at
+        most one timer per batch rather than one per record.
+        """
+        started = workflow.now()
+        primaries = [
+            asyncio.create_task(self._process_record(record, cancellable=True)) for record in batch
         ]
-        await asyncio.gather(*tasks)
+        quorum = math.ceil(len(batch) * percentile)
+        if not 0 < quorum < len(batch):
+            return list(await asyncio.gather(*primaries))
 
+        await workflow.wait_condition(lambda: sum(t.done() for t in primaries) >= quorum)
+        elapsed = (workflow.now() - started).total_seconds()
+        if elapsed < HEDGE_MIN_DELAY:
+            await workflow.sleep(HEDGE_MIN_DELAY - elapsed)
 
-@workflow.defn
+        # Results of records that finished before hedging; raises if any failed
+        results = [primary.result() if primary.done() else "" for primary in primaries]
+        tail = [i for i, primary in enumerate(primaries) if not primary.done()]
+        raced = await asyncio.gather(*(self._race(primaries[i], batch[i]) for i in tail))
+        for i, result in zip(tail, raced):
+            results[i] = result
+
+        # Wait until the cancelled losers have stopped, so that no attempt of
+        # the batch outlives the child
+        await asyncio.gather(*self._losers, return_exceptions=True)
+        self._record_hedge_metrics()
+        return results
+
+    async def _race(self, primary: "asyncio.Task[str]", record: str) -> str:
+        """Race a hedge against a slow primary, cancel the loser and return the first result."""
+        hedge = asyncio.create_task(self._process_record(record, cancellable=True))
+        self._hedge_stats.started += 1
+        done, _ = await workflow.wait([primary, hedge], return_when=asyncio.FIRST_COMPLETED)
+        winner, loser = (primary, hedge) if primary in done else (hedge, primary)
+        if winner.exception() is not None:
+            # The first attempt to finish failed; fall back to the other one
+            return await loser
+
+        if winner is hedge:
+            self._hedge_stats.won += 1
+        loser.cancel()
+        self._losers.append(loser)
+        return winner.result()
+
+    def _record_hedge_metrics(self) -> None:
+        meter = workflow.metric_meter()
+        meter.create_counter(HEDGES_STARTED, "Hedged record attempts started").add(
+            self._hedge_stats.started
+        )
+        meter.create_counter(HEDGES_WON, "Hedged record attempts that finished first").add(
+            self._hedge_stats.won
+        )
+
+    async def _process_batch(self, batch: List[str]) -> List[str]:
+        """Run a single process_batch activity over the whole batch."""
+        if not batch:
+            return []
+        return await workflow.execute_activity(
+            process_batch,
+            batch,
+            start_to_close_timeout=timedelta(seconds=60),
+            heartbeat_timeout=timedelta(seconds=10),
+        )
+
+    async def _process_chunks(self, batch: List[str], chunk_size: int) -> List[str]:
+        """Run one transform_records activity per chunk of the batch."""
+        chunks = await asyncio.gather(
+            *(
+                workflow.execute_activity(
+                    transform_records,
+                    batch[i : i + chunk_size],
+                    start_to_close_timeout=timedelta(seconds=60),
+                )
+                for i in range(0, len(batch), chunk_size)
+            )
+        )
+        return [result for chunk in chunks for result in chunk]
+
+
+@workflow.defn(name="BatchParentWorkflowV2")
 class BatchParentWorkflow:
+    @workflow.init
+    def __init__(self, params: BatchParentWorkflowParams) -> None:
+        # Children still running, keyed by workflow ID. Children carried over
+        # from the previous run report completion only through batch_completed,
+        # or are found closed by _watch_carried.
+        self._in_flight: Dict[str, InFlightBatch] = {
+            batch.workflow_id: batch for batch in params.in_flight
+        }
+        self._retries: List[BatchRetry] = list(params.retries)
+        self._failed_offsets: List[int] = []
+        self._hedge_stats = dataclasses.replace(params.hedge_stats)
+        self._num_words = params.num_words
+        self._batch_size = params.batch_size or BATCH_SIZE
+        # Offset of the next new batch
+        self._offset = params.offset
+        self._paused = params.paused
+        self._completed_records = params.completed_records
+        # Records there are to read: num_words, or less once a child read to the end
+        self._source_end = params.num_words
+        if params.source_end is not None:
+            self._source_end = min(self._source_end, params.source_end)
+        self._reported_records = params.completed_records
+        self._reported_at = workflow.now()
+        # (workflow time, records) of completions within THROUGHPUT_WINDOW
+        self._recent_completions: Deque[Tuple[float, int]] = deque()
+        self._started_at = workflow.now().timestamp()
+        # Data source cursor of the next new batch
+        self._cursor = params.cursor
+        # Batches read ahead of the window with the cursor after each, oldest
+        # first, and the read filling them
+        self._prefetched: Deque[Tuple[int, List[str], str]] = deque()
+        self._prefetching: Optional["asyncio.Task[None]"] = None
+        self._prefetch_offset = params.offset
+        self._prefetch_cursor = params.cursor
+        self._prefetch_exhausted = False
+        min_size = params.min_window_size or min(WINDOW_SIZE, params.max_window_size or WINDOW_SIZE)
+        self._window = AdaptiveWindow(
+            min_size,
+            params.max_window_size or max(WINDOW_SIZE, min_size),
+            size=params.window_size,
+            latency_target=params.target_batch_latency,
+        )
+        meter = workflow.metric_meter()
+        self._child_duration = meter.create_histogram_float(
+            CHILD_WORKFLOW_DURATION, "Time from starting a child workflow to its completion", "s"
+        )
+        self._continue_as_new_count = meter.create_counter(
+            CONTINUE_AS_NEW, "Parent runs that continued as new"
+        )
+        # Unlabeled, parents on one worker overwrite each other's gauges; a label
+        # per parent adds series for every workflow ID, so it is opt-in
+        if params.per_parent_metrics:
+            meter = meter.with_additional_attributes({"workflow_id": workflow.info().workflow_id})
+        self._occupancy = meter.create_gauge(WINDOW_OCCUPANCY, "Child workflows in flight")
+        self._limit = meter.create_gauge(WINDOW_LIMIT, "Child workflows allowed in flight")
+
+    @workflow.signal
+    def batch_completed(self, completion: BatchCompletion) -> None:
+        # Children signal exactly once, so their hedge stats are summed only here
+        self._hedge_stats.started += completion.hedge_stats.started
+        self._hedge_stats.won += completion.hedge_stats.won
+        self._complete(completion.workflow_id, completion.succeeded, completion.records)
+
+    @workflow.signal
+    def ping(self) -> None:
+        # Sent by an orchestrator run that inherited this shard, only to see that it is running
+        pass
+
+    @workflow.signal
+    def pause(self) -> None:
+        # Running children finish; only starting new ones waits for resume
+        workflow.logger.info("Pausing with %d children in flight", len(self._in_flight))
+        self._paused = True
+
+    @workflow.signal
+    def resume(self) -> None:
+        workflow.logger.info("Resuming at offset %d", self._offset)
+        self._paused = False
+
+    @workflow.signal
+    def resize(self, request: ResizeRequest) -> None:
+        # A bound given alone moves the other one if needed to keep them ordered
+        max_size = request.max_window_size or max(
+            self._window.max_size, request.min_window_size or 0
+        )
+        min_size = request.min_window_size or min(self._window.min_size, max_size)
+        # A signal handler that raises would fail the workflow, so bad values are ignored
+        if request.batch_size is not None and request.batch_size < 1:
+            workflow.logger.warning("Ignoring resize to batch size %d", request.batch_size)
+            return
+        try:
+            self._window.set_bounds(min_size, max_size)
+        except ValueError as e:
+            workflow.logger.warning("Ignoring resize: %s", e)
+            return
+        if request.batch_size is not None:
+            self._batch_size = request.batch_size
+        self._record_window()
+
+    @workflow.query
+    def window_size(self) -> int:
+        return self._window.limit
+
+    @workflow.query
+    def progress(self) -> BatchProgress:
+        throughput = self._throughput()
+        remaining = (
+            max(self._source_end - self._offset, 0)
+            + sum(batch.count for batch in self._in_flight.values())
+            + sum(retry.count or self._batch_size for retry in self._retries)
+        )
+        return BatchProgress(
+            self._num_words,
+            self._completed_records,
+            self._offset,
+            in_flight=len(self._in_flight),
+            window_size=self._window.limit,
+            batch_size=self._batch_size,
+            paused=self._paused,
+            throughput=throughput,
+            eta=remaining / throughput if throughput and not self._paused else None,
+        )
+
+    @workflow.query
+    def hedge_stats(self) -> HedgeStats:
+        return self._hedge_stats
+
     @workflow.run
     async def run(self, params: BatchParentWorkflowParams) -> None:
-        active: set[asyncio.Task[None]] = set()
-        processed = 0
-        current_offset = params.offset
+        try:
+            await self._run(params)
+        except ApplicationError:
+            # A shard tells its orchestrator how it ended, even after continue-as-new
+            await self._report_progress(status=SHARD_FAILED)
+            raise
+        except asyncio.CancelledError:
+            # Children are abandoned on close, so cancel them explicitly
+            await _cancel_children(list(self._in_flight))
+            raise
+        await self._report_progress(status=SHARD_COMPLETED)
+
+    async def _run(self, params: BatchParentWorkflowParams) -> None:
+        exhausted = False
+        if params.in_flight:
+            carried = [batch.workflow_id for batch in params.in_flight]
+            asyncio.create_task(
+                _watch_carried(
+                    carried,
+                    lambda child_id: child_id in self._in_flight,
+                    BatchChildWorkflow.ping,
+                    lambda child_id: self._complete(child_id, False),
+                )
+            )
 
         while True:
-            batch = await workflow.execute_activity(
-                create_single_batch,
-                args=[BATCH_SIZE, params.num_words, current_offset],
-                start_to_close_timeout=timedelta(seconds=60),
+            await workflow.wait_condition(
+                lambda: bool(self._failed_offsets)
+                or (exhausted and not self._in_flight and not self._retries)
+                or (
+                    not self._paused
+                    and len(self._in_flight) < self._window.limit
+                    and (bool(self._retries) or not exhausted)
+                )
             )
-            if not batch:
+            self._raise_if_failed()
+            await self._report_progress()
+            if self._retries:
+                retry = self._retries.pop(0)
+                await self._dispatch(
+                    params, retry.offset, retry.attempt, retry.count or self._batch_size
+                )
+            elif not exhausted:
+                dispatched = await self._dispatch(params, self._offset, 1, self._batch_size)
+                if dispatched:
+                    # Batches read before a resize keep their size, so advance by what was read
+                    self._offset += dispatched
+                else:
+                    exhausted = True
+                    continue
+            else:
                 break
 
-            if len(active) >= WINDOW_SIZE:
-                done, active = await asyncio.wait(active, return_when=asyncio.FIRST_COMPLETED)
+            if self._should_continue_as_new(params):
+                await self._report_progress(force=True)
+                self._continue_as_new_count.add(1)
+                # Running children are handed to the next run instead of drained
+                workflow.continue_as_new(
+                    dataclasses.replace(
+                        params,
+                        offset=self._offset,
+                        cursor=self._cursor,
+                        batch_size=self._batch_size,
+                        min_window_size=self._window.min_size,
+                        max_window_size=self._window.max_size,
+                        window_size=self._window.size,
+                        in_flight=list(self._in_flight.values()),
+                        retries=self._retries,
+                        hedge_stats=self._hedge_stats,
+                        completed_records=self._completed_records,
+                        source_end=self._source_end,
+                        paused=self._paused,
+                    )
+                )
 
-            child_task = asyncio.create_task(
-                workflow.execute_child_workflow(BatchChildWorkflow.run, batch)
+    async def _dispatch(
+        self, params: BatchParentWorkflowParams, offset: int, attempt: int, count: int
+    ) -> int:
+        """Start a child for up to count records at offset; return how many it was given."""
+        if params.read_in_child:
+            # Only the range goes into history; the child reads the words itself
+            # and reports how many there were
+            if offset >= self._source_end:
+                return 0
+            batch: List[str] = []
+            child_params = BatchChildWorkflowParams(
+                params.processing_mode,
+                offset=offset,
+                count=min(count, self._source_end - offset),
+                hedge_percentile=params.hedge_percentile,
+                chunk_size=params.chunk_size,
+                local_record_timeout=params.local_record_timeout,
+                sink=params.sink,
+                batch_offset=offset,
+            )
+        else:
+            if attempt > 1:
+                # A retried batch is read again by offset
+                batch = await workflow.execute_activity(
+                    create_single_batch,
+                    args=[count, params.num_words, offset],
+                    start_to_close_timeout=timedelta(seconds=60),
+                )
+            else:
+                if params.prefetch_batches:
+                    batch, cursor = await self._next_prefetched(params, offset)
+                else:
+                    batch, cursor = await self._read_next(params, offset, count)
+                if batch:
+                    self._cursor = cursor
+            if not batch:
+                return 0
+            child_params = BatchChildWorkflowParams(
+                params.processing_mode,
+                hedge_percentile=params.hedge_percentile,
+                chunk_size=params.chunk_size,
+                local_record_timeout=params.local_record_timeout,
+                sink=params.sink,
+                batch_offset=offset,
             )
-            active.add(child_task)
-            processed += 1
-            current_offset += BATCH_SIZE
 
-            if processed >= CONTINUE_AS_NEW_THRESHOLD:
-                await asyncio.gather(*active)
-                workflow.continue_as_new(
-                    BatchParentWorkflowParams(params.num_words, current_offset)
+        await self._start_child(offset, attempt, batch, child_params)
+        return child_params.count if params.read_in_child else len(batch)
+
+    async def _read_next(
+        self, params: BatchParentWorkflowParams, offset: int, count: int
+    ) -> Tuple[List[str], Optional[str]]:
+        """Read the new batch of count records at offset and return it with the cursor after it."""
+        result = await workflow.execute_activity(
+            read_batches,
+            args=[count, params.num_words, offset, 1, self._cursor],
+            start_to_close_timeout=timedelta(seconds=60),
+        )
+        if not result.batches:
+            return [], self._cursor
+        return result.batches[0], result.cursors[0]
+
+    async def _next_prefetched(
+        self, params: BatchParentWorkflowParams, offset: int
+    ) -> Tuple[List[str], Optional[str]]:
+        """Return the new batch at offset from the prefetch buffer and top the buffer up."""
+        if not self._prefetched and self._prefetching is None:
+            self._prefetch(params)
+        if not self._prefetched and self._prefetching is not None:
+            await self._prefetching
+        if not self._prefetched:
+            return [], self._cursor
+        batch_offset, batch, cursor = self._prefetched.popleft()
+        # New batches are dispatched in order, so the oldest prefetched one is next
+        assert batch_offset == offset
+        self._prefetch(params)
+        return batch, cursor
+
+    def _prefetch(self, params: BatchParentWorkflowParams) -> None:
+        """Refill the prefetch buffer once it is half empty."""
+        target = params.prefetch_batches or 0
+        if (
+            self._prefetching is not None
+            or self._prefetch_exhausted
+            or len(self._prefetched) > target // 2
+        ):
+            return
+        # Refilling in halves keeps batches ready while amortizing each read
+        self._prefetching = asyncio.create_task(
+            self._read_ahead(params, target - len(self._prefetched))
+        )
+
+    async def _read_ahead(self, params: BatchParentWorkflowParams, num_batches: int) -> None:
+        """Read num_batches batches in one activity call into the prefetch buffer."""
+        # A resize during the read applies from the next read on
+        batch_size = self._batch_size
+        result = await workflow.execute_activity(
+            read_batches,
+            args=[
+                batch_size,
+                params.num_words,
+                self._prefetch_offset,
+                num_batches,
+                self._prefetch_cursor,
+            ],
+            start_to_close_timeout=timedelta(seconds=60),
+        )
+        batches = result.batches
+        for batch, cursor in zip(batches, result.cursors):
+            self._prefetched.append((self._prefetch_offset, batch, cursor))
+            self._prefetch_offset += len(batch)
+            self._prefetch_cursor = cursor
+        # A short read means the data ran out
+        self._prefetch_exhausted = len(batches) < num_batches or len(batches[-1]) < batch_size
+        self._prefetching = None
+
+    async def _start_child(
+        self,
+        offset: int,
+        attempt: int,
+        batch: List[str],
+        child_params: BatchChildWorkflowParams,
+    ) -> None:
+        """Start the child for a batch and track it until it completes."""
+        child_id = f"{workflow.info().workflow_id}-batch-{offset}"
+        if attempt > 1:
+            child_id += f"-attempt-{attempt}"
+        # Registered before starting so an early completion signal is not missed
+        self._in_flight[child_id] = InFlightBatch(
+            child_id,
+            offset,
+            workflow.now().timestamp(),
+            attempt,
+            count=child_params.count if child_params.offset is not None else len(batch),
+        )
+        self._record_window()
+        try:
+            handle = await workflow.start_child_workflow(
+                BatchChildWorkflow.run,
+                args=[batch, child_params],
+                id=child_id,
+                # Children must outlive this run so they can cross continue-as-new
+                parent_close_policy=workflow.ParentClosePolicy.ABANDON,
+            )
+        except WorkflowAlreadyStartedError:
+            # Started by an earlier run; its completion signal still reaches us
+            return
+        asyncio.create_task(self._watch_child(handle))
+
+    async def _watch_child(self, handle: workflow.ChildWorkflowHandle[Any, int]) -> None:
+        """Complete a child started by this run when its result arrives."""
+        try:
+            records = await handle
+        except ChildWorkflowError:
+            self._complete(handle.id, False)
+        else:
+            self._complete(handle.id, True, records)
+
+    def _complete(self, child_id: str, succeeded: bool, records: Optional[int] = None) -> None:
+        """Free the child's window slot and feed the outcome to the window."""
+        # Each child is reported twice (signal and result); only the first counts
+        batch = self._in_flight.pop(child_id, None)
+        if batch is None:
+            return
+        if succeeded:
+            if records is None:
+                records = batch.count
+            elif records < batch.count:
+                # A child that read fewer records than its range found the end of the data
+                self._source_end = min(self._source_end, batch.offset + records)
+            duration = workflow.now().timestamp() - batch.started_at
+            self._completed_records += records
+            self._record_completion(records)
+            self._child_duration.record(duration)
+            self._window.on_success(duration)
+            self._record_window()
+            return
+        self._window.on_failure()
+        self._record_window()
+        if batch.attempt < MAX_BATCH_ATTEMPTS:
+            self._retries.append(BatchRetry(batch.offset, batch.attempt + 1, batch.count))
+        else:
+            self._failed_offsets.append(batch.offset)
+
+    def _record_completion(self, count: int) -> None:
+        """Remember count records completing now and forget completions past the throughput window."""
+        now = workflow.now().timestamp()
+        self._recent_completions.append((now, count))
+        while self._recent_completions[0][0] < now - THROUGHPUT_WINDOW:
+            self._recent_completions.popleft()
+
+    def _throughput(self) -> float:
+        """Return records completed per second over the throughput window."""
+        # Workflow time only advances with workflow tasks, so this is as of the last one
+        now = workflow.now().timestamp()
+        elapsed = min(THROUGHPUT_WINDOW, now - self._started_at)
+        if elapsed <= 0:
+            return 0.0
+        recent = sum(
+            count for at, count in self._recent_completions if at >= now - THROUGHPUT_WINDOW
+        )
+        return recent / elapsed
+
+    def _record_window(self) -> None:
+        """Publish the window's occupancy and size."""
+        self._occupancy.set(len(self._in_flight))
+        self._limit.set(self._window.limit)
+
+    async def _report_progress(self, force: bool = False, status: Optional[str] = None) -> None:
+        """Send the completed record count, and finally the outcome, to this shard's orchestrator.
+
+        Counts go out at most every PROGRESS_REPORT_INTERVAL unless forced.
+        """
+        parent = workflow.info().parent
+        if parent is None:
+            return
+        if status is None:
+            if self._completed_records == self._reported_records:
+                return
+            elapsed = (workflow.now() - self._reported_at).total_seconds()
+            if not force and elapsed < PROGRESS_REPORT_INTERVAL:
+                return
+        self._reported_records = self._completed_records
+        self._reported_at = workflow.now()
+        try:
+            await workflow.get_external_workflow_handle(parent.workflow_id).signal(
+                ShardedBatchWorkflow.shard_progress,
+                ShardProgress(workflow.info().workflow_id, self._completed_records, status),
+            )
+        except FailureError:
+            workflow.logger.warning("Orchestrator %s is no longer running", parent.workflow_id)
+
+    def _raise_if_failed(self) -> None:
+        """Fail the workflow if any batch ran out of attempts."""
+        if self._failed_offsets:
+            raise ApplicationError(
+                f"Batches at offsets {sorted(self._failed_offsets)} failed "
+                f"{MAX_BATCH_ATTEMPTS} times",
+                non_retryable=True,
+            )
+
+    def _should_continue_as_new(self, params: BatchParentWorkflowParams) -> bool:
+        """Return True once the server suggests it or history reaches a cap."""
+        return _history_cap_reached(params.max_history_length, params.max_history_size)
+
+
+@workflow.defn
+class ShardedBatchWorkflow:
+    """Split [0, num_words) into shards and run a BatchParentWorkflow for each.
+
+    At most num_shards parents run at once, spread round-robin across the
+    configured task queues so that workers on every queue share the job.
+    Shards report progress and their outcome by signal. Running shards
+    outlive a continue-as-new, which hands their status to the next run.
+    """
+
+    @workflow.init
+    def __init__(self, params: ShardedBatchWorkflowParams) -> None:
+        # Shards by workflow ID, in offset order
+        self._shards: Dict[str, ShardStatus] = {
+            shard.workflow_id: shard for shard in params.shards
+        }
+        self._running: Set[str] = {
+            shard.workflow_id for shard in params.shards if shard.status == SHARD_RUNNING
+        }
+        if params.shards:
+            return
+        num_shards = params.num_shards or NUM_SHARDS
+        shard_size = params.shard_size or max(math.ceil(params.num_words / num_shards), 1)
+        info = workflow.info()
+        task_queues = params.task_queues or [info.task_queue]
+        for i, offset in enumerate(range(0, params.num_words, shard_size)):
+            shard_id = f"{info.workflow_id}-shard-{i}"
+            self._shards[shard_id] = ShardStatus(
+                shard_id,
+                offset,
+                min(offset + shard_size, params.num_words),
+                task_queues[i % len(task_queues)],
+            )
+
+    @workflow.signal
+    def shard_progress(self, progress: ShardProgress) -> None:
+        shard = self._shards.get(progress.workflow_id)
+        # Reports can arrive after the shard's result; keep the final count
+        if shard is None or shard.status != SHARD_RUNNING:
+            return
+        shard.completed_records = max(shard.completed_records, progress.completed_records)
+        if progress.status is not None:
+            self._finish(shard, progress.status)
+
+    @workflow.query
+    def progress(self) -> List[ShardStatus]:
+        return list(self._shards.values())
+
+    @workflow.run
+    async def run(self, params: ShardedBatchWorkflowParams) -> None:
+        try:
+            await self._run(params)
+        except asyncio.CancelledError:
+            # Shards are abandoned on close, so cancel them explicitly
+            running = [shard_id for shard_id in self._shards if shard_id in self._running]
+            await _cancel_children(running)
+            raise
+
+    async def _run(self, params: ShardedBatchWorkflowParams) -> None:
+        limit = params.num_shards or NUM_SHARDS
+        if self._running:
+            # Shards started by an earlier run only report by signal
+            carried = [shard_id for shard_id in self._shards if shard_id in self._running]
+            asyncio.create_task(
+                _watch_carried(
+                    carried,
+                    lambda shard_id: shard_id in self._running,
+                    BatchParentWorkflow.ping,
+                    lambda shard_id: self._finish(self._shards[shard_id], SHARD_FAILED),
+                )
+            )
+
+        for shard in self._shards.values():
+            if shard.status != SHARD_PENDING:
+                continue
+            await workflow.wait_condition(
+                lambda: len(self._running) < limit or self._should_continue_as_new(params)
+            )
+            if len(self._running) >= limit:
+                self._continue_as_new(params)
+            handle = await workflow.start_child_workflow(
+                BatchParentWorkflow.run,
+                dataclasses.replace(params.parent, num_words=shard.end, offset=shard.offset),
+                id=shard.workflow_id,
+                task_queue=shard.task_queue,
+                # Shards must outlive this run so they can cross continue-as-new
+                parent_close_policy=workflow.ParentClosePolicy.ABANDON,
+            )
+            shard.status = SHARD_RUNNING
+            self._running.add(shard.workflow_id)
+            asyncio.create_task(self._watch_shard(handle, shard))
+
+        await workflow.wait_condition(
+            lambda: not self._running or self._should_continue_as_new(params)
+        )
+        if self._running:
+            self._continue_as_new(params)
+        failed = [
+            shard.workflow_id for shard in self._shards.values() if shard.status == SHARD_FAILED
+        ]
+        if failed:
+            raise ApplicationError(f"Shards {failed} failed", non_retryable=True)
+
+    async def _watch_shard(
+        self, handle: workflow.ChildWorkflowHandle[Any, None], shard: ShardStatus
+    ) -> None:
+        """Record the outcome of a shard started by this run when its parent finishes."""
+        try:
+            await handle
+        except ChildWorkflowError:
+            self._finish(shard, SHARD_FAILED)
+        else:
+            self._finish(shard, SHARD_COMPLETED)
+
+    def _finish(self, shard: ShardStatus, status: str) -> None:
+        """Record a shard's outcome and free its slot; later reports of it are ignored."""
+        if shard.status != SHARD_RUNNING:
+            return
+        shard.status = status
+        if status == SHARD_COMPLETED:
+            shard.completed_records = shard.end - shard.offset
+        self._running.discard(shard.workflow_id)
+
+    def _should_continue_as_new(self, params: ShardedBatchWorkflowParams) -> bool:
+        return _history_cap_reached(params.max_history_length, params.max_history_size)
+
+    def _continue_as_new(self, params: ShardedBatchWorkflowParams) -> NoReturn:
+        """Continue as new, handing every shard's status to the next run."""
+        workflow.continue_as_new(
+            dataclasses.replace(params, shards=list(self._shards.values()))
+        )
+
+
+@workflow.defn
+class RecordPoolWorkflow:
+    """Keep a fixed number of process_record activities in flight across batches.
+
+    Unlike BatchParentWorkflow, whose window counts whole children, a slot
+    freed by a finished record is refilled straight away with the next
+    record, even if it belongs to the next batch, so a straggler only holds
+    its own slot.
+    """
+
+    @workflow.run
+    async def run(self, params: RecordPoolWorkflowParams) -> None:
+        pool_size = params.pool_size or POOL_SIZE
+        # Records carried over from the previous run, started before any other
+        carried: Deque[str] = deque(params.in_flight)
+        # Records read but not started yet; the first one is at next_offset
+        pending: Deque[str] = deque()
+        next_offset = params.offset
+        read_offset = params.offset
+        # Continue-as-new can fall inside a batch, so each run seeks to its offset once
+        read_cursor: Optional[str] = None
+        exhausted = False
+        reading: Optional["asyncio.Task[SourceBatches]"] = None
+        # Running records by their task
+        in_flight: Dict["asyncio.Task[str]", str] = {}
+
+        while True:
+            # Read the next batch while the pending records would still fill the pool
+            if reading is None and not exhausted and len(pending) < pool_size:
+                reading = asyncio.create_task(
+                    self._read_batch(params.num_words, read_offset, read_cursor)
                 )
+            if reading is not None and reading.done():
+                result = reading.result()
+                reading = None
+                exhausted = not result.batches
+                if result.batches:
+                    pending.extend(result.batches[0])
+                    read_offset += len(result.batches[0])
+                    read_cursor = result.cursors[0]
+                continue
+
+            while carried and len(in_flight) < pool_size:
+                record = carried.popleft()
+                in_flight[asyncio.create_task(self._process_record(record))] = record
+            while pending and len(in_flight) < pool_size:
+                record = pending.popleft()
+                in_flight[asyncio.create_task(self._process_record(record))] = record
+                next_offset += 1
+            if exhausted and not pending and not in_flight:
+                break
+
+            if _history_cap_reached(params.max_history_length, params.max_history_size):
+                await self._continue_as_new(params, next_offset, in_flight, carried)
+
+            waiting = list(in_flight) if reading is None else [*in_flight, reading]
+            done, _ = await workflow.wait(waiting, return_when=asyncio.FIRST_COMPLETED)
+            # In start order, so a failure is raised the same way on replay
+            for task in [task for task in in_flight if task in done]:
+                del in_flight[task]
+                # Raises if the record failed after exhausting its retries
+                task.result()
+
+    async def _continue_as_new(
+        self,
+        params: RecordPoolWorkflowParams,
+        next_offset: int,
+        in_flight: Dict["asyncio.Task[str]", str],
+        carried: Deque[str],
+    ) -> NoReturn:
+        """Continue as new from next_offset, carrying the records still running.
+
+        Activities can't cross continue-as-new. Rather than idle the pool until
+        the slowest record finishes, wait at most POOL_DRAIN_TIMEOUT and hand
+        the records still running to the next run, which starts them again;
+        process_record must therefore be idempotent. Pending records are read
+        again by the next run.
+        """
+        try:
+            await workflow.wait_condition(
+                lambda: all(task.done() for task in in_flight), timeout=POOL_DRAIN_TIMEOUT
+            )
+        except asyncio.TimeoutError:
+            pass
+        running = []
+        for task, record in in_flight.items():
+            if task.done():
+                # Raises if the record failed after exhausting its retries
+                task.result()
+            else:
+                running.append(record)
+        workflow.continue_as_new(
+            dataclasses.replace(params, offset=next_offset, in_flight=running + list(carried))
+        )
+
+    async def _read_batch(
+        self, num_words: int, offset: int, cursor: Optional[str]
+    ) -> SourceBatches:
+        """Read the batch of records starting at offset, from cursor if there is one."""
+        return await workflow.execute_activity(
+            read_batches,
+            args=[BATCH_SIZE, num_words, offset, 1, cursor],
+            start_to_close_timeout=timedelta(seconds=60),
+        )
+
+    async def _process_record(self, record: str) -> str:
+        return await workflow.execute_activity(
+            process_record,
+            record,
+            start_to_close_timeout=timedelta(seconds=60),
+        )
+
+
+async def _watch_carried(
+    child_ids: List[str],
+    in_flight: Callable[[str], bool],
+    ping: Callable[[Any], None],
+    lost: Callable[[str], None],
+) -> None:
+    """Call lost for each child carried over from the previous run that closes unreported.
+
+    The run has no handle to their results, and a child that was terminated
+    or timed out never reports. A child reports before it closes, so one that
+    can no longer be signalled with ping while still in flight never will.
+    """
+    # A list rather than a set, so the signals are sent in the same order on replay
+    carried = child_ids
+    while True:
+        carried = [child_id for child_id in carried if in_flight(child_id)]
+        if not carried:
+            return
+        try:
+            await workflow.wait_condition(
+                lambda: not any(in_flight(child_id) for child_id in carried),
+                timeout=CARRIED_CHILD_CHECK_INTERVAL,
+            )
+        except asyncio.TimeoutError:
+            await asyncio.gather(
+                *(_check_carried(child_id, in_flight, ping, lost) for child_id in carried)
+            )
+
+
+async def _check_carried(
+    child_id: str,
+    in_flight: Callable[[str], bool],
+    ping: Callable[[Any], None],
+    lost: Callable[[str], None],
+) -> None:
+    """Call lost for a carried child that is no longer running."""
+    try:
+        await workflow.get_external_workflow_handle(child_id).signal(ping)
+    except FailureError:
+        if in_flight(child_id):
+            workflow.logger.warning("Child %s closed without reporting", child_id)
+            lost(child_id)
+
+
+async def _cancel_children(child_ids: List[str]) -> None:
+    """Ask children to cancel, since a parent close policy of ABANDON leaves them running."""
+
+    async def cancel(child_id: str) -> None:
+        try:
+            await workflow.get_external_workflow_handle(child_id).cancel()
+        except FailureError:
+            # Closed already
+            pass
+
+    await asyncio.gather(*(cancel(child_id) for child_id in child_ids))
+
 
-        if active:
-            await asyncio.gather(*active)
+def _history_cap_reached(
+    max_history_length: Optional[int], max_history_size: Optional[int]
+) -> bool:
+    """Return True once the server suggests continue-as-new or history reaches a cap."""
+    info = workflow.info()
+    return (
+        info.is_continue_as_new_suggested()
+        or info.get_current_history_length() >= (max_history_length or MAX_HISTORY_LENGTH)
+        or info.get_current_history_size() >= (max_history_size or MAX_HISTORY_SIZE)
+    )
@@ -9,6 +9,7 @@ import pytest
 import pytest_asyncio
 from temporalio.testing import WorkflowEnvironment
 
+from temporal_batch.line_index import sidecar_path
 
 
 @pytest.fixture(scope="session")
@@ -40,6 +41,7 @@ def test_words_file() -> Generator[Path, None, None]:
         yield Path(f.name)
     
     Path(f.name).unlink(missing_ok=True)
+    sidecar_path(Path(f.name)).unlink(missing_ok=True)
 
 
 @pytest.fixture
@@ -1,10 +1,34 @@
 """Unit tests for temporal batch processing activities."""
 
+import dataclasses
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
 from pathlib import Path
+from typing import Any, List, Optional
+from unittest import mock
 
 import pytest
+from temporalio.testing import ActivityEnvironment
 
-from temporal_batch.activities import create_single_batch, process_record
+from temporal_batch import activities
+from temporal_batch.activities import (
+    create_single_batch,
+    init_record_cache,
+    process_batch,
+    process_record,
+    read_batches,
+    transform_records,
+    write_results,
+)
+from temporal_batch.cache import RecordCache
+from temporal_batch.metrics import (
+    BATCH_READ_LATENCY,
+    RECORD_CACHE_HITS,
+    RECORD_CACHE_MISSES,
+    RECORD_LATENCY,
+    SINK_DUPLICATE_BATCHES,
+)
+from temporal_batch.sinks import open_sink
 
 
 class TestCreateSingleBatch:
@@ -49,6 +73,63 @@ class TestCreateSingleBatch:
         assert len(result) == 2
         assert result == ['date', 'elderberry']
 
+    @pytest.mark.asyncio
+    async def test_read_runs_on_io_executor(self, mock_words_file: Path) -> None:
+        """Test that the file is read on the configured I/O thread pool."""
+        submitted: list[object] = []
+        
+        class RecordingExecutor(ThreadPoolExecutor):
+            def submit(self, fn, /, *args, **kwargs):  # type: ignore[no-untyped-def]
+                submitted.append(fn)
+                return super().submit(fn, *args, **kwargs)
+        
+        with RecordingExecutor(1) as executor:
+            activities.set_io_executor(executor)
+            try:
+                result = await create_single_batch(batch_size=2, read_until_line=5, offset=0)
+            finally:
+                activities.set_io_executor(None)
+        
+        assert result == ['apple', 'banana']
+        assert len(submitted) == 1
+
+
+class TestReadBatches:
+    """Test the read_batches activity."""
+
+    @pytest.mark.asyncio
+    async def test_read_returns_cursors(self, mock_words_file: Path) -> None:
+        """Test that every batch comes with the cursor of the record after it."""
+        result = await read_batches(2, 5, 0, 3, None)
+        
+        assert result.batches == [['apple', 'banana'], ['cherry', 'date'], ['elderberry']]
+        assert len(result.cursors) == 3
+
+    @pytest.mark.asyncio
+    async def test_resume_from_cursor(self, mock_words_file: Path) -> None:
+        """Test that a read resumes from a cursor returned by an earlier read."""
+        first = await read_batches(2, 5, 0, 1, None)
+        
+        second = await read_batches(2, 5, 2, 1, first.cursors[-1])
+        
+        assert second.batches == [['cherry', 'date']]
+
+    @pytest.mark.asyncio
+    async def test_offset_beyond_limit(self, mock_words_file: Path) -> None:
+        """Test reading past read_until_line."""
+        result = await read_batches(2, 5, 5, 1, None)
+        
+        assert result.batches == [] and result.cursors == []
+
+    @pytest.mark.asyncio
+    async def test_configured_source(self, monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
+        """Test that the activities read from TEMPORAL_BATCH_SOURCE when it is set."""
+        data_file = tmp_path / "words.jsonl"
+        data_file.write_text('{"w": "fig"}\n{"w": "grape"}\n{"w": "kiwi"}\n')
+        monkeypatch.setattr(activities, 'DATA_SOURCE', f"{data_file}?field=w")
+        
+        assert await create_single_batch(batch_size=2, read_until_line=3, offset=1) == ['grape', 'kiwi']
+
 
 class TestProcessRecord:
     """Test the process_record activity."""
@@ -72,4 +153,181 @@ class TestProcessRecord:
         """Test processing string with special characters."""
         result = await process_record("hello-world_123")
         
-        assert result == "HELLO-WORLD_123"
\ No newline at end of file
+        assert result == "HELLO-WORLD_123"
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("heartbeat_timeout, heartbeats", [(None, 0), (timedelta(seconds=2), 1)])
+    async def test_heartbeats_only_when_hedgeable(
+        self, heartbeat_timeout: Optional[timedelta], heartbeats: int
+    ) -> None:
+        """Test that only attempts with a heartbeat timeout heartbeat."""
+        env = ActivityEnvironment()
+        env.info = dataclasses.replace(env.info, heartbeat_timeout=heartbeat_timeout)
+        details: List[Any] = []
+        env.on_heartbeat = lambda *detail: details.append(detail)
+
+        with mock.patch('random.random', return_value=1.0):
+            await env.run(process_record, 'apple')
+
+        assert len(details) == heartbeats
+
+
+class TestActivityMetrics:
+    """Test the latency histograms recorded by activities in a worker."""
+
+    @pytest.mark.asyncio
+    async def test_batch_read_latency_recorded(self, mock_words_file: Path) -> None:
+        """Test that reading a batch records its latency."""
+        env = ActivityEnvironment()
+        env.metric_meter = mock.MagicMock()
+
+        await env.run(create_single_batch, 2, 5, 0)
+
+        # The activity's meter is the runtime meter with activity attributes added
+        meter = env.metric_meter.with_additional_attributes.return_value
+        meter.create_histogram_float.assert_called_once_with(BATCH_READ_LATENCY, mock.ANY, "s")
+        meter.create_histogram_float.return_value.record.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_record_latency_recorded(self) -> None:
+        """Test that processing a record records its latency."""
+        env = ActivityEnvironment()
+        env.metric_meter = mock.MagicMock()
+
+        await env.run(process_record, 'apple')
+
+        meter = env.metric_meter.with_additional_attributes.return_value
+        meter.create_histogram_float.assert_called_once_with(RECORD_LATENCY, mock.ANY, "s")
+
+
+class TestProcessBatch:
+    """Test the process_batch activity."""
+
+    @pytest.mark.asyncio
+    async def test_process_batch_uppercase(self) -> None:
+        """Test that every record in the batch is converted."""
+        env = ActivityEnvironment()
+        heartbeats: List[Any] = []
+        env.on_heartbeat = lambda *details: heartbeats.append(details)
+
+        result = await env.run(process_batch, ['apple', 'banana', 'cherry'])
+
+        assert result == ['APPLE', 'BANANA', 'CHERRY']
+        assert len(heartbeats) == 3
+        assert heartbeats[-1] == (['APPLE', 'BANANA', 'CHERRY'],)
+
+    @pytest.mark.asyncio
+    async def test_process_batch_resumes_from_heartbeat(self) -> None:
+        """Test that records finished before a retry are not processed again."""
+        env = ActivityEnvironment()
+        env.info = dataclasses.replace(
+            env.info, heartbeat_details=[['done-already', None, 'DONE-TOO']]
+        )
+
+        result = await env.run(process_batch, ['apple', 'banana', 'cherry'])
+
+        assert result == ['done-already', 'BANANA', 'DONE-TOO']
+
+    @pytest.mark.asyncio
+    async def test_process_batch_empty(self) -> None:
+        """Test processing an empty batch."""
+        result = await ActivityEnvironment().run(process_batch, [])
+
+        assert result == []
+
+
+class TestTransformRecords:
+    """Test the transform_records activity."""
+
+    def test_transform_records_uppercase(self) -> None:
+        """Test that every record in the chunk is transformed in order."""
+        result = transform_records(['apple', 'banana', 'cherry'])
+        
+        assert result == ['APPLE', 'BANANA', 'CHERRY']
+
+    def test_transform_records_empty(self) -> None:
+        """Test transforming an empty chunk."""
+        assert transform_records([]) == []
+
+
+class TestRecordCaching:
+    """Test answering repeated records from the worker's record cache."""
+
+    @pytest.fixture
+    def record_cache(self, monkeypatch: pytest.MonkeyPatch) -> RecordCache:
+        """Install a record cache for the duration of a test."""
+        monkeypatch.setattr(activities, '_record_cache', None)
+        return init_record_cache(1 << 20)
+
+    @pytest.mark.asyncio
+    async def test_repeated_record_skips_transform(self, record_cache: RecordCache) -> None:
+        """Test that a cached record is returned without the simulated delay."""
+        await process_record('apple')
+        
+        with mock.patch('asyncio.sleep') as sleep:
+            result = await process_record('apple')
+
+        assert result == 'APPLE'
+        sleep.assert_not_called()
+        assert (record_cache.stats.hits, record_cache.stats.misses) == (1, 1)
+
+    @pytest.mark.asyncio
+    async def test_process_batch_uses_cache(self, record_cache: RecordCache) -> None:
+        """Test that process_batch shares the cache with process_record."""
+        await process_record('apple')
+
+        result = await ActivityEnvironment().run(process_batch, ['apple', 'banana', 'apple'])
+
+        assert result == ['APPLE', 'BANANA', 'APPLE']
+        assert record_cache.stats.hits >= 2
+
+    def test_transform_records_uses_cache(self, record_cache: RecordCache) -> None:
+        """Test that the CPU-bound transform is cached separately from process_record."""
+        with mock.patch.object(activities, '_cpu_transform', wraps=activities._cpu_transform) as cpu:
+            result = transform_records(['apple', 'apple', 'banana'])
+
+        assert result == ['APPLE', 'APPLE', 'BANANA']
+        assert cpu.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_cache_counters_recorded(self, record_cache: RecordCache) -> None:
+        """Test that hits and misses are counted on the activity's meter."""
+        env = ActivityEnvironment()
+        env.metric_meter = mock.MagicMock()
+
+        await env.run(process_record, 'apple')
+        await env.run(process_record, 'apple')
+
+        meter = env.metric_meter.with_additional_attributes.return_value
+        names = [call.args[0] for call in meter.create_counter.call_args_list]
+        assert names == [RECORD_CACHE_MISSES, RECORD_CACHE_HITS]
+
+    @pytest.mark.asyncio
+    async def test_no_cache_by_default(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """Test that records are always transformed without a cache."""
+        monkeypatch.setattr(activities, '_record_cache', None)
+
+        with mock.patch('asyncio.sleep') as sleep:
+            await process_record('apple')
+            await process_record('apple')
+
+        assert sleep.call_count == 2
+
+
+class TestWriteResults:
+    """Test the write_results activity."""
+
+    @pytest.mark.asyncio
+    async def test_write_is_idempotent(self, tmp_path: Path) -> None:
+        """Test that writing a batch twice appends it once and counts the duplicate."""
+        sink = f"frames:{tmp_path}?fsync=false&shared=false"
+        env = ActivityEnvironment()
+        env.metric_meter = mock.MagicMock()
+        
+        assert await env.run(write_results, sink, 'parent', 50, ['APPLE', 'BANANA'])
+        assert not await env.run(write_results, sink, 'parent', 50, ['APPLE', 'BANANA'])
+        
+        assert list(open_sink(sink).read('parent')) == [(50, ['APPLE', 'BANANA'])]
+        meter = env.metric_meter.with_additional_attributes.return_value
+        names = [call.args[0] for call in meter.create_counter.call_args_list]
+        assert names == [SINK_DUPLICATE_BATCHES]
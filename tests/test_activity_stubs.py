@@ -0,0 +1,37 @@
+"""Unit tests for the activity stubs that workflows call."""
+
+import inspect
+from typing import Any, Callable, Dict
+
+from temporalio import activity
+
+from temporal_batch import activities, activity_stubs
+
+
+def definitions(module: Any) -> Dict[str, Callable]:
+    """Return the module's activity functions by activity name."""
+    found: Dict[str, Callable] = {}
+    for _, fn in inspect.getmembers(module, inspect.isfunction):
+        defn = activity._Definition.from_callable(fn)
+        if defn is not None and defn.name is not None and fn.__module__ == module.__name__:
+            found[defn.name] = fn
+    return found
+
+
+class TestActivityStubs:
+    """Test that the stubs stay in step with the activities they stand for."""
+
+    def test_every_activity_has_a_stub(self) -> None:
+        """Test that the stubs and the activities have the same names."""
+        assert definitions(activity_stubs).keys() == definitions(activities).keys()
+
+    def test_signatures_match(self) -> None:
+        """Test that each stub takes and returns what its activity does."""
+        implementations = definitions(activities)
+        for name, stub in definitions(activity_stubs).items():
+            implementation = implementations[name]
+
+            assert inspect.signature(stub) == inspect.signature(implementation), name
+            assert inspect.iscoroutinefunction(stub) == inspect.iscoroutinefunction(
+                implementation
+            ), name
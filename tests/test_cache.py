@@ -0,0 +1,88 @@
+"""Unit tests for the record cache."""
+
+import sys
+
+import pytest
+
+from temporal_batch import cache
+from temporal_batch.cache import ENTRY_OVERHEAD, RecordCache
+
+
+def entry_size(key: str, value: str) -> int:
+    """Return the size the cache estimates for an entry."""
+    return sys.getsizeof(key) + sys.getsizeof(value) + ENTRY_OVERHEAD
+
+
+class TestRecordCache:
+    """Test lookups, eviction and expiry."""
+
+    def test_hit_and_miss(self) -> None:
+        """Test that a stored value is returned and a missing one is not."""
+        records = RecordCache(1 << 20)
+        records.put('apple', 'APPLE')
+
+        assert records.get('apple') == 'APPLE'
+        assert records.get('banana') is None
+        assert (records.stats.hits, records.stats.misses) == (1, 1)
+        assert records.stats.hit_rate == 0.5
+
+    def test_evicts_least_recently_used(self) -> None:
+        """Test that the entry used longest ago is evicted once the budget is exceeded."""
+        records = RecordCache(2 * entry_size('aaaa', 'AAAA'))
+        records.put('aaaa', 'AAAA')
+        records.put('bbbb', 'BBBB')
+        records.get('aaaa')
+
+        evicted = records.put('cccc', 'CCCC')
+
+        assert evicted == 1
+        assert records.stats.evictions == 1
+        assert records.get('bbbb') is None
+        assert records.get('aaaa') == 'AAAA'
+        assert records.get('cccc') == 'CCCC'
+        assert records.size <= records.max_bytes
+
+    def test_replacing_entry_keeps_size(self) -> None:
+        """Test that storing a key again doesn't count it twice."""
+        records = RecordCache(1 << 20)
+        records.put('apple', 'APPLE')
+        records.put('apple', 'APPLE')
+
+        assert len(records) == 1
+        assert records.size == entry_size('apple', 'APPLE')
+
+    def test_entry_larger_than_budget_not_stored(self) -> None:
+        """Test that an entry that can't fit is skipped instead of emptying the cache."""
+        records = RecordCache(entry_size('apple', 'APPLE'))
+        records.put('apple', 'APPLE')
+
+        assert records.put('banana', 'B' * 1000) == 0
+        assert records.get('apple') == 'APPLE'
+
+    def test_expired_entry_is_a_miss(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """Test that an entry older than the TTL is dropped on lookup."""
+        now = [100.0]
+        monkeypatch.setattr(cache.time, 'monotonic', lambda: now[0])
+        records = RecordCache(1 << 20, ttl=10)
+        records.put('apple', 'APPLE')
+
+        now[0] += 5
+        assert records.get('apple') == 'APPLE'
+        now[0] += 10
+        assert records.get('apple') is None
+        assert records.stats.expirations == 1
+        assert len(records) == 0 and records.size == 0
+
+    def test_tuple_keys(self) -> None:
+        """Test that the items of a tuple key count towards its size."""
+        records = RecordCache(1 << 20)
+        records.put(('process_record', 'apple'), 'APPLE')
+
+        assert records.get(('process_record', 'apple')) == 'APPLE'
+        assert records.get(('transform_records', 'apple')) is None
+        assert records.size > entry_size('apple', 'APPLE')
+
+    def test_invalid_budget(self) -> None:
+        """Test that a cache needs a positive budget."""
+        with pytest.raises(ValueError, match="budget"):
+            RecordCache(0)
@@ -0,0 +1,97 @@
+"""Unit tests for the payload compression codec."""
+
+import os
+
+import pytest
+from temporalio.api.common.v1 import Payload
+from temporalio.converter import DataConverter
+
+from temporal_batch.codec import (
+    COMPRESSION_ALGORITHMS,
+    COMPRESSION_LZMA,
+    COMPRESSION_ZLIB,
+    CompressionCodec,
+    compression_data_converter,
+)
+
+
+def words_payload(count: int) -> Payload:
+    """Serialize a batch of words the way an activity result is serialized."""
+    return DataConverter.default.payload_converter.to_payloads([["apple"] * count])[0]
+
+
+class TestCompressionCodec:
+    """Test compressing and restoring payloads."""
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("algorithm", COMPRESSION_ALGORITHMS)
+    async def test_round_trip(self, algorithm: str) -> None:
+        """Test that a large payload is compressed and decoded back unchanged."""
+        codec = CompressionCodec(algorithm, threshold=100)
+        payload = words_payload(200)
+
+        encoded = await codec.encode([payload])
+
+        assert encoded[0].metadata["encoding"] == f"binary/{algorithm}".encode()
+        assert encoded[0].ByteSize() < payload.ByteSize()
+        assert await codec.decode(encoded) == [payload]
+
+    @pytest.mark.asyncio
+    async def test_small_payload_unchanged(self) -> None:
+        """Test that payloads below the threshold are passed through."""
+        codec = CompressionCodec(threshold=10_000)
+        payload = words_payload(5)
+
+        assert await codec.encode([payload]) == [payload]
+        assert codec.stats.payloads == 1
+        assert codec.stats.compressed == 0
+
+    @pytest.mark.asyncio
+    async def test_incompressible_payload_unchanged(self) -> None:
+        """Test that a payload that would grow is sent as is."""
+        codec = CompressionCodec(threshold=0)
+        payload = Payload(metadata={"encoding": b"binary/plain"}, data=os.urandom(4096))
+
+        assert await codec.encode([payload]) == [payload]
+
+    @pytest.mark.asyncio
+    async def test_decodes_either_algorithm(self) -> None:
+        """Test that a codec decodes payloads compressed with the other algorithm."""
+        payload = words_payload(200)
+        encoded = await CompressionCodec(COMPRESSION_LZMA, threshold=0).encode([payload])
+
+        assert await CompressionCodec(COMPRESSION_ZLIB).decode(encoded) == [payload]
+
+    @pytest.mark.asyncio
+    async def test_stats(self) -> None:
+        """Test that the codec counts compressed payloads and bytes."""
+        codec = CompressionCodec(threshold=100)
+        payloads = [words_payload(200), words_payload(5)]
+
+        await codec.encode(payloads)
+
+        assert codec.stats.payloads == 2
+        assert codec.stats.compressed == 1
+        assert codec.stats.bytes_in == payloads[0].ByteSize()
+        assert codec.stats.ratio > 1
+
+    def test_unknown_algorithm(self) -> None:
+        """Test that an unknown algorithm is rejected."""
+        with pytest.raises(ValueError, match="Unknown compression algorithm"):
+            CompressionCodec("brotli")
+
+
+class TestCompressionDataConverter:
+    """Test building the client's data converter."""
+
+    def test_disabled(self) -> None:
+        """Test that no codec is installed without an algorithm."""
+        assert compression_data_converter(None) == (DataConverter.default, None)
+
+    def test_enabled(self) -> None:
+        """Test that the codec is installed on the default converter."""
+        converter, codec = compression_data_converter(COMPRESSION_LZMA, 512)
+
+        assert converter.payload_codec is codec
+        assert codec is not None and codec.threshold == 512
+        assert converter.payload_converter_class is DataConverter.default.payload_converter_class
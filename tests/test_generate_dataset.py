@@ -0,0 +1,63 @@
+"""Unit tests for the synthetic dataset generator."""
+
+import gzip
+from pathlib import Path
+
+import pytest
+
+from benchmarks.generate_dataset import SizeDistribution, generate, parse_sizes
+
+
+class TestGenerate:
+    """Test the generated records."""
+
+    def test_deterministic(self, tmp_path: Path) -> None:
+        """Test that the same seed writes the same file and another seed does not."""
+        generate(tmp_path / "a.txt", 1000, duplicate_rate=0.2, seed=7)
+        generate(tmp_path / "b.txt", 1000, duplicate_rate=0.2, seed=7)
+        generate(tmp_path / "c.txt", 1000, duplicate_rate=0.2, seed=8)
+
+        assert (tmp_path / "a.txt").read_bytes() == (tmp_path / "b.txt").read_bytes()
+        assert (tmp_path / "a.txt").read_bytes() != (tmp_path / "c.txt").read_bytes()
+
+    def test_duplicates(self, tmp_path: Path) -> None:
+        """Test that records not drawn as duplicates are all distinct, even when short."""
+        path = tmp_path / "records.txt"
+        stats = generate(path, 5000, parse_sizes("uniform:1-4"), duplicate_rate=0.3)
+
+        records = path.read_text().splitlines()
+        assert len(records) == stats.records == 5000
+        assert len(set(records)) == stats.distinct
+        assert 0.25 < 1 - stats.distinct / stats.records < 0.35
+
+    def test_sizes(self, tmp_path: Path) -> None:
+        """Test that record lengths follow the distribution."""
+        path = tmp_path / "records.txt"
+        stats = generate(path, 200, parse_sizes("fixed:100000"))
+
+        assert {len(record) for record in path.read_text().splitlines()} == {100_000}
+        assert stats.bytes == 200 * 100_001
+
+    def test_gzip(self, tmp_path: Path) -> None:
+        """Test that a .gz path is written compressed."""
+        generate(tmp_path / "records.txt", 100)
+        generate(tmp_path / "records.txt.gz", 100)
+
+        with gzip.open(tmp_path / "records.txt.gz", "rb") as f:
+            assert f.read() == (tmp_path / "records.txt").read_bytes()
+
+
+class TestParseSizes:
+    """Test size distribution specs."""
+
+    def test_specs(self) -> None:
+        """Test that each kind of spec is parsed."""
+        assert parse_sizes("fixed:64") == SizeDistribution("fixed", 64)
+        assert parse_sizes("uniform:3-12") == SizeDistribution("uniform", 3, 12)
+        assert parse_sizes("lognormal:256:1.5") == SizeDistribution("lognormal", 256, 1.5)
+
+    @pytest.mark.parametrize("spec", ["fixed:0", "uniform:12-3", "lognormal:x:1", "zipf:1"])
+    def test_invalid(self, spec: str) -> None:
+        """Test that invalid specs are rejected."""
+        with pytest.raises(ValueError):
+            parse_sizes(spec)
@@ -0,0 +1,161 @@
+"""Unit tests for the timing and profiling interceptors."""
+
+import asyncio
+import contextvars
+import pstats
+import time
+from pathlib import Path
+from typing import Any, List
+from unittest import mock
+
+import pytest
+from temporalio.testing import ActivityEnvironment
+from temporalio.worker import ActivityInboundInterceptor, ExecuteActivityInput
+
+from temporal_batch.interceptors import TimingInterceptor, _TimedSteps
+from temporal_batch.metrics import ACTIVITY_EXECUTION_TIME
+
+
+class _SlowNext(ActivityInboundInterceptor):
+    """Stands in for the rest of the interceptor chain."""
+
+    def __init__(self) -> None:
+        pass
+
+    async def execute_activity(self, input: ExecuteActivityInput) -> Any:
+        await asyncio.sleep(0.01)
+        return "done"
+
+
+class _ExecutorNext(ActivityInboundInterceptor):
+    """Runs a synchronous activity function on a thread, as the SDK's executor does."""
+
+    def __init__(self) -> None:
+        pass
+
+    async def execute_activity(self, input: ExecuteActivityInput) -> Any:
+        context = contextvars.copy_context()
+        return await asyncio.get_running_loop().run_in_executor(
+            None, context.run, input.fn, *input.args
+        )
+
+
+async def _async_activity() -> None:
+    pass
+
+
+def _sync_activity(seconds: float) -> str:
+    time.sleep(seconds)
+    return "done"
+
+
+def _input() -> ExecuteActivityInput:
+    return ExecuteActivityInput(fn=_async_activity, args=[], executor=None, headers={})
+
+
+class TestTimedSteps:
+    """Test timing a coroutine step by step."""
+
+    @pytest.mark.asyncio
+    async def test_records_each_step(self) -> None:
+        """Test that every run between suspensions is recorded and the result passes through."""
+        steps: List[float] = []
+        
+        async def work() -> str:
+            await asyncio.sleep(0)
+            await asyncio.sleep(0)
+            return "result"
+        
+        result = await _TimedSteps(work(), steps.append)
+        
+        assert result == "result"
+        assert len(steps) == 3
+
+    @pytest.mark.asyncio
+    async def test_propagates_exceptions(self) -> None:
+        """Test that an exception from the coroutine is raised and its step recorded."""
+        steps: List[float] = []
+        
+        async def work() -> None:
+            await asyncio.sleep(0)
+            raise ValueError("boom")
+        
+        with pytest.raises(ValueError, match="boom"):
+            await _TimedSteps(work(), steps.append)
+        
+        assert len(steps) == 2
+
+
+class TestTimingInterceptor:
+    """Test the activity side of the TimingInterceptor."""
+
+    @pytest.mark.asyncio
+    async def test_records_activity_time(self) -> None:
+        """Test that an activity execution's wall time is recorded with its tags."""
+        meter = mock.MagicMock()
+        interceptor = TimingInterceptor(meter).intercept_activity(_SlowNext())
+        
+        result = await ActivityEnvironment().run(interceptor.execute_activity, _input())
+        
+        assert result == "done"
+        attributes = meter.with_additional_attributes.call_args.args[0]
+        assert attributes["activity_type"] == "unknown"
+        tagged = meter.with_additional_attributes.return_value
+        tagged.create_histogram_float.assert_called_once_with(ACTIVITY_EXECUTION_TIME, mock.ANY, "s")
+        assert tagged.create_histogram_float.return_value.record.call_args.args[0] >= 0.01
+
+    @pytest.mark.asyncio
+    async def test_writes_profile_of_slow_execution(self, tmp_path: Path) -> None:
+        """Test that a sampled execution slower than the threshold is written out."""
+        root = TimingInterceptor(
+            mock.MagicMock(), profile_dir=tmp_path, profile_threshold=0.0, profile_sample_rate=1.0
+        )
+        interceptor = root.intercept_activity(_SlowNext())
+        
+        await ActivityEnvironment().run(interceptor.execute_activity, _input())
+        
+        assert len(list(tmp_path.glob("*.prof"))) == 1
+
+    @pytest.mark.asyncio
+    async def test_skips_profile_of_fast_execution(self, tmp_path: Path) -> None:
+        """Test that executions under the threshold leave no profile behind."""
+        root = TimingInterceptor(
+            mock.MagicMock(), profile_dir=tmp_path, profile_threshold=60.0, profile_sample_rate=1.0
+        )
+        interceptor = root.intercept_activity(_SlowNext())
+        
+        await ActivityEnvironment().run(interceptor.execute_activity, _input())
+        
+        assert list(tmp_path.glob("*.prof")) == []
+
+    @pytest.mark.asyncio
+    async def test_profiles_sync_activity_in_executor(self, tmp_path: Path) -> None:
+        """Test that a synchronous activity is profiled on the thread that runs it."""
+        root = TimingInterceptor(
+            mock.MagicMock(), profile_dir=tmp_path, profile_threshold=0.0, profile_sample_rate=1.0
+        )
+        interceptor = root.intercept_activity(_ExecutorNext())
+        input = ExecuteActivityInput(fn=_sync_activity, args=[0.01], executor=None, headers={})
+        
+        result = await ActivityEnvironment().run(interceptor.execute_activity, input)
+        
+        assert result == "done"
+        (path,) = tmp_path.glob("*.prof")
+        assert not path.stem.endswith("-loop")
+        assert "_sync_activity" in pstats.Stats(str(path)).get_stats_profile().func_profiles
+
+    @pytest.mark.asyncio
+    async def test_one_loop_profile_at_a_time(self, tmp_path: Path) -> None:
+        """Test that an async execution sampled during another's profile is skipped."""
+        root = TimingInterceptor(
+            mock.MagicMock(), profile_dir=tmp_path, profile_threshold=0.0, profile_sample_rate=1.0
+        )
+        interceptor = root.intercept_activity(_SlowNext())
+        env = ActivityEnvironment()
+        
+        await asyncio.gather(
+            env.run(interceptor.execute_activity, _input()),
+            env.run(interceptor.execute_activity, _input()),
+        )
+        
+        assert [path.stem.endswith("-loop") for path in tmp_path.glob("*.prof")] == [True]
@@ -0,0 +1,81 @@
+"""Unit tests for the persisted line index."""
+
+import os
+from pathlib import Path
+
+from temporal_batch.line_index import (
+    build_line_index,
+    get_line_index,
+    load_line_index,
+    read_lines,
+    sidecar_path,
+)
+
+
+class TestLineIndex:
+    """Test building, persisting and reading through the line index."""
+
+    def test_offsets_point_at_line_starts(self, tmp_path: Path) -> None:
+        """Test that each offset is the start of a line, ending at EOF."""
+        data_file = tmp_path / "words.txt"
+        data_file.write_bytes(b"a\nbb\nccc\n")
+
+        index = build_line_index(data_file)
+
+        assert len(index) == 3
+        assert list(index.offsets) == [0, 2, 5, 9]
+
+    def test_final_line_without_newline(self, tmp_path: Path) -> None:
+        """Test that a trailing line without a newline is indexed."""
+        data_file = tmp_path / "words.txt"
+        data_file.write_bytes(b"a\nbb")
+
+        index = build_line_index(data_file)
+
+        assert len(index) == 2
+        assert read_lines(data_file, 1, 5) == ["bb"]
+
+    def test_skip_blank_lines(self, tmp_path: Path) -> None:
+        """Test that an index skipping blank lines numbers only the others."""
+        data_file = tmp_path / "words.txt"
+        data_file.write_bytes(b"a\n\nbb\n \nccc\n\n")
+
+        index = get_line_index(data_file, skip_blank=True)
+
+        assert len(index) == 3
+        assert list(index.offsets) == [0, 3, 8, 13]
+        assert sidecar_path(data_file, skip_blank=True).exists()
+        assert len(get_line_index(data_file)) == 6
+
+    def test_sidecar_is_persisted(self, tmp_path: Path) -> None:
+        """Test that the index is written next to the data file and reloaded."""
+        data_file = tmp_path / "words.txt"
+        data_file.write_text("apple\nbanana\ncherry\n")
+
+        get_line_index(data_file)
+        loaded = load_line_index(data_file)
+
+        assert sidecar_path(data_file).exists()
+        assert loaded is not None
+        assert list(loaded.offsets) == [0, 6, 13, 20]
+
+    def test_rebuilt_when_file_changes(self, tmp_path: Path) -> None:
+        """Test that a stale sidecar is ignored and the index rebuilt."""
+        data_file = tmp_path / "words.txt"
+        data_file.write_text("apple\nbanana\n")
+        get_line_index(data_file)
+
+        data_file.write_text("apple\nbanana\ncherry\ndate\n")
+        stat = data_file.stat()
+        os.utime(data_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+
+        assert load_line_index(data_file) is None
+        assert read_lines(data_file, 2, 2) == ["cherry", "date"]
+        assert len(get_line_index(data_file)) == 4
+
+    def test_read_past_end(self, tmp_path: Path) -> None:
+        """Test that reading beyond the last line returns nothing."""
+        data_file = tmp_path / "words.txt"
+        data_file.write_text("apple\n")
+
+        assert read_lines(data_file, 5, 3) == []
@@ -0,0 +1,61 @@
+"""Unit tests for the data file reader backends."""
+
+import os
+from pathlib import Path
+
+import pytest
+
+from temporal_batch import activities
+from temporal_batch.readers import BACKENDS, MMAP_BACKEND, get_mapped_file, read_lines
+
+
+class TestReaders:
+    """Test that every backend returns the same batches."""
+
+    @pytest.mark.parametrize("backend", BACKENDS)
+    def test_read_slice(self, backend: str, test_words_file: Path) -> None:
+        """Test reading a slice from the middle of the file."""
+        result = read_lines(test_words_file, 1, 3, backend)
+
+        assert result == ['banana', 'cherry', 'date']
+
+    @pytest.mark.parametrize("backend", BACKENDS)
+    def test_empty_file(self, backend: str, tmp_path: Path) -> None:
+        """Test reading from an empty file."""
+        data_file = tmp_path / "empty.txt"
+        data_file.write_text("")
+
+        assert read_lines(data_file, 0, 10, backend) == []
+
+    def test_unknown_backend(self, test_words_file: Path) -> None:
+        """Test that an unknown backend name is rejected."""
+        with pytest.raises(ValueError):
+            read_lines(test_words_file, 0, 1, "carrier-pigeon")
+
+    def test_mapping_is_shared(self, test_words_file: Path) -> None:
+        """Test that repeated reads reuse the same mapping."""
+        assert get_mapped_file(test_words_file) is get_mapped_file(test_words_file)
+
+    def test_mapping_refreshed_when_file_changes(self, tmp_path: Path) -> None:
+        """Test that a changed file is remapped."""
+        data_file = tmp_path / "words.txt"
+        data_file.write_text("apple\n")
+        first = get_mapped_file(data_file)
+
+        data_file.write_text("apple\nbanana\n")
+        stat = data_file.stat()
+        os.utime(data_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+
+        assert get_mapped_file(data_file) is not first
+        assert read_lines(data_file, 1, 1, MMAP_BACKEND) == ['banana']
+
+    @pytest.mark.asyncio
+    async def test_create_single_batch_with_mmap(
+        self, monkeypatch: pytest.MonkeyPatch, mock_words_file: Path
+    ) -> None:
+        """Test that create_single_batch honours the selected backend."""
+        monkeypatch.setattr(activities, 'READER_BACKEND', MMAP_BACKEND)
+
+        result = await activities.create_single_batch(batch_size=2, read_until_line=5, offset=3)
+
+        assert result == ['date', 'elderberry']
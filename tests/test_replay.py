@@ -0,0 +1,43 @@
+"""Replay tests against recorded BatchParentWorkflow histories.
+
+Each history in tests/histories must replay with the current workflow code,
+and no slower per event than its baseline, if it has one, times
+TEMPORAL_BATCH_REPLAY_TOLERANCE (default: 1.5). Record the histories and
+their baseline with scripts/record_histories.py.
+"""
+
+import json
+import os
+from pathlib import Path
+
+import pytest
+
+from scripts.record_histories import (
+    BASELINE_FILE,
+    history_files,
+    load_history,
+    replay_seconds_per_event,
+)
+
+HISTORIES = history_files()
+TOLERANCE = float(os.getenv("TEMPORAL_BATCH_REPLAY_TOLERANCE", "1.5"))
+
+
+@pytest.mark.skipif(not HISTORIES, reason="no recorded histories, see scripts/record_histories.py")
+class TestReplay:
+    """Test that recorded parent histories replay, and replay as fast as they did."""
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("path", HISTORIES, ids=[path.stem for path in HISTORIES])
+    async def test_replay(self, path: Path) -> None:
+        """Test that the history replays deterministically within its time budget."""
+        baseline = json.loads(BASELINE_FILE.read_text()) if BASELINE_FILE.exists() else {}
+
+        seconds = await replay_seconds_per_event(load_history(path))
+
+        if path.name in baseline:
+            allowed = baseline[path.name]["us_per_event"] * TOLERANCE
+            assert seconds * 1e6 <= allowed, (
+                f"{path.name} replayed at {seconds * 1e6:.1f} us/event, "
+                f"more than {allowed:.1f} ({TOLERANCE}x its baseline)"
+            )
@@ -0,0 +1,132 @@
+"""Unit tests for the result sinks."""
+
+import threading
+from pathlib import Path
+from typing import Optional
+
+import pytest
+
+from temporal_batch import sinks
+from temporal_batch.sinks import FramesSink, JsonLinesSink, ResultSink, filesystem_type, open_sink
+
+
+@pytest.fixture(params=["jsonl", "frames"])
+def sink(request: pytest.FixtureRequest, tmp_path: Path) -> ResultSink:
+    """Return a sink of each kind writing to tmp_path."""
+    if request.param == "jsonl":
+        return JsonLinesSink(tmp_path, fsync=False)
+    return FramesSink(tmp_path, fsync=False)
+
+
+class TestResultSinks:
+    """Test that every sink appends each batch exactly once."""
+
+    def test_round_trip(self, sink: ResultSink) -> None:
+        """Test that batches are read back in write order."""
+        sink.write("parent", 0, ["APPLE", "BANANA"])
+        sink.write("parent", 2, ["CHERRY", "line\nbreak"])
+
+        assert list(sink.read("parent")) == [(0, ["APPLE", "BANANA"]), (2, ["CHERRY", "line\nbreak"])]
+
+    def test_duplicate_write_skipped(self, sink: ResultSink) -> None:
+        """Test that a batch written again is not appended twice."""
+        assert sink.write("parent", 0, ["APPLE"])
+        size = sink.path("parent").stat().st_size
+
+        assert not sink.write("parent", 0, ["APPLE"])
+        assert sink.path("parent").stat().st_size == size
+
+    def test_duplicate_seen_by_another_process(self, sink: ResultSink) -> None:
+        """Test that a sink finds batches appended by another sink on the same file."""
+        other = type(sink)(sink.directory, fsync=False)
+        sink.write("parent", 0, ["APPLE"])
+        other.write("parent", 1, ["BANANA"])
+
+        assert not sink.write("parent", 1, ["BANANA"])
+        assert not other.write("parent", 0, ["APPLE"])
+        assert list(sink.read("parent")) == [(0, ["APPLE"]), (1, ["BANANA"])]
+
+    def test_torn_write_truncated(self, sink: ResultSink) -> None:
+        """Test that a batch cut short is dropped and can be written again."""
+        sink.write("parent", 0, ["APPLE"])
+        with open(sink.path("parent"), "ab") as f:
+            f.write(sink.encode(1, ["BANANA", "CHERRY"])[:-3])
+        fresh = type(sink)(sink.directory, fsync=False)
+
+        assert fresh.write("parent", 1, ["BANANA", "CHERRY"])
+        assert list(fresh.read("parent")) == [(0, ["APPLE"]), (1, ["BANANA", "CHERRY"])]
+
+    def test_keys_write_separate_files(self, sink: ResultSink) -> None:
+        """Test that each key has its own file and its own offsets."""
+        sink.write("shard-0", 0, ["APPLE"])
+        sink.write("shard/1", 0, ["BANANA"])
+
+        assert list(sink.read("shard-0")) == [(0, ["APPLE"])]
+        assert list(sink.read("shard/1")) == [(0, ["BANANA"])]
+        assert sink.path("shard/1").parent == sink.directory
+
+    def test_empty_batch_not_written(self, sink: ResultSink) -> None:
+        """Test that an empty batch leaves no file behind."""
+        assert not sink.write("parent", 0, [])
+        assert list(sink.read("parent")) == []
+
+    def test_keys_do_not_wait_for_each_other(self, sink: ResultSink) -> None:
+        """Test that a write to one key goes ahead while another key's write holds its lock."""
+        with sink._key_lock("shard-0"):
+            writer = threading.Thread(target=sink.write, args=("shard-1", 0, ["APPLE"]))
+            writer.start()
+            writer.join(timeout=5)
+
+            assert not writer.is_alive()
+        assert list(sink.read("shard-1")) == [(0, ["APPLE"])]
+
+
+class TestOpenSink:
+    """Test parsing sink specs."""
+
+    def test_default_kind(self, tmp_path: Path) -> None:
+        """Test that a bare directory is a JSON Lines sink that fsyncs."""
+        sink = open_sink(f"{tmp_path}?shared=false")
+
+        assert isinstance(sink, JsonLinesSink)
+        assert sink.directory == tmp_path and sink.fsync
+
+    def test_options(self, tmp_path: Path) -> None:
+        """Test that the kind and options configure the sink."""
+        sink = open_sink(f"frames:{tmp_path}?fsync=false&shared=false")
+
+        assert isinstance(sink, FramesSink)
+        assert not sink.fsync
+
+    @pytest.mark.parametrize("fs_type, shared", [("ext4", False), ("nfs4", True), (None, True)])
+    def test_shared_storage_required(
+        self,
+        monkeypatch: pytest.MonkeyPatch,
+        tmp_path: Path,
+        fs_type: Optional[str],
+        shared: bool,
+    ) -> None:
+        """Test that a directory on a local filesystem is refused unless the spec allows it."""
+        monkeypatch.setattr(sinks, "filesystem_type", lambda path: fs_type)
+        spec = str(tmp_path / (fs_type or "unknown"))
+
+        if shared:
+            assert isinstance(open_sink(spec), JsonLinesSink)
+        else:
+            with pytest.raises(ValueError, match="shared=false"):
+                open_sink(spec)
+        assert isinstance(open_sink(f"{spec}?shared=false"), JsonLinesSink)
+
+    def test_filesystem_type(self, monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
+        """Test that the innermost mount holding a path gives its filesystem."""
+        mounts = tmp_path / "mounts"
+        mounts.write_text(
+            "/dev/sda1 / ext4 rw 0 0\n"
+            "server:/export /mnt/shared\\040data nfs4 rw 0 0\n"
+        )
+        monkeypatch.setattr(sinks, "_MOUNTS", mounts)
+
+        assert filesystem_type(Path("/mnt/shared data/out")) == "nfs4"
+        assert filesystem_type(Path("/mnt/shared")) == "ext4"
+        monkeypatch.setattr(sinks, "_MOUNTS", tmp_path / "missing")
+        assert filesystem_type(Path("/mnt/shared data/out")) is None
@@ -0,0 +1,177 @@
+"""Unit tests for the data sources."""
+
+import csv
+import gzip
+import json
+import sqlite3
+from pathlib import Path
+from typing import List
+
+import pytest
+
+from temporal_batch.sources import (
+    CsvSource,
+    DataSource,
+    GzipTextSource,
+    JsonLinesSource,
+    SqliteSource,
+    TextFileSource,
+    open_source,
+    write_gzip_lines,
+)
+
+WORDS = [f"word{i}" for i in range(25)]
+
+
+def read_all(source: DataSource, batch_size: int) -> List[List[str]]:
+    """Read a source to the end in batches, resuming from each returned cursor."""
+    batches: List[List[str]] = []
+    cursor = source.seek(0)
+    while True:
+        records, cursor = source.read(cursor, batch_size)
+        if not records:
+            return batches
+        batches.append(records)
+
+
+@pytest.fixture(params=["text", "gzip", "gzip-single-member", "csv", "jsonl", "sqlite"])
+def source(request: pytest.FixtureRequest, tmp_path: Path) -> DataSource:
+    """Write WORDS in each format and return a source reading it."""
+    kind = request.param
+    if kind == "text":
+        path = tmp_path / "words.txt"
+        path.write_text("".join(f"{word}\n" for word in WORDS))
+        return TextFileSource(path)
+    if kind == "gzip":
+        path = tmp_path / "words.txt.gz"
+        write_gzip_lines(path, WORDS, member_lines=4)
+        return GzipTextSource(path)
+    if kind == "gzip-single-member":
+        path = tmp_path / "words.txt.gz"
+        path.write_bytes(gzip.compress("".join(f"{word}\n" for word in WORDS).encode()))
+        return GzipTextSource(path)
+    if kind == "csv":
+        path = tmp_path / "words.csv"
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["id", "word"])
+            writer.writerows(enumerate(WORDS))
+        return CsvSource(path, "word")
+    if kind == "jsonl":
+        path = tmp_path / "words.jsonl"
+        path.write_text("".join(json.dumps({"word": word}) + "\n" for word in WORDS))
+        return JsonLinesSource(path, "word")
+    path = tmp_path / "words.db"
+    with sqlite3.connect(path) as db:
+        db.execute("CREATE TABLE words (id INTEGER PRIMARY KEY, word TEXT)")
+        # Sparse keys, so keyset pagination can't be mistaken for row numbers
+        db.executemany("INSERT INTO words VALUES (?, ?)", [(i * 3, w) for i, w in enumerate(WORDS)])
+    return SqliteSource(path, "words", "word", "id")
+
+
+class TestDataSources:
+    """Test that every source reads the same records through cursors."""
+
+    def test_read_with_cursors(self, source: DataSource) -> None:
+        """Test that following the cursors reads every record once, in order."""
+        batches = read_all(source, 10)
+
+        assert batches == [WORDS[0:10], WORDS[10:20], WORDS[20:25]]
+
+    @pytest.mark.parametrize("offset", [0, 1, 4, 9, 24, 25, 40])
+    def test_seek(self, source: DataSource, offset: int) -> None:
+        """Test that seeking to an offset reads from that record."""
+        records, _ = source.read(source.seek(offset), 3)
+
+        assert records == WORDS[offset : offset + 3]
+
+    def test_cursor_at_end(self, source: DataSource) -> None:
+        """Test that reading from the end returns nothing and keeps the cursor."""
+        _, cursor = source.read(source.seek(0), len(WORDS))
+
+        assert source.read(cursor, 5) == ([], cursor)
+
+
+class TestGzipTextSource:
+    """Test gzip specifics."""
+
+    def test_cursor_stays_in_member(self, tmp_path: Path) -> None:
+        """Test that a cursor points into the member holding the next line."""
+        path = tmp_path / "words.txt.gz"
+        write_gzip_lines(path, WORDS, member_lines=10)
+        first_member = len(gzip.compress("".join(f"{word}\n" for word in WORDS[:10]).encode()))
+
+        _, cursor = GzipTextSource(path).read("0:0", 12)
+
+        assert cursor == f"{first_member}:14"  # Past "word10\nword11\n"
+
+    def test_last_line_without_newline(self, tmp_path: Path) -> None:
+        """Test that a final line without a newline is read."""
+        path = tmp_path / "words.txt.gz"
+        path.write_bytes(gzip.compress(b"apple\nbanana"))
+
+        assert read_all(GzipTextSource(path), 10) == [["apple", "banana"]]
+
+
+class TestCsvSource:
+    """Test CSV specifics."""
+
+    def test_quoted_newline(self, tmp_path: Path) -> None:
+        """Test that a quoted field spanning lines is one record."""
+        path = tmp_path / "words.csv"
+        path.write_text('apple\n"two\nlines"\ncherry\n')
+        source = CsvSource(path)
+
+        assert read_all(source, 10) == [["apple", "two\nlines", "cherry"]]
+        assert source.read(source.seek(2), 1)[0] == ["cherry"]
+
+    def test_unknown_column(self, tmp_path: Path) -> None:
+        """Test that a column missing from the header is reported."""
+        path = tmp_path / "words.csv"
+        path.write_text("id,word\n1,apple\n")
+
+        with pytest.raises(ValueError, match="not in the header"):
+            CsvSource(path, "name").read("0", 1)
+
+
+class TestJsonLinesSource:
+    """Test JSON Lines specifics."""
+
+    def test_blank_lines(self, tmp_path: Path) -> None:
+        """Test that blank lines are skipped and not counted, as blank CSV rows are."""
+        jsonl_path = tmp_path / "words.jsonl"
+        jsonl_path.write_text('"apple"\n\n"banana"\n  \n"cherry"\n\n')
+        csv_path = tmp_path / "words.csv"
+        csv_path.write_text("apple\n\nbanana\n\ncherry\n\n")
+
+        for source in (JsonLinesSource(jsonl_path), CsvSource(csv_path)):
+            assert read_all(source, 2) == [["apple", "banana"], ["cherry"]]
+            assert source.read(source.seek(2), 5)[0] == ["cherry"]
+            assert source.read(source.seek(3), 5)[0] == []
+
+
+class TestOpenSource:
+    """Test parsing source specs."""
+
+    def test_kind_from_suffix(self, tmp_path: Path) -> None:
+        """Test that the kind is taken from the file suffix."""
+        assert isinstance(open_source(str(tmp_path / "a.txt")), TextFileSource)
+        assert isinstance(open_source(str(tmp_path / "a.txt.gz")), GzipTextSource)
+        assert isinstance(open_source(str(tmp_path / "a.jsonl")), JsonLinesSource)
+
+    def test_options(self, tmp_path: Path) -> None:
+        """Test that options configure the source."""
+        source = open_source(f"csv:{tmp_path / 'a.data'}?column=2&header=yes")
+
+        assert isinstance(source, CsvSource)
+        assert (source.column, source.header) == (2, True)
+
+    def test_sqlite_needs_table(self, tmp_path: Path) -> None:
+        """Test that a SQLite source without a table is rejected."""
+        with pytest.raises(ValueError, match="table and column"):
+            open_source(f"{tmp_path / 'a.db'}?column=word")
+
+    def test_sqlite_rejects_bad_identifier(self, tmp_path: Path) -> None:
+        """Test that identifiers are validated before they reach SQL."""
+        with pytest.raises(ValueError, match="Invalid SQLite identifier"):
+            SqliteSource(tmp_path / "a.db", 'words"; DROP TABLE words; --', "word")
@@ -0,0 +1,87 @@
+"""Unit tests for the adaptive concurrency window."""
+
+import pytest
+
+from temporal_batch.window import AdaptiveWindow
+
+
+class TestAdaptiveWindow:
+    """Test the AIMD window controller."""
+
+    def test_fixed_when_bounds_equal(self) -> None:
+        """Test that equal bounds keep the window constant."""
+        window = AdaptiveWindow(4, 4)
+        for _ in range(10):
+            window.on_success(1.0)
+        window.on_failure()
+
+        assert window.limit == 4
+
+    def test_slow_start_doubles_each_round(self) -> None:
+        """Test that each success adds a slot before the first decrease."""
+        window = AdaptiveWindow(1, 32)
+        for _ in range(7):
+            window.on_success(1.0)
+
+        assert window.limit == 8
+
+    def test_failure_halves_window(self) -> None:
+        """Test multiplicative decrease on failure."""
+        window = AdaptiveWindow(1, 32, size=16)
+        window.on_failure()
+
+        assert window.limit == 8
+
+    def test_one_decrease_per_round(self) -> None:
+        """Test that failures from the same round only shrink the window once."""
+        window = AdaptiveWindow(1, 32, size=16)
+        window.on_failure()
+        window.on_failure()
+        window.on_failure()
+
+        assert window.limit == 8
+
+    def test_additive_increase_after_decrease(self) -> None:
+        """Test that after a decrease the window grows one slot per round."""
+        window = AdaptiveWindow(1, 32, size=8)
+        window.on_failure()
+        for _ in range(5):
+            window.on_success(1.0)
+
+        assert window.limit == 5
+
+    def test_slow_batches_shrink_window(self) -> None:
+        """Test that completions over the latency target count as congestion."""
+        window = AdaptiveWindow(2, 32, size=16, latency_target=5.0)
+        window.on_success(10.0)
+
+        assert window.limit == 8
+
+    def test_never_below_minimum(self) -> None:
+        """Test that the window is clamped to its minimum."""
+        window = AdaptiveWindow(3, 32, size=4)
+        window.on_failure()
+
+        assert window.limit == 3
+
+    def test_invalid_bounds(self) -> None:
+        """Test that inverted bounds are rejected."""
+        with pytest.raises(ValueError):
+            AdaptiveWindow(8, 4)
+
+    def test_set_bounds_clamps_size(self) -> None:
+        """Test that moving the bounds pulls the current size inside them."""
+        window = AdaptiveWindow(1, 32, size=16)
+        window.set_bounds(2, 6)
+
+        assert window.limit == 6
+        window.set_bounds(10, 20)
+        assert window.limit == 10
+
+    def test_set_bounds_invalid(self) -> None:
+        """Test that inverted bounds are rejected and the window is left unchanged."""
+        window = AdaptiveWindow(1, 32, size=16)
+        with pytest.raises(ValueError):
+            window.set_bounds(8, 4)
+
+        assert (window.min_size, window.max_size, window.limit) == (1, 32, 16)
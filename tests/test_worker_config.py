@@ -0,0 +1,121 @@
+"""Unit tests for the worker settings."""
+
+from pathlib import Path
+
+import pytest
+from temporalio.worker import PollerBehaviorAutoscaling, PollerBehaviorSimpleMaximum, WorkerTuner
+
+from temporal_batch.worker_config import TUNER_RESOURCE, WorkerConfig, load_worker_config
+
+
+class TestLoadWorkerConfig:
+    """Test merging settings from the file, the environment and flags."""
+
+    def test_defaults(self) -> None:
+        """Test that without any source the task queue rate limit is kept at 150."""
+        config = load_worker_config()
+
+        assert config == WorkerConfig()
+        assert config.worker_options() == {"max_task_queue_activities_per_second": 150.0}
+
+    def test_precedence(self, tmp_path: Path) -> None:
+        """Test that the environment overrides the file and flags override both."""
+        path = tmp_path / "worker.toml"
+        path.write_text(
+            "max_concurrent_activities = 20\nmax_cached_workflows = 100\nworkflow_task_pollers = 2\n"
+        )
+        environ = {
+            "TEMPORAL_BATCH_WORKER_MAX_CACHED_WORKFLOWS": "200",
+            "TEMPORAL_BATCH_WORKER_WORKFLOW_TASK_POLLERS": "4",
+            "PATH": "/usr/bin",
+        }
+
+        config = load_worker_config(path, environ, {"workflow_task_pollers": 8, "tuner": None})
+
+        assert (config.max_concurrent_activities, config.max_cached_workflows) == (20, 200)
+        assert config.workflow_task_pollers == 8
+
+    def test_environment_types(self) -> None:
+        """Test that environment values are converted to each setting's type."""
+        config = load_worker_config(
+            environ={
+                "TEMPORAL_BATCH_WORKER_MAX_TASK_QUEUE_ACTIVITIES_PER_SECOND": "0",
+                "TEMPORAL_BATCH_WORKER_AUTOSCALE_POLLERS": "true",
+                "TEMPORAL_BATCH_WORKER_TUNER": "resource",
+            }
+        )
+
+        assert config.max_task_queue_activities_per_second == 0.0
+        assert config.autoscale_pollers
+        assert config.tuner == TUNER_RESOURCE
+
+    def test_unknown_setting(self, tmp_path: Path) -> None:
+        """Test that a misspelled setting is reported with where it came from."""
+        path = tmp_path / "worker.toml"
+        path.write_text("max_concurent_activities = 20\n")
+
+        with pytest.raises(ValueError, match="max_concurent_activities.*worker.toml"):
+            load_worker_config(path)
+
+    @pytest.mark.parametrize(
+        "values",
+        [
+            {"TEMPORAL_BATCH_WORKER_MAX_CONCURRENT_ACTIVITIES": "many"},
+            {"TEMPORAL_BATCH_WORKER_MAX_CONCURRENT_ACTIVITIES": "0"},
+            {"TEMPORAL_BATCH_WORKER_TARGET_CPU_USAGE": "1.5"},
+            {"TEMPORAL_BATCH_WORKER_TUNER": "magic"},
+        ],
+    )
+    def test_invalid_value(self, values: dict[str, str]) -> None:
+        """Test that values of the wrong type or out of range are rejected."""
+        with pytest.raises(ValueError):
+            load_worker_config(environ=values)
+
+
+class TestWorkerOptions:
+    """Test turning settings into Worker arguments."""
+
+    def test_fixed_slots_and_pollers(self) -> None:
+        """Test that fixed limits and poller counts are passed through."""
+        options = WorkerConfig(
+            max_task_queue_activities_per_second=0,
+            max_concurrent_activities=50,
+            activity_task_pollers=10,
+        ).worker_options()
+
+        assert options == {
+            "max_task_queue_activities_per_second": None,
+            "max_concurrent_activities": 50,
+            "activity_task_poller_behavior": PollerBehaviorSimpleMaximum(10),
+        }
+
+    def test_autoscaled_pollers(self) -> None:
+        """Test that autoscaling starts no more pollers than the maximum allows."""
+        options = WorkerConfig(autoscale_pollers=True, workflow_task_pollers=3).worker_options()
+
+        assert options["workflow_task_poller_behavior"] == PollerBehaviorAutoscaling(
+            maximum=3, initial=3
+        )
+        assert options["activity_task_poller_behavior"] == PollerBehaviorAutoscaling()
+
+    def test_resource_tuner(self) -> None:
+        """Test that the resource tuner replaces fixed slot limits."""
+        options = WorkerConfig(
+            tuner=TUNER_RESOURCE, max_concurrent_activities=50, target_cpu_usage=0.6
+        ).worker_options()
+
+        assert isinstance(options["tuner"], WorkerTuner)
+        assert "max_concurrent_activities" not in options
+
+    @pytest.mark.parametrize(
+        "config, slots",
+        [
+            (WorkerConfig(), 100),
+            (WorkerConfig(max_concurrent_activities=20), 20),
+            (WorkerConfig(tuner=TUNER_RESOURCE), 500),
+            (WorkerConfig(tuner=TUNER_RESOURCE, max_concurrent_activities=50), 50),
+        ],
+    )
+    def test_activity_slots(self, config: WorkerConfig, slots: int) -> None:
+        """Test that the activity slots follow the SDK's defaults when unset."""
+        assert config.activity_slots() == slots
@@ -1,20 +1,50 @@
 """Unit tests for temporal batch processing workflows."""
 
+import asyncio
 import uuid
-from typing import cast
+from typing import Optional, cast
 
 import pytest
 from temporalio import activity
+from temporalio.client import WorkflowExecutionStatus, WorkflowFailureError
+from temporalio.exceptions import ApplicationError
 from temporalio.testing import WorkflowEnvironment
 from temporalio.worker import Worker
 
-from temporal_batch.shared import BatchParentWorkflowParams
-from temporal_batch.workflows import BatchChildWorkflow, BatchParentWorkflow
+from temporal_batch.shared import (
+    PROCESSING_MODE_BATCH,
+    PROCESSING_MODE_CPU,
+    SHARD_COMPLETED,
+    BatchChildWorkflowParams,
+    BatchParentWorkflowParams,
+    InFlightBatch,
+    RecordPoolWorkflowParams,
+    ResizeRequest,
+    ShardedBatchWorkflowParams,
+    SourceBatches,
+)
+from temporal_batch.legacy_workflows import LegacyBatchChildWorkflow, LegacyBatchParentWorkflow
+from temporal_batch.workflows import (
+    BatchChildWorkflow,
+    BatchParentWorkflow,
+    RecordPoolWorkflow,
+    ShardedBatchWorkflow,
+)
 
 # Use a consistent task queue for all workflow tests
 TEST_TASK_QUEUE = "workflow-test-queue"
 
 
+def word_batches(batch_size: int, read_until_line: int, offset: int, num_batches: int) -> SourceBatches:
+    """Return what read_batches reads from a source of word0, word1, ..., with offsets as cursors."""
+    end = min(offset + batch_size * num_batches, read_until_line)
+    starts = range(offset, end, batch_size)
+    return SourceBatches(
+        [[f"word{i}" for i in range(start, min(start + batch_size, end))] for start in starts],
+        [str(min(start + batch_size, end)) for start in starts],
+    )
+
+
 class TestBatchChildWorkflow:
     """Test the BatchChildWorkflow."""
 
@@ -76,6 +106,236 @@ class TestBatchChildWorkflow:
                 assert result is None  # Workflow doesn't return a value
                 assert activity_executions == 0  # No records to process
 
+    @pytest.mark.asyncio
+    async def test_batch_child_workflow_batch_mode(self) -> None:
+        """Test that batch mode runs a single activity for the whole batch."""
+        test_batch: list[str] = ['apple', 'banana', 'cherry']
+        batches: list[list[str]] = []
+        
+        @activity.defn(name="process_batch")
+        async def mock_process_batch(records: list[str]) -> list[str]:
+            batches.append(records)
+            return [record.upper() for record in records]
+        
+        async with await WorkflowEnvironment.start_time_skipping() as env:
+            async with Worker(
+                env.client,
+                task_queue=TEST_TASK_QUEUE,
+                workflows=[BatchChildWorkflow],
+                activities=[mock_process_batch]
+            ):
+                await env.client.execute_workflow(
+                    BatchChildWorkflow.run,
+                    args=[test_batch, BatchChildWorkflowParams(PROCESSING_MODE_BATCH)],
+                    id=str(uuid.uuid4()),
+                    task_queue=TEST_TASK_QUEUE
+                )
+                
+                assert batches == [test_batch]  # One activity for the whole batch
+
+    @pytest.mark.asyncio
+    async def test_batch_child_workflow_cpu_mode_chunks(self) -> None:
+        """Test that cpu mode runs one transform_records activity per chunk."""
+        test_batch: list[str] = [f"word{i}" for i in range(7)]
+        chunks: list[list[str]] = []
+        
+        @activity.defn(name="transform_records")
+        async def mock_transform_records(records: list[str]) -> list[str]:
+            chunks.append(records)
+            return [record.upper() for record in records]
+        
+        async with await WorkflowEnvironment.start_time_skipping() as env:
+            async with Worker(
+                env.client,
+                task_queue=TEST_TASK_QUEUE,
+                workflows=[BatchChildWorkflow],
+                activities=[mock_transform_records]
+            ):
+                await env.client.execute_workflow(
+                    BatchChildWorkflow.run,
+                    args=[test_batch, BatchChildWorkflowParams(PROCESSING_MODE_CPU, chunk_size=3)],
+                    id=str(uuid.uuid4()),
+                    task_queue=TEST_TASK_QUEUE
+                )
+                
+                assert sorted(len(chunk) for chunk in chunks) == [1, 3, 3]
+                assert sorted(sum(chunks, [])) == sorted(test_batch)
+
+    @pytest.mark.asyncio
+    async def test_batch_child_workflow_reads_own_range(self) -> None:
+        """Test that a child given an (offset, count) range reads its own batch."""
+        reads: list[tuple[int, int, int]] = []
+        processed: list[str] = []
+        
+        @activity.defn(name="create_single_batch")
+        async def mock_create_batch(batch_size: int, read_until_line: int, offset: int) -> list[str]:
+            reads.append((batch_size, read_until_line, offset))
+            return ['word1', 'word2', 'word3', 'word4'][offset:read_until_line]
+        
+        @activity.defn(name="process_record")
+        async def mock_process_record(record: str) -> str:
+            processed.append(record)
+            return record.upper()
+        
+        async with await WorkflowEnvironment.start_time_skipping() as env:
+            async with Worker(
+                env.client,
+                task_queue=TEST_TASK_QUEUE,
+                workflows=[BatchChildWorkflow],
+                activities=[mock_create_batch, mock_process_record]
+            ):
+                await env.client.execute_workflow(
+                    BatchChildWorkflow.run,
+                    args=[[], BatchChildWorkflowParams(offset=1, count=2)],
+                    id=str(uuid.uuid4()),
+                    task_queue=TEST_TASK_QUEUE
+                )
+                
+                assert reads == [(2, 3, 1)]
+                assert sorted(processed) == ['word2', 'word3']
+
+    @pytest.mark.asyncio
+    async def test_batch_child_workflow_hedges_slow_records(self) -> None:
+        """Test that records in the latency tail get a hedged attempt that can win."""
+        test_batch: list[str] = ['apple', 'banana', 'slow']
+        calls: list[str] = []
+        
+        @activity.defn(name="process_record")
+        async def mock_process_record(record: str) -> str:
+            calls.append(record)
+            if record == 'slow' and calls.count(record) == 1:
+                await asyncio.sleep(30)  # The primary attempt straggles
+            return record.upper()
+        
+        async with await WorkflowEnvironment.start_time_skipping() as env:
+            async with Worker(
+                env.client,
+                task_queue=TEST_TASK_QUEUE,
+                workflows=[BatchChildWorkflow],
+                activities=[mock_process_record]
+            ):
+                handle = await env.client.start_workflow(
+                    BatchChildWorkflow.run,
+                    args=[test_batch, BatchChildWorkflowParams(hedge_percentile=0.5)],
+                    id=str(uuid.uuid4()),
+                    task_queue=TEST_TASK_QUEUE
+                )
+                await handle.result()
+                stats = await handle.query(BatchChildWorkflow.hedge_stats)
+                
+                assert calls.count('slow') == 2  # Primary plus one hedge
+                assert stats.started == 1
+                assert stats.won == 1
+
+    @pytest.mark.asyncio
+    async def test_batch_child_workflow_hedge_loses(self) -> None:
+        """Test that a hedge the primary beats is cancelled."""
+        test_batch: list[str] = ['apple', 'banana', 'slow']
+        calls: list[str] = []
+        cancelled: list[str] = []
+        
+        @activity.defn(name="process_record")
+        async def mock_process_record(record: str) -> str:
+            calls.append(record)
+            if record == 'slow':
+                # The primary finishes soon after the hedge starts; the hedge
+                # heartbeats so that its cancellation reaches it
+                delay = 5.0 if calls.count(record) == 1 else 60.0
+                try:
+                    for _ in range(int(delay * 10)):
+                        activity.heartbeat()
+                        await asyncio.sleep(0.1)
+                except asyncio.CancelledError:
+                    cancelled.append(record)
+                    raise
+            return record.upper()
+        
+        async with await WorkflowEnvironment.start_time_skipping() as env:
+            async with Worker(
+                env.client,
+                task_queue=TEST_TASK_QUEUE,
+                workflows=[BatchChildWorkflow],
+                activities=[mock_process_record]
+            ):
+                handle = await env.client.start_workflow(
+                    BatchChildWorkflow.run,
+                    args=[test_batch, BatchChildWorkflowParams(hedge_percentile=0.5)],
+                    id=str(uuid.uuid4()),
+                    task_queue=TEST_TASK_QUEUE
+                )
+                await handle.result()
+                stats = await handle.query(BatchChildWorkflow.hedge_stats)
+                
+                assert calls.count('slow') == 2
+                assert cancelled == ['slow']  # The losing hedge
+                assert stats.started == 1
+                assert stats.won == 0
+
+    @pytest.mark.asyncio
+    async def test_batch_child_workflow_local_records_fall_back(self) -> None:
+        """Test that records run as local activities and slow ones are retried as regular ones."""
+        test_batch: list[str] = ['apple', 'banana', 'slow']
+        calls: list[tuple[str, bool]] = []
+        
+        @activity.defn(name="process_record")
+        async def mock_process_record(record: str) -> str:
+            is_local = activity.info().is_local
+            calls.append((record, is_local))
+            if record == 'slow' and is_local:
+                await asyncio.sleep(5)  # Longer than the local timeout
+            return record.upper()
+        
+        async with await WorkflowEnvironment.start_time_skipping() as env:
+            async with Worker(
+                env.client,
+                task_queue=TEST_TASK_QUEUE,
+                workflows=[BatchChildWorkflow],
+                activities=[mock_process_record]
+            ):
+                await env.client.execute_workflow(
+                    BatchChildWorkflow.run,
+                    args=[test_batch, BatchChildWorkflowParams(local_record_timeout=0.5)],
+                    id=str(uuid.uuid4()),
+                    task_queue=TEST_TASK_QUEUE
+                )
+                
+                assert sorted(calls) == [
+                    ('apple', True), ('banana', True), ('slow', False), ('slow', True)
+                ]
+
+
+    @pytest.mark.asyncio
+    async def test_batch_child_workflow_writes_results(self) -> None:
+        """Test that the child writes its results to the sink in one call keyed by its offset."""
+        test_batch: list[str] = ['apple', 'banana', 'cherry']
+        writes: list[tuple[str, str, int, list[str]]] = []
+        
+        @activity.defn(name="process_record")
+        async def mock_process_record(record: str) -> str:
+            return record.upper()
+        
+        @activity.defn(name="write_results")
+        async def mock_write_results(sink: str, key: str, offset: int, results: list[str]) -> bool:
+            writes.append((sink, key, offset, results))
+            return True
+        
+        async with await WorkflowEnvironment.start_time_skipping() as env:
+            async with Worker(
+                env.client,
+                task_queue=TEST_TASK_QUEUE,
+                workflows=[BatchChildWorkflow],
+                activities=[mock_process_record, mock_write_results]
+            ):
+                workflow_id = str(uuid.uuid4())
+                await env.client.execute_workflow(
+                    BatchChildWorkflow.run,
+                    args=[test_batch, BatchChildWorkflowParams(sink="out", batch_offset=150)],
+                    id=workflow_id,
+                    task_queue=TEST_TASK_QUEUE
+                )
+                
+                # Without a parent the child's own ID names the file
+                assert writes == [("out", workflow_id, 150, ['APPLE', 'BANANA', 'CHERRY'])]
 
 class TestBatchParentWorkflow:
     """Test the BatchParentWorkflow."""
@@ -87,16 +347,13 @@ class TestBatchParentWorkflow:
         batch_activity_executions = 0
         process_activity_executions = 0
         
-        @activity.defn(name="create_single_batch")
-        async def mock_create_batch(batch_size: int, read_until_line: int, offset: int) -> list[str]:
+        @activity.defn(name="read_batches")
+        async def mock_create_batch(
+            batch_size: int, read_until_line: int, offset: int, num_batches: int, cursor: Optional[str]
+        ) -> SourceBatches:
             nonlocal batch_activity_executions
             batch_activity_executions += 1
-            if offset >= read_until_line:
-                return []
-            available_words = ['word1', 'word2', 'word3']
-            start_idx = min(offset, len(available_words))
-            end_idx = min(offset + batch_size, min(read_until_line, len(available_words)))
-            return available_words[start_idx:end_idx]
+            return word_batches(batch_size, read_until_line, offset, num_batches)
         
         @activity.defn(name="process_record")
         async def mock_process_record(record: str) -> str:
@@ -129,11 +386,13 @@ class TestBatchParentWorkflow:
         batch_activity_executions = 0
         process_activity_executions = 0
         
-        @activity.defn(name="create_single_batch")
-        async def mock_create_empty_batch(batch_size: int, read_until_line: int, offset: int) -> list[str]:
+        @activity.defn(name="read_batches")
+        async def mock_create_empty_batch(
+            batch_size: int, read_until_line: int, offset: int, num_batches: int, cursor: Optional[str]
+        ) -> SourceBatches:
             nonlocal batch_activity_executions
             batch_activity_executions += 1
-            return []  # No words to process
+            return SourceBatches()  # No words to process
         
         @activity.defn(name="process_record")
         async def mock_process_record(record: str) -> str:
@@ -157,4 +416,602 @@ class TestBatchParentWorkflow:
                 
                 assert result is None  # Workflow completes successfully
                 assert batch_activity_executions == 1  # One batch activity call
-                assert process_activity_executions == 0  # No records to process
\ No newline at end of file
+                assert process_activity_executions == 0  # No records to process
+
+    @pytest.mark.asyncio
+    async def test_batch_parent_workflow_read_in_child(self) -> None:
+        """Test that the parent hands out ranges and never reads words itself."""
+        params = BatchParentWorkflowParams(num_words=120, offset=0, read_in_child=True)
+        reads: list[tuple[int, int, int]] = []
+        
+        @activity.defn(name="create_single_batch")
+        async def mock_create_batch(batch_size: int, read_until_line: int, offset: int) -> list[str]:
+            reads.append((batch_size, read_until_line, offset))
+            return [f"word{i}" for i in range(offset, read_until_line)]
+        
+        @activity.defn(name="process_record")
+        async def mock_process_record(record: str) -> str:
+            return record.upper()
+        
+        async with await WorkflowEnvironment.start_time_skipping() as env:
+            async with Worker(
+                env.client,
+                task_queue=TEST_TASK_QUEUE,
+                workflows=[BatchParentWorkflow, BatchChildWorkflow],
+                activities=[mock_create_batch, mock_process_record]
+            ):
+                await env.client.execute_workflow(
+                    BatchParentWorkflow.run,
+                    params,
+                    id=str(uuid.uuid4()),
+                    task_queue=TEST_TASK_QUEUE
+                )
+                
+                # Each child read exactly its own range
+                assert sorted(reads) == [(20, 120, 100), (50, 50, 0), (50, 100, 50)]
+
+    @pytest.mark.asyncio
+    async def test_batch_parent_workflow_read_in_child_stops_at_end(self) -> None:
+        """Test that a child's short read stops new batches and only records read are counted."""
+        params = BatchParentWorkflowParams(num_words=1000, offset=0, read_in_child=True)
+        offsets: list[int] = []
+        
+        @activity.defn(name="create_single_batch")
+        async def mock_create_batch(batch_size: int, read_until_line: int, offset: int) -> list[str]:
+            # The source only holds 120 records
+            offsets.append(offset)
+            return [f"word{i}" for i in range(offset, min(read_until_line, 120))]
+        
+        @activity.defn(name="process_record")
+        async def mock_process_record(record: str) -> str:
+            return record.upper()
+        
+        async with await WorkflowEnvironment.start_time_skipping() as env:
+            async with Worker(
+                env.client,
+                task_queue=TEST_TASK_QUEUE,
+                workflows=[BatchParentWorkflow, BatchChildWorkflow],
+                activities=[mock_create_batch, mock_process_record]
+            ):
+                handle = await env.client.start_workflow(
+                    BatchParentWorkflow.run,
+                    params,
+                    id=str(uuid.uuid4()),
+                    task_queue=TEST_TASK_QUEUE
+                )
+                await handle.result()
+                progress = await handle.query(BatchParentWorkflow.progress)
+                
+                # Only children already in the window when the end was found start past it
+                assert len(offsets) < 1000 // 50
+                assert progress.completed_records == 120
+
+    @pytest.mark.asyncio
+    async def test_batch_parent_workflow_continues_as_new_without_draining(self) -> None:
+        """Test that a small history cap forces continue-as-new and no batch is lost or repeated."""
+        params = BatchParentWorkflowParams(num_words=1000, offset=0, max_history_length=60)
+        processed: list[str] = []
+        
+        @activity.defn(name="read_batches")
+        async def mock_read_batches(
+            batch_size: int, read_until_line: int, offset: int, num_batches: int, cursor: Optional[str]
+        ) -> SourceBatches:
+            return word_batches(batch_size, read_until_line, offset, num_batches)
+        
+        @activity.defn(name="process_record")
+        async def mock_process_record(record: str) -> str:
+            processed.append(record)
+            return record.upper()
+        
+        async with await WorkflowEnvironment.start_time_skipping() as env:
+            async with Worker(
+                env.client,
+                task_queue=TEST_TASK_QUEUE,
+                workflows=[BatchParentWorkflow, BatchChildWorkflow],
+                activities=[mock_read_batches, mock_process_record]
+            ):
+                handle = await env.client.start_workflow(
+                    BatchParentWorkflow.run,
+                    params,
+                    id=str(uuid.uuid4()),
+                    task_queue=TEST_TASK_QUEUE
+                )
+                await handle.result()
+                latest = await env.client.get_workflow_handle(handle.id).describe()
+                
+                assert latest.run_id != handle.first_execution_run_id  # Continued as new
+                assert sorted(processed) == sorted(f"word{i}" for i in range(1000))
+
+    @pytest.mark.asyncio
+    async def test_batch_parent_workflow_retries_failed_batch(self) -> None:
+        """Test that a failed child batch is started again instead of failing the parent."""
+        params = BatchParentWorkflowParams(num_words=100, offset=0, min_window_size=1, max_window_size=8)
+        failed: set[str] = set()
+        processed: set[str] = set()
+        retried: list[int] = []
+        
+        @activity.defn(name="read_batches")
+        async def mock_read_batches(
+            batch_size: int, read_until_line: int, offset: int, num_batches: int, cursor: Optional[str]
+        ) -> SourceBatches:
+            return word_batches(batch_size, read_until_line, offset, num_batches)
+        
+        @activity.defn(name="create_single_batch")
+        async def mock_create_batch(batch_size: int, read_until_line: int, offset: int) -> list[str]:
+            retried.append(offset)
+            return [f"word{i}" for i in range(offset, min(offset + batch_size, read_until_line))]
+        
+        @activity.defn(name="process_record")
+        async def mock_process_record(record: str) -> str:
+            if record == "word60" and record not in failed:
+                failed.add(record)
+                raise ApplicationError("transient", non_retryable=True)
+            processed.add(record)
+            return record.upper()
+        
+        async with await WorkflowEnvironment.start_time_skipping() as env:
+            async with Worker(
+                env.client,
+                task_queue=TEST_TASK_QUEUE,
+                workflows=[BatchParentWorkflow, BatchChildWorkflow],
+                activities=[mock_read_batches, mock_create_batch, mock_process_record]
+            ):
+                await env.client.execute_workflow(
+                    BatchParentWorkflow.run,
+                    params,
+                    id=str(uuid.uuid4()),
+                    task_queue=TEST_TASK_QUEUE
+                )
+                
+                assert failed == {"word60"}
+                assert processed == {f"word{i}" for i in range(100)}
+                assert retried == [50]  # Only the retry reads by offset
+
+    @pytest.mark.asyncio
+    async def test_batch_parent_workflow_retries_lost_carried_child(self) -> None:
+        """Test that a child carried over from a previous run that closed unreported is retried."""
+        # The previous run handed over a child that is no longer running, as
+        # if it had been terminated
+        params = BatchParentWorkflowParams(
+            num_words=20,
+            offset=20,
+            batch_size=10,
+            in_flight=[InFlightBatch("lost-batch-10", 10, count=10)],
+        )
+        retried: list[int] = []
+        processed: list[str] = []
+        
+        @activity.defn(name="read_batches")
+        async def mock_read_batches(
+            batch_size: int, read_until_line: int, offset: int, num_batches: int, cursor: Optional[str]
+        ) -> SourceBatches:
+            return word_batches(batch_size, read_until_line, offset, num_batches)
+        
+        @activity.defn(name="create_single_batch")
+        async def mock_create_batch(batch_size: int, read_until_line: int, offset: int) -> list[str]:
+            retried.append(offset)
+            return [f"word{i}" for i in range(offset, min(offset + batch_size, read_until_line))]
+        
+        @activity.defn(name="process_record")
+        async def mock_process_record(record: str) -> str:
+            processed.append(record)
+            return record.upper()
+        
+        async with await WorkflowEnvironment.start_time_skipping() as env:
+            async with Worker(
+                env.client,
+                task_queue=TEST_TASK_QUEUE,
+                workflows=[BatchParentWorkflow, BatchChildWorkflow],
+                activities=[mock_read_batches, mock_create_batch, mock_process_record]
+            ):
+                await env.client.execute_workflow(
+                    BatchParentWorkflow.run,
+                    params,
+                    id=str(uuid.uuid4()),
+                    task_queue=TEST_TASK_QUEUE
+                )
+                
+                assert retried == [10]
+                assert sorted(processed) == sorted(f"word{i}" for i in range(10, 20))
+
+    @pytest.mark.asyncio
+    async def test_batch_parent_workflow_custom_batch_size(self) -> None:
+        """Test that the parent reads and starts children with the requested batch size."""
+        params = BatchParentWorkflowParams(num_words=50, offset=0, batch_size=20)
+        reads: list[tuple[int, int]] = []
+        processed: list[str] = []
+        
+        @activity.defn(name="read_batches")
+        async def mock_create_batch(
+            batch_size: int, read_until_line: int, offset: int, num_batches: int, cursor: Optional[str]
+        ) -> SourceBatches:
+            reads.append((batch_size, offset))
+            return word_batches(batch_size, read_until_line, offset, num_batches)
+        
+        @activity.defn(name="process_record")
+        async def mock_process_record(record: str) -> str:
+            processed.append(record)
+            return record.upper()
+        
+        async with await WorkflowEnvironment.start_time_skipping() as env:
+            async with Worker(
+                env.client,
+                task_queue=TEST_TASK_QUEUE,
+                workflows=[BatchParentWorkflow, BatchChildWorkflow],
+                activities=[mock_create_batch, mock_process_record]
+            ):
+                await env.client.execute_workflow(
+                    BatchParentWorkflow.run,
+                    params,
+                    id=str(uuid.uuid4()),
+                    task_queue=TEST_TASK_QUEUE
+                )
+                
+                assert reads == [(20, 0), (20, 20), (20, 40), (20, 50)]
+                assert sorted(processed) == sorted(f"word{i}" for i in range(50))
+
+    @pytest.mark.asyncio
+    async def test_batch_parent_workflow_prefetches_batches(self) -> None:
+        """Test that prefetching reads several batches per activity call."""
+        params = BatchParentWorkflowParams(num_words=400, offset=0, prefetch_batches=4)
+        reads: list[int] = []
+        processed: list[str] = []
+        
+        @activity.defn(name="read_batches")
+        async def mock_read_batches(
+            batch_size: int, read_until_line: int, offset: int, num_batches: int, cursor: Optional[str]
+        ) -> SourceBatches:
+            reads.append(num_batches)
+            return word_batches(batch_size, read_until_line, offset, num_batches)
+        
+        @activity.defn(name="process_record")
+        async def mock_process_record(record: str) -> str:
+            processed.append(record)
+            return record.upper()
+        
+        async with await WorkflowEnvironment.start_time_skipping() as env:
+            async with Worker(
+                env.client,
+                task_queue=TEST_TASK_QUEUE,
+                workflows=[BatchParentWorkflow, BatchChildWorkflow],
+                activities=[mock_read_batches, mock_process_record]
+            ):
+                await env.client.execute_workflow(
+                    BatchParentWorkflow.run,
+                    params,
+                    id=str(uuid.uuid4()),
+                    task_queue=TEST_TASK_QUEUE
+                )
+                
+                assert sorted(processed) == sorted(f"word{i}" for i in range(400))
+                assert len(reads) < 8  # Fewer reads than the 8 batches
+
+
+    @pytest.mark.asyncio
+    async def test_batch_parent_workflow_pause_resize_resume(self) -> None:
+        """Test that a paused parent starts nothing until resumed, then uses the new batch size."""
+        params = BatchParentWorkflowParams(num_words=100, offset=0)
+        reads: list[tuple[int, int]] = []
+        processed: list[str] = []
+        
+        @activity.defn(name="read_batches")
+        async def mock_read_batches(
+            batch_size: int, read_until_line: int, offset: int, num_batches: int, cursor: Optional[str]
+        ) -> SourceBatches:
+            reads.append((batch_size, offset))
+            return word_batches(batch_size, read_until_line, offset, num_batches)
+        
+        @activity.defn(name="process_record")
+        async def mock_process_record(record: str) -> str:
+            processed.append(record)
+            return record.upper()
+        
+        async with await WorkflowEnvironment.start_time_skipping() as env:
+            async with Worker(
+                env.client,
+                task_queue=TEST_TASK_QUEUE,
+                workflows=[BatchParentWorkflow, BatchChildWorkflow],
+                activities=[mock_read_batches, mock_process_record]
+            ):
+                # Signal-with-start pauses the parent before it dispatches anything
+                handle = await env.client.start_workflow(
+                    BatchParentWorkflow.run,
+                    params,
+                    id=str(uuid.uuid4()),
+                    task_queue=TEST_TASK_QUEUE,
+                    start_signal="pause",
+                )
+                progress = await handle.query(BatchParentWorkflow.progress)
+                assert progress.paused
+                assert (progress.completed_records, progress.offset, progress.in_flight) == (0, 0, 0)
+                assert progress.eta is None
+                
+                await handle.signal(BatchParentWorkflow.resize, ResizeRequest(max_window_size=2, batch_size=30))
+                await handle.signal(BatchParentWorkflow.resume)
+                await handle.result()
+                
+                assert reads == [(30, 0), (30, 30), (30, 60), (30, 90), (30, 100)]
+                assert sorted(processed) == sorted(f"word{i}" for i in range(100))
+                progress = await handle.query(BatchParentWorkflow.progress)
+                assert (progress.completed_records, progress.offset) == (100, 100)
+                assert (progress.batch_size, progress.window_size) == (30, 2)
+
+    @pytest.mark.asyncio
+    async def test_batch_parent_workflow_cancel_cancels_children(self) -> None:
+        """Test that cancelling the parent cancels the children it abandons on close."""
+        params = BatchParentWorkflowParams(num_words=100, offset=0, batch_size=10)
+        children: set[str] = set()
+        release = asyncio.Event()
+        
+        @activity.defn(name="read_batches")
+        async def mock_read_batches(
+            batch_size: int, read_until_line: int, offset: int, num_batches: int, cursor: Optional[str]
+        ) -> SourceBatches:
+            return word_batches(batch_size, read_until_line, offset, num_batches)
+        
+        @activity.defn(name="process_record")
+        async def mock_process_record(record: str) -> str:
+            children.add(activity.info().workflow_id)
+            await release.wait()
+            return record.upper()
+        
+        async with await WorkflowEnvironment.start_time_skipping() as env:
+            async with Worker(
+                env.client,
+                task_queue=TEST_TASK_QUEUE,
+                workflows=[BatchParentWorkflow, BatchChildWorkflow],
+                activities=[mock_read_batches, mock_process_record]
+            ):
+                handle = await env.client.start_workflow(
+                    BatchParentWorkflow.run,
+                    params,
+                    id=str(uuid.uuid4()),
+                    task_queue=TEST_TASK_QUEUE
+                )
+                # Wait for some children to be running
+                while len(children) < 2:
+                    await asyncio.sleep(0.1)
+                await handle.cancel()
+                with pytest.raises(WorkflowFailureError):
+                    await handle.result()
+                
+                for child_id in children:
+                    child = env.client.get_workflow_handle(child_id)
+                    with pytest.raises(WorkflowFailureError):
+                        await child.result()
+                    assert (await child.describe()).status == WorkflowExecutionStatus.CANCELED
+                release.set()
+
+class TestShardedBatchWorkflow:
+    """Test the ShardedBatchWorkflow."""
+
+    @pytest.mark.asyncio
+    async def test_sharded_batch_workflow_processes_every_shard(self) -> None:
+        """Test that each shard's parent processes exactly its own range."""
+        params = ShardedBatchWorkflowParams(num_words=250, num_shards=2, shard_size=100)
+        reads: list[tuple[int, int]] = []
+        processed: list[str] = []
+        
+        @activity.defn(name="read_batches")
+        async def mock_create_batch(
+            batch_size: int, read_until_line: int, offset: int, num_batches: int, cursor: Optional[str]
+        ) -> SourceBatches:
+            reads.append((offset, read_until_line))
+            return word_batches(batch_size, read_until_line, offset, num_batches)
+        
+        @activity.defn(name="process_record")
+        async def mock_process_record(record: str) -> str:
+            processed.append(record)
+            return record.upper()
+        
+        async with await WorkflowEnvironment.start_time_skipping() as env:
+            async with Worker(
+                env.client,
+                task_queue=TEST_TASK_QUEUE,
+                workflows=[ShardedBatchWorkflow, BatchParentWorkflow, BatchChildWorkflow],
+                activities=[mock_create_batch, mock_process_record]
+            ):
+                handle = await env.client.start_workflow(
+                    ShardedBatchWorkflow.run,
+                    params,
+                    id=str(uuid.uuid4()),
+                    task_queue=TEST_TASK_QUEUE
+                )
+                await handle.result()
+                shards = await handle.query(ShardedBatchWorkflow.progress)
+                
+                assert sorted(processed) == sorted(f"word{i}" for i in range(250))
+                assert [(shard.offset, shard.end) for shard in shards] == [(0, 100), (100, 200), (200, 250)]
+                assert all(shard.status == SHARD_COMPLETED for shard in shards)
+                assert [shard.completed_records for shard in shards] == [100, 100, 50]
+                assert {end for _, end in reads} == {100, 200, 250}  # Each parent stops at its shard end
+
+    @pytest.mark.asyncio
+    async def test_sharded_batch_workflow_continues_as_new(self) -> None:
+        """Test that the orchestrator continues as new with shards running and still sees them finish."""
+        params = ShardedBatchWorkflowParams(
+            num_words=500, num_shards=2, shard_size=50, max_history_length=20
+        )
+        processed: list[str] = []
+        
+        @activity.defn(name="read_batches")
+        async def mock_read_batches(
+            batch_size: int, read_until_line: int, offset: int, num_batches: int, cursor: Optional[str]
+        ) -> SourceBatches:
+            return word_batches(batch_size, read_until_line, offset, num_batches)
+        
+        @activity.defn(name="process_record")
+        async def mock_process_record(record: str) -> str:
+            processed.append(record)
+            return record.upper()
+        
+        async with await WorkflowEnvironment.start_time_skipping() as env:
+            async with Worker(
+                env.client,
+                task_queue=TEST_TASK_QUEUE,
+                workflows=[ShardedBatchWorkflow, BatchParentWorkflow, BatchChildWorkflow],
+                activities=[mock_read_batches, mock_process_record]
+            ):
+                handle = await env.client.start_workflow(
+                    ShardedBatchWorkflow.run,
+                    params,
+                    id=str(uuid.uuid4()),
+                    task_queue=TEST_TASK_QUEUE
+                )
+                await handle.result()
+                shards = await handle.query(ShardedBatchWorkflow.progress)
+                latest = await env.client.get_workflow_handle(handle.id).describe()
+                
+                assert latest.run_id != handle.first_execution_run_id  # Continued as new
+                assert sorted(processed) == sorted(f"word{i}" for i in range(500))
+                assert all(shard.status == SHARD_COMPLETED for shard in shards)
+                assert sum(shard.completed_records for shard in shards) == 500
+
+
+class TestRecordPoolWorkflow:
+    """Test the RecordPoolWorkflow."""
+
+    @pytest.mark.asyncio
+    async def test_record_pool_workflow_processes_all_records(self) -> None:
+        """Test that the pool processes every record across batch boundaries."""
+        params = RecordPoolWorkflowParams(num_words=120, pool_size=8)
+        processed: list[str] = []
+        
+        @activity.defn(name="read_batches")
+        async def mock_read_batches(
+            batch_size: int, read_until_line: int, offset: int, num_batches: int, cursor: Optional[str]
+        ) -> SourceBatches:
+            return word_batches(batch_size, read_until_line, offset, num_batches)
+        
+        @activity.defn(name="process_record")
+        async def mock_process_record(record: str) -> str:
+            processed.append(record)
+            return record.upper()
+        
+        async with await WorkflowEnvironment.start_time_skipping() as env:
+            async with Worker(
+                env.client,
+                task_queue=TEST_TASK_QUEUE,
+                workflows=[RecordPoolWorkflow],
+                activities=[mock_read_batches, mock_process_record]
+            ):
+                await env.client.execute_workflow(
+                    RecordPoolWorkflow.run,
+                    params,
+                    id=str(uuid.uuid4()),
+                    task_queue=TEST_TASK_QUEUE
+                )
+                
+                assert sorted(processed) == sorted(f"word{i}" for i in range(120))
+
+    @pytest.mark.asyncio
+    async def test_record_pool_workflow_continues_as_new(self) -> None:
+        """Test that the pool continues-as-new without losing or repeating quick records."""
+        params = RecordPoolWorkflowParams(num_words=300, pool_size=10, max_history_length=100)
+        processed: list[str] = []
+        
+        @activity.defn(name="read_batches")
+        async def mock_read_batches(
+            batch_size: int, read_until_line: int, offset: int, num_batches: int, cursor: Optional[str]
+        ) -> SourceBatches:
+            return word_batches(batch_size, read_until_line, offset, num_batches)
+        
+        @activity.defn(name="process_record")
+        async def mock_process_record(record: str) -> str:
+            processed.append(record)
+            return record.upper()
+        
+        async with await WorkflowEnvironment.start_time_skipping() as env:
+            async with Worker(
+                env.client,
+                task_queue=TEST_TASK_QUEUE,
+                workflows=[RecordPoolWorkflow],
+                activities=[mock_read_batches, mock_process_record]
+            ):
+                handle = await env.client.start_workflow(
+                    RecordPoolWorkflow.run,
+                    params,
+                    id=str(uuid.uuid4()),
+                    task_queue=TEST_TASK_QUEUE
+                )
+                await handle.result()
+                latest = await env.client.get_workflow_handle(handle.id).describe()
+                
+                assert latest.run_id != handle.first_execution_run_id  # Continued as new
+                assert sorted(processed) == sorted(f"word{i}" for i in range(300))
+
+    @pytest.mark.asyncio
+    async def test_record_pool_workflow_carries_slow_records(self) -> None:
+        """Test that a record still running at continue-as-new is started again by the next run."""
+        params = RecordPoolWorkflowParams(num_words=300, pool_size=10, max_history_length=100)
+        started: list[str] = []
+        
+        @activity.defn(name="read_batches")
+        async def mock_read_batches(
+            batch_size: int, read_until_line: int, offset: int, num_batches: int, cursor: Optional[str]
+        ) -> SourceBatches:
+            return word_batches(batch_size, read_until_line, offset, num_batches)
+        
+        @activity.defn(name="process_record")
+        async def mock_process_record(record: str) -> str:
+            started.append(record)
+            if record == "word5" and started.count(record) == 1:
+                # Outlasts the drain of the first run
+                await asyncio.sleep(3)
+            return record.upper()
+        
+        async with await WorkflowEnvironment.start_time_skipping() as env:
+            async with Worker(
+                env.client,
+                task_queue=TEST_TASK_QUEUE,
+                workflows=[RecordPoolWorkflow],
+                activities=[mock_read_batches, mock_process_record]
+            ):
+                await env.client.execute_workflow(
+                    RecordPoolWorkflow.run,
+                    params,
+                    id=str(uuid.uuid4()),
+                    task_queue=TEST_TASK_QUEUE
+                )
+                
+                assert set(started) == {f"word{i}" for i in range(300)}
+                assert started.count("word5") == 2
+
+
+class TestLegacyBatchParentWorkflow:
+    """Test the first release's parent and child, registered next to the V2 pair."""
+
+    @pytest.mark.asyncio
+    async def test_legacy_batch_parent_workflow_runs_by_original_name(self) -> None:
+        """Test that a run started under the original type name uses the legacy workflows."""
+        processed: list[str] = []
+        
+        @activity.defn(name="create_single_batch")
+        async def mock_create_batch(batch_size: int, read_until_line: int, offset: int) -> list[str]:
+            return [f"word{i}" for i in range(offset, min(offset + batch_size, read_until_line))]
+        
+        @activity.defn(name="process_record")
+        async def mock_process_record(record: str) -> str:
+            processed.append(record)
+            return record.upper()
+        
+        async with await WorkflowEnvironment.start_time_skipping() as env:
+            async with Worker(
+                env.client,
+                task_queue=TEST_TASK_QUEUE,
+                workflows=[
+                    BatchParentWorkflow,
+                    BatchChildWorkflow,
+                    LegacyBatchParentWorkflow,
+                    LegacyBatchChildWorkflow,
+                ],
+                activities=[mock_create_batch, mock_process_record]
+            ):
+                await env.client.execute_workflow(
+                    "BatchParentWorkflow",
+                    BatchParentWorkflowParams(num_words=120),
+                    id=str(uuid.uuid4()),
+                    task_queue=TEST_TASK_QUEUE
+                )
+                
+                assert sorted(processed) == sorted(f"word{i}" for i in range(120))